@@ -3,9 +3,9 @@
 import axios from 'axios';
 
 // Cấu hình địa chỉ gốc của API.
-// Thay đổi nếu API của bạn chạy trên một địa chỉ khác.
-// 'http://127.0.0.1:5000' là địa chỉ mặc định khi bạn chạy Flask trên máy local.
-const API_BASE_URL = 'http://127.0.0.1:5000';
+// Thay đổi nếu API của bạn chạy trên một địa chỉ khác (REACT_APP_RECOMMENDER_URL).
+// 'http://127.0.0.1:5001' là địa chỉ mặc định của API gợi ý (cổng 5000 dành cho backend Node).
+const API_BASE_URL = process.env.REACT_APP_RECOMMENDER_URL || 'http://127.0.0.1:5001';
 
 /**
  * Lấy danh sách sản phẩm gợi ý cho một người dùng cụ thể.
@@ -62,4 +62,30 @@ export const getSimilarProducts = async ({ productId, numSimilar = 3 }) => {
         console.error("Error fetching similar products:", error.response ? error.response.data : error.message);
         return [];
     }
-};
\ No newline at end of file
+};
+
+/**
+ * Lấy gợi ý bán kèm cho giỏ hàng hoặc các sản phẩm vừa xem (không cần đăng nhập).
+ * @param {object} params - Các tham số cho yêu cầu.
+ * @param {Array<number>} params.productIds - ID các sản phẩm trong giỏ hàng / vừa xem.
+ * @param {number} [params.numRecs=5] - Số lượng sản phẩm gợi ý muốn nhận.
+ * @param {number} [params.alpha=0.5] - Trọng số cho mô hình (0.0 đến 1.0).
+ * @returns {Promise<Array>} - Một promise trả về một mảng các đối tượng sản phẩm.
+ */
+export const getSessionRecommendations = async ({ productIds, numRecs = 5, alpha = 0.5 }) => {
+    if (!productIds || productIds.length === 0) {
+        return [];
+    }
+
+    try {
+        const response = await axios.post(`${API_BASE_URL}/recommendations/session`, {
+            product_ids: productIds,
+            num_recs: numRecs,
+            alpha: alpha,
+        });
+        return response.data;
+    } catch (error) {
+        console.error("Error fetching session recommendations:", error.response ? error.response.data : error.message);
+        return [];
+    }
+};
@@ -0,0 +1,321 @@
+# @title Bộ benchmark huấn luyện và phục vụ trên dữ liệu tổng hợp
+# ==============================================================================
+# Cách chạy (từ thư mục model_recommend_products):
+#   python benchmarks/run_benchmarks.py --scales 1000,100000,1000000
+#   python benchmarks/run_benchmarks.py --scales 100000 --compare benchmarks/results/<cũ>.json
+# Với mỗi quy mô (số dòng order_items), bộ benchmark:
+#   1. sinh CSDL SQLite tổng hợp (cùng lược đồ với MySQL 'websellproduct'),
+#   2. huấn luyện bằng chính các hàm của `python -m recommender train` (đọc dữ liệu, các bước
+#      của PipelineRunner, ghi gói mô hình), mỗi lượt từ thư mục trống để bước nào cũng chạy
+#      thật; đo thời gian (trung vị qua --repeat lần) và bộ nhớ đỉnh (tracemalloc, một lượt
+#      riêng) của từng bước,
+#   3. nạp API Flask trên gói mô hình vừa ghi và đo độ trễ các endpoint bằng test client,
+#   4. đo thông lượng chấm điểm với nhiều luồng đồng thời, không và có gom lô vi mô.
+# Kết quả ghi ra JSON; --compare báo các bước chậm hơn mức cho phép so với lần trước.
+# ==============================================================================
+import argparse
+import contextlib
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+PACKAGE_DIR = os.path.dirname(BENCHMARK_DIR)
+sys.path.insert(0, PACKAGE_DIR)
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine
+
+from recommender import config
+from recommender.cf_backends import CF_BACKENDS, DEFAULT_CF_BACKEND
+from recommender.serve import RecommenderService, create_app, logger as api_logger
+from recommender.train import create_runner, load_training_data, publish, training_stages
+from synthetic_data import create_synthetic_database, scale_shape
+
+DEFAULT_SCALES = (1000, 10000, 100000)
+DEFAULT_RESULTS_DIR = os.path.join(BENCHMARK_DIR, 'results')
+DEFAULT_TOLERANCE = 0.2
+# Bỏ qua khi so sánh các chỉ số nhanh hơn mức này: nhiễu đo lớn hơn chính giá trị
+MIN_COMPARABLE_SECONDS = 0.005
+ENDPOINT_WARMUP_REQUESTS = 20
+UNKNOWN_USER_SHARE = 0.1
+SESSION_MAX_PRODUCTS = 5
+CONCURRENT_THREADS = 16
+MICRO_BATCH_WINDOW_SECONDS = 0.002
+
+
+# ------------------------------------------------------------------------------
+# Huấn luyện: đúng các hàm của `python -m recommender train`, từng bước qua PipelineRunner
+# ------------------------------------------------------------------------------
+def _training_pass(db_uri, model_dir, cf_backend, measure):
+    """Một lượt huấn luyện từ đầu vào thư mục trống (không ảnh chụp, không bộ nhớ đệm bước).
+
+    `measure(name, function)` chạy `function()` cho từng bước: ingest, các bước của
+    `training_stages`, rồi publish (ghi gói mô hình và ảnh chụp tương tác). Trả về `runner.values`.
+    """
+    shutil.rmtree(model_dir, ignore_errors=True)
+    engine = create_engine(db_uri)
+    snapshot_path = config.interactions_snapshot_path(model_dir)
+    try:
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            products_df, accumulator = measure('ingest', lambda: load_training_data(engine, snapshot_path))
+            runner = create_runner(model_dir, products_df, accumulator, log=lambda message: None)
+            for stage in training_stages(cf_backend):
+                measure(stage.name, lambda: runner.run([stage]))
+
+            def publish_bundle():
+                publish(model_dir, runner, runner.values, products_df, cf_backend)
+                accumulator.save(snapshot_path)
+            measure('publish', publish_bundle)
+    finally:
+        engine.dispose()
+    return runner.values
+
+
+def benchmark_training(db_uri, model_dir, repeat, cf_backend=DEFAULT_CF_BACKEND):
+    """Đo thời gian từng bước qua `repeat` lượt, rồi một lượt riêng có tracemalloc để đo bộ nhớ đỉnh."""
+    timings = {}
+
+    def timed(name, function):
+        start = time.perf_counter()
+        result = function()
+        timings.setdefault(name, []).append(time.perf_counter() - start)
+        return result
+
+    for _ in range(repeat):
+        _training_pass(db_uri, model_dir, cf_backend, timed)
+
+    peaks = {}
+
+    def traced(name, function):
+        tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+        result = function()
+        peaks[name] = tracemalloc.get_traced_memory()[1] - baseline
+        return result
+
+    tracemalloc.start()
+    try:
+        values = _training_pass(db_uri, model_dir, cf_backend, traced)
+    finally:
+        tracemalloc.stop()
+
+    stages = {
+        name: {
+            'seconds_median': statistics.median(timings[name]),
+            'seconds_min': min(timings[name]),
+            'peak_memory_mb': peaks[name] / 2 ** 20,
+        }
+        for name in timings
+    }
+    shape = {'n_users': len(values['user_ids']), 'n_products': len(values['item_ids']), 'nnz': int(values['matrix'].nnz)}
+    return stages, shape, values
+
+
+# ------------------------------------------------------------------------------
+# Các endpoint Flask (test client, CSDL SQLite, gói mô hình vừa ghi)
+# ------------------------------------------------------------------------------
+def load_api(db_uri, model_dir):
+    """App Flask của API trỏ tới CSDL và gói mô hình của benchmark (không theo dõi CURRENT)."""
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        app = create_app(db_uri=db_uri, model_dir=model_dir, reload_poll_seconds=0)
+    # Log từng request làm sai lệch số đo; chỉ giữ cảnh báo và lỗi
+    api_logger.setLevel(logging.WARNING)
+    return app
+
+
+def _latency_summary(latencies):
+    latencies = np.asarray(latencies)
+    return {
+        'requests': len(latencies),
+        'mean_ms': float(latencies.mean() * 1000),
+        'p50_ms': float(np.percentile(latencies, 50) * 1000),
+        'p95_ms': float(np.percentile(latencies, 95) * 1000),
+        'p99_ms': float(np.percentile(latencies, 99) * 1000),
+        'requests_per_second': float(len(latencies) / latencies.sum()),
+    }
+
+
+def benchmark_endpoints(db_uri, model_dir, user_ids, item_ids, n_requests, seed=42):
+    """Đo độ trễ GET /recommendations/user (kèm một phần người dùng mới), GET /recommendations/item
+    và POST /recommendations/session (giỏ hàng 1-SESSION_MAX_PRODUCTS sản phẩm ngẫu nhiên)."""
+    rng = np.random.default_rng(seed)
+    app = load_api(db_uri, model_dir)
+    client = app.test_client()
+    unknown_user = int(np.max(user_ids)) + 1
+    total = n_requests + ENDPOINT_WARMUP_REQUESTS
+    sampled_users = np.where(rng.random(total) < UNKNOWN_USER_SHARE, unknown_user, rng.choice(user_ids, total))
+    sampled_items = rng.choice(item_ids, total)
+
+    sampled_sessions = [rng.choice(item_ids, rng.integers(1, SESSION_MAX_PRODUCTS + 1)).tolist() for _ in range(total)]
+
+    # (url, JSON của POST hoặc None với GET)
+    requests = {
+        'GET /recommendations/user': [(f'/recommendations/user?user_id={u}&num_recs=10', None) for u in sampled_users],
+        'GET /recommendations/item': [(f'/recommendations/item?product_id={p}&num_similar=10', None)
+                                      for p in sampled_items],
+        'POST /recommendations/session': [('/recommendations/session', {'product_ids': session, 'num_recs': 10})
+                                          for session in sampled_sessions],
+    }
+    results = {}
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        for endpoint, endpoint_requests in requests.items():
+            latencies = []
+            for i, (url, payload) in enumerate(endpoint_requests):
+                start = time.perf_counter()
+                response = client.get(url) if payload is None else client.post(url, json=payload)
+                elapsed = time.perf_counter() - start
+                if response.status_code != 200:
+                    raise RuntimeError(f'{url} trả về {response.status_code}: {response.get_data(as_text=True)[:200]}')
+                if i >= ENDPOINT_WARMUP_REQUESTS:
+                    latencies.append(elapsed)
+            results[endpoint] = _latency_summary(latencies)
+    app.extensions['recommender'].close()
+    return results
+
+
+def benchmark_concurrent_scoring(db_uri, model_dir, user_ids, n_requests, threads=CONCURRENT_THREADS, seed=42):
+    """Thông lượng bước chấm điểm của người dùng đã biết khi `threads` luồng gọi đồng thời (như
+    các luồng của một worker gthread, lô tối đa bằng số luồng như gunicorn.conf.py), không và
+    có gom lô vi mô; không qua bộ nhớ đệm kết quả và không dùng gợi ý tính sẵn."""
+    rng = np.random.default_rng(seed)
+    per_thread = max(n_requests // threads, 1)
+    sampled_users = rng.choice(user_ids, (threads, per_thread)).tolist()
+    results = {}
+    for label, window_seconds in (('plain', 0), ('micro_batched', MICRO_BATCH_WINDOW_SECONDS)):
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            service = RecommenderService(db_uri, model_dir, reload_poll_seconds=0, materialized_max_age_seconds=0,
+                                         micro_batch_window_seconds=window_seconds, micro_batch_max_size=threads)
+            service.load()
+        workers = [threading.Thread(target=lambda users: [service.hybrid_recommend_for_user(u, 10, 0.5) for u in users],
+                                    args=(users,)) for users in sampled_users]
+        start = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - start
+        service.close()
+        results[label] = {'threads': threads, 'requests': threads * per_thread,
+                          'requests_per_second': threads * per_thread / elapsed}
+    return results
+
+
+# ------------------------------------------------------------------------------
+# Chạy, lưu và so sánh kết quả
+# ------------------------------------------------------------------------------
+def run(scales, repeat, n_requests, seed, work_dir=None, cf_backend=DEFAULT_CF_BACKEND):
+    results = {
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'environment': {
+            'python': platform.python_version(), 'platform': platform.platform(),
+            'cpu_count': os.cpu_count(), 'numpy': np.__version__, 'pandas': pd.__version__,
+        },
+        'config': {'repeat': repeat, 'endpoint_requests': n_requests, 'seed': seed, 'cf_backend': cf_backend},
+        'scales': [],
+    }
+    owns_work_dir = work_dir is None
+    work_dir = work_dir or tempfile.mkdtemp(prefix='recommender-bench-')
+    try:
+        for n_interactions in scales:
+            print(f"\n--- Quy mô {n_interactions:,} tương tác (users, products, categories = "
+                  f"{scale_shape(n_interactions)}) ---")
+            scale_dir = os.path.join(work_dir, str(n_interactions))
+            os.makedirs(scale_dir, exist_ok=True)
+            start = time.perf_counter()
+            db_uri, _ = create_synthetic_database(os.path.join(scale_dir, 'shop.db'), n_interactions, seed=seed)
+            print(f"✅ Đã sinh CSDL tổng hợp trong {time.perf_counter() - start:.1f}s.")
+
+            model_dir = os.path.join(scale_dir, 'saved_models')
+            stages, shape, training_values = benchmark_training(db_uri, model_dir, repeat, cf_backend)
+            for name, stage in stages.items():
+                print(f"  {name:<15} {stage['seconds_median']:9.3f}s  đỉnh {stage['peak_memory_mb']:9.1f} MB")
+
+            endpoints = benchmark_endpoints(db_uri, model_dir, training_values['user_ids'], training_values['item_ids'], n_requests, seed)
+            for endpoint, summary in endpoints.items():
+                print(f"  {endpoint:<30} p50 {summary['p50_ms']:7.2f} ms  p95 {summary['p95_ms']:7.2f} ms")
+
+            concurrent = benchmark_concurrent_scoring(db_uri, model_dir, training_values['user_ids'], n_requests, seed=seed)
+            for label, summary in concurrent.items():
+                name = f"score x{summary['threads']} luồng {label}"
+                print(f"  {name:<30} {summary['requests_per_second']:7.0f} req/s")
+
+            results['scales'].append({'n_interactions': n_interactions, **shape, 'training_stages': stages,
+                                      'endpoints': endpoints, 'concurrent_scoring': concurrent})
+    finally:
+        if owns_work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    return results
+
+
+def _timing_metrics(results):
+    """Làm phẳng kết quả thành {(quy mô, tên chỉ số): số giây} để so sánh."""
+    metrics = {}
+    for scale in results['scales']:
+        for name, stage in scale['training_stages'].items():
+            metrics[(scale['n_interactions'], f'training.{name}')] = stage['seconds_median']
+        for endpoint, summary in scale['endpoints'].items():
+            metrics[(scale['n_interactions'], f'{endpoint} p95')] = summary['p95_ms'] / 1000
+    return metrics
+
+
+def compare(results, baseline, tolerance):
+    """In tỉ lệ thời gian so với lần chạy trước; trả về danh sách chỉ số chậm hơn quá `tolerance`."""
+    current, previous = _timing_metrics(results), _timing_metrics(baseline)
+    regressions = []
+    print(f"\n--- So sánh với {baseline.get('created_at')} (ngưỡng +{tolerance:.0%}) ---")
+    for key in sorted(current.keys() & previous.keys()):
+        if max(current[key], previous[key]) < MIN_COMPARABLE_SECONDS:
+            continue
+        ratio = current[key] / max(previous[key], MIN_COMPARABLE_SECONDS)
+        flag = '❌' if ratio > 1 + tolerance else '✅'
+        print(f"{flag} {key[0]:>10,} {key[1]:<37} x{ratio:.2f}")
+        if ratio > 1 + tolerance:
+            regressions.append(key)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark huấn luyện và phục vụ mô hình gợi ý trên dữ liệu tổng hợp.')
+    parser.add_argument('--scales', default=','.join(map(str, DEFAULT_SCALES)),
+                        help='Các quy mô (số dòng order_items), phân tách bằng dấu phẩy, ví dụ 1000,1000000,10000000')
+    parser.add_argument('--repeat', type=int, default=3, help='Số lượt đo thời gian mỗi bước huấn luyện')
+    parser.add_argument('--requests', type=int, default=200, help='Số request đo cho mỗi endpoint')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='File JSON kết quả (mặc định benchmarks/results/benchmark-<thời điểm>.json)')
+    parser.add_argument('--work-dir', help='Giữ CSDL và gói mô hình tổng hợp tại đây thay vì thư mục tạm')
+    parser.add_argument('--cf-backend', choices=CF_BACKENDS, default=DEFAULT_CF_BACKEND,
+                        help='Mô hình CF của bước huấn luyện cf')
+    parser.add_argument('--compare', help='File JSON kết quả cũ để phát hiện suy giảm hiệu năng')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args(argv)
+
+    scales = [int(value) for value in args.scales.split(',') if value.strip()]
+    results = run(scales, args.repeat, args.requests, args.seed, args.work_dir, args.cf_backend)
+
+    output = args.output or os.path.join(DEFAULT_RESULTS_DIR, f"benchmark-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"\n✅ Đã lưu kết quả vào {output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print(f"❌ {len(regressions)} chỉ số chậm hơn ngưỡng cho phép.")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
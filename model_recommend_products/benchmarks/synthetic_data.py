@@ -0,0 +1,103 @@
+# @title Sinh dữ liệu tổng hợp cho benchmark (thay cho CSDL MySQL 'websellproduct')
+# ==============================================================================
+# Tạo các bảng categories, products, orders, order_items với cùng tên cột mà các
+# script huấn luyện và API truy vấn, ghi vào một file SQLite. Độ phổ biến sản phẩm
+# và mức độ hoạt động của người dùng theo phân phối Zipf (đuôi dài) như dữ liệu thật.
+# ==============================================================================
+import os
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+ITEMS_PER_ORDER = 2.5
+HISTORY_DAYS = 180
+WRITE_CHUNK_ROWS = 500000
+
+
+def scale_shape(n_interactions, n_users=None, n_products=None, n_categories=None):
+    """Kích thước mặc định theo số tương tác: 10 dòng mua/người dùng, ~2·sqrt(n) sản phẩm."""
+    n_users = n_users or max(50, n_interactions // 10)
+    n_products = n_products or max(30, int(2 * np.sqrt(n_interactions)))
+    n_categories = n_categories or max(3, min(50, n_products // 20))
+    return n_users, n_products, n_categories
+
+
+def _zipf_choice(rng, n_values, size, exponent=1.1):
+    """Chọn chỉ số 0..n_values-1 với xác suất giảm dần theo hạng (Zipf), thứ tự hạng xáo trộn."""
+    weights = 1.0 / np.arange(1, n_values + 1) ** exponent
+    ranks = rng.choice(n_values, size=size, p=weights / weights.sum())
+    return rng.permutation(n_values)[ranks]
+
+
+def generate_tables(n_interactions, n_users=None, n_products=None, n_categories=None,
+                    seed=42, as_of='2026-01-01'):
+    """Sinh các DataFrame categories, products, orders, order_items (id bắt đầu từ 1)."""
+    rng = np.random.default_rng(seed)
+    n_users, n_products, n_categories = scale_shape(n_interactions, n_users, n_products, n_categories)
+    as_of = pd.Timestamp(as_of)
+
+    categories = pd.DataFrame({
+        'id': np.arange(1, n_categories + 1),
+        'name': [f'Danh mục {i}' for i in range(1, n_categories + 1)],
+    })
+    product_ids = np.arange(1, n_products + 1)
+    products = pd.DataFrame({
+        'id': product_ids,
+        'name': [f'Sản phẩm {i}' for i in product_ids],
+        'description': 'Mô tả sản phẩm tổng hợp',
+        'image_url': [f'https://example.com/images/{i}.jpg' for i in product_ids],
+        'category_id': rng.integers(1, n_categories + 1, n_products),
+        'status': 'active',
+        'price': np.round(rng.uniform(10000, 500000, n_products), -3),
+        'quantity': rng.integers(0, 500, n_products),
+        'created_at': as_of - pd.Timedelta(days=HISTORY_DAYS),
+        'updated_at': as_of - pd.Timedelta(days=HISTORY_DAYS),
+    })
+
+    n_orders = max(1, int(n_interactions / ITEMS_PER_ORDER))
+    order_created = as_of - pd.to_timedelta(rng.uniform(0, HISTORY_DAYS * 86400, n_orders), unit='s')
+    orders = pd.DataFrame({
+        'id': np.arange(1, n_orders + 1),
+        'user_id': _zipf_choice(rng, n_users, n_orders, exponent=0.8) + 1,
+        'status': 'completed',
+        'created_at': order_created.floor('s'),
+        'updated_at': order_created.floor('s'),
+    })
+    # Mỗi đơn có ít nhất một dòng; các dòng còn lại rải ngẫu nhiên vào các đơn
+    item_order_ids = np.concatenate([
+        orders['id'].to_numpy(),
+        rng.integers(1, n_orders + 1, max(0, n_interactions - n_orders)),
+    ])[:n_interactions]
+    order_items = pd.DataFrame({
+        'id': np.arange(1, len(item_order_ids) + 1),
+        'order_id': np.sort(item_order_ids),
+        'product_id': _zipf_choice(rng, n_products, len(item_order_ids)) + 1,
+        'quantity': rng.integers(1, 4, len(item_order_ids)),
+    })
+    return {'categories': categories, 'products': products, 'orders': orders, 'order_items': order_items}
+
+
+def write_sqlite(tables, path):
+    """Ghi các bảng vào file SQLite mới (ghi đè), kèm chỉ mục cho các khóa JOIN."""
+    if os.path.exists(path):
+        os.remove(path)
+    with sqlite3.connect(path) as connection:
+        for name, frame in tables.items():
+            frame = frame.copy()
+            for column in frame.columns:
+                if pd.api.types.is_datetime64_any_dtype(frame[column]):
+                    frame[column] = frame[column].dt.strftime('%Y-%m-%d %H:%M:%S')
+            frame.to_sql(name, connection, index=False, chunksize=WRITE_CHUNK_ROWS)
+        connection.execute('CREATE UNIQUE INDEX idx_products_id ON products (id)')
+        connection.execute('CREATE UNIQUE INDEX idx_orders_id ON orders (id)')
+        connection.execute('CREATE INDEX idx_order_items_order_id ON order_items (order_id)')
+        connection.execute('CREATE INDEX idx_orders_created_at ON orders (created_at)')
+    return path
+
+
+def create_synthetic_database(path, n_interactions, seed=42, **shape):
+    """Sinh dữ liệu và ghi ra SQLite; trả về URI SQLAlchemy và các DataFrame đã sinh."""
+    tables = generate_tables(n_interactions, seed=seed, **shape)
+    write_sqlite(tables, path)
+    return f'sqlite:///{os.path.abspath(path)}', tables
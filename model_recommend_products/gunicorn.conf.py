@@ -0,0 +1,76 @@
+# @title Cấu hình phục vụ production cho API gợi ý (gunicorn, nạp trước mô hình)
+# ==============================================================================
+# Chạy:  gunicorn -c gunicorn.conf.py   (app = recommender.serve:create_app())
+# - preload_app: mô hình (mảng .npy mmap) được nạp một lần trong master rồi fork, nên
+#   các worker dùng chung trang nhớ và khởi động tức thì.
+# - worker gthread: mỗi worker có nhiều luồng, request trang sản phẩm và trang chủ
+#   không phải xếp hàng sau nhau khi một request đang chờ MySQL. Các luồng này cũng là
+#   nguồn request đồng thời cho gom lô vi mô (RECOMMENDER_MICRO_BATCH_WINDOW_MS, xem
+#   recommender/serve.py): tăng RECOMMENDER_THREADS khi bật để lô có nhiều người dùng.
+# - SIGTERM: dừng nhận kết nối mới, chờ request đang chạy tối đa graceful_timeout giây.
+# - SIGHUP gửi tới master: thay worker một cách nhẹ nhàng; worker mới nạp phiên bản CURRENT.
+# Mọi tham số đọc từ biến môi trường RECOMMENDER_*.
+# ==============================================================================
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+_env = os.environ.get
+
+chdir = os.path.dirname(os.path.abspath(__file__))  # để 'saved_models' tương đối vẫn đúng
+wsgi_app = 'recommender.serve:create_app()'
+# Cổng mặc định 5001: backend Node đã dùng cổng 5000
+bind = f"{_env('RECOMMENDER_HOST', '0.0.0.0')}:{_env('RECOMMENDER_PORT', '5001')}"
+workers = int(_env('RECOMMENDER_WORKERS', str(multiprocessing.cpu_count())))
+worker_class = 'gthread'
+threads = int(_env('RECOMMENDER_THREADS', '4'))
+# Một lô vi mô không lớn hơn số luồng của worker: đủ số luồng thì chấm ngay, không chờ hết cửa sổ
+os.environ.setdefault('RECOMMENDER_MICRO_BATCH_MAX_SIZE', str(threads))
+preload_app = True
+
+timeout = int(_env('RECOMMENDER_TIMEOUT', '30'))                    # worker treo quá lâu thì bị thay
+graceful_timeout = int(_env('RECOMMENDER_GRACEFUL_TIMEOUT', '30'))  # thời gian chờ request khi dừng
+keepalive = int(_env('RECOMMENDER_KEEPALIVE', '5'))
+backlog = int(_env('RECOMMENDER_BACKLOG', '2048'))
+
+# Log request đã có dạng JSON từ API; chỉ giữ log lỗi của gunicorn
+accesslog = None
+errorlog = '-'
+loglevel = _env('RECOMMENDER_LOG_LEVEL', 'info')
+
+# Mỗi request chỉ nhân ma trận nhỏ: một luồng BLAS mỗi luồng phục vụ tránh tranh chấp CPU
+for _variable in ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS'):
+    os.environ.setdefault(_variable, '1')
+
+# Gộp số liệu Prometheus của mọi worker (phải đặt trước khi API import prometheus_client)
+if workers > 1 and 'PROMETHEUS_MULTIPROC_DIR' not in os.environ:
+    os.environ['PROMETHEUS_MULTIPROC_DIR'] = tempfile.mkdtemp(prefix='recommender-metrics-')
+
+
+def on_starting(server):
+    metrics_dir = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if metrics_dir:
+        shutil.rmtree(metrics_dir, ignore_errors=True)
+        os.makedirs(metrics_dir, exist_ok=True)
+
+
+def _service(server):
+    """RecommenderService của app đã nạp trước trong master (preload_app), hoặc None."""
+    app = getattr(server.app, 'callable', None)
+    return app.extensions.get('recommender') if app is not None else None
+
+
+def post_fork(server, worker):
+    service = _service(server)
+    if service is not None:
+        service.after_fork()
+
+
+def worker_exit(server, worker):
+    service = _service(server)
+    if service is not None:
+        service.close()
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
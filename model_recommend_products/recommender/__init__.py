@@ -0,0 +1,10 @@
+# @title Gói gợi ý sản phẩm: huấn luyện, tinh chỉnh, phục vụ
+# ==============================================================================
+# Entry point (chạy từ thư mục model_recommend_products, xem __main__.py):
+#   python -m recommender train | tune | serve | update | materialize
+# Các module thành phần (scoring_engine, model_bundle, ...) nhập được trực tiếp trong
+# test và benchmark mà không cần CSDL: không module nào kết nối CSDL, nạp mô hình hay
+# nhập sklearn/pandas khi import nếu không thật sự dùng đến.
+# Phụ thuộc: requirements.txt; test (CSDL SQLite tổng hợp, không cần MySQL/Redis):
+#   pip install -r requirements-dev.txt && python -m pytest
+# ==============================================================================
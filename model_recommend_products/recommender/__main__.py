@@ -0,0 +1,36 @@
+# @title Dòng lệnh của gói gợi ý: python -m recommender <lệnh>
+# ==============================================================================
+#   train        huấn luyện đầy đủ, ghi gói mô hình mới (train.py)
+#   tune         tinh chỉnh (k, alpha) và đánh giá trên tập test (tune.py)
+#   serve        chạy API bằng server phát triển; production: gunicorn -c gunicorn.conf.py
+#   update       fold-in các đơn hàng mới vào gói mô hình hiện tại (update.py)
+#   materialize  tính sẵn top-N cho toàn bộ người dùng (materialize.py)
+#   shard        chia gói mô hình theo người dùng cho chế độ phục vụ phân mảnh (shard.py)
+#   route        chạy router chuyển request tới shard sở hữu người dùng (route.py)
+# Chỉ module của lệnh được chọn được nhập, nên `serve` không kéo theo sklearn.
+# ==============================================================================
+import argparse
+import importlib
+
+COMMANDS = {
+    'train': 'Huấn luyện đầy đủ và ghi gói mô hình mới.',
+    'tune': 'Tinh chỉnh siêu tham số (k, alpha) và đánh giá trên tập test.',
+    'serve': 'Chạy API gợi ý (server phát triển).',
+    'update': 'Cập nhật tăng dần (fold-in) từ các đơn hàng mới.',
+    'materialize': 'Tính sẵn top-N gợi ý cho toàn bộ người dùng.',
+    'shard': 'Chia gói mô hình theo người dùng cho chế độ phục vụ phân mảnh.',
+    'route': 'Chạy router tới các shard (server phát triển).',
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m recommender', description='Hệ gợi ý sản phẩm.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    for command, help_text in COMMANDS.items():
+        subparsers.add_parser(command, help=help_text)
+    args = parser.parse_args(argv)
+    importlib.import_module(f'{__package__}.{args.command}').main()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,180 @@
+# @title Truy hồi ứng viên hai giai đoạn cho gợi ý lai (thời gian không tăng theo số sản phẩm)
+# ==============================================================================
+# Giai đoạn 1 - sinh ứng viên (vài trăm sản phẩm), từ ba nguồn:
+#   - CF: top-M theo điểm CF đã chuẩn hóa. Điểm CF chuẩn hóa của sản phẩm j là
+#       (p · q_j) * scale_j + min_j = [p, 1] · [q_j * scale_j, min_j]
+#     nên đây là bài toán tích vô hướng lớn nhất. Các vector sản phẩm được chia cụm
+#     (k-means, ~sqrt(số sản phẩm) cụm); khi truy vấn chỉ quét các cụm có tích vô hướng
+#     giữa tâm cụm và [p, 1] lớn nhất cho đến khi đủ PROBE_FACTOR * M sản phẩm.
+#   - Danh mục: các sản phẩm bán chạy nhất trong những danh mục nặng nhất của hồ sơ CBF
+#     (nhóm chỉ số đầu tiên của ContentFeatures, tức danh mục khi có đặc trưng danh mục).
+#   - Bán chạy: top sản phẩm bán chạy toàn cửa hàng.
+# Giai đoạn 2 - xếp hạng lại: điểm lai alpha·CF + (1-alpha)·CBF và lọc sản phẩm đã mua
+# chỉ tính trên tập ứng viên (HybridScoringEngine.rerank).
+# ==============================================================================
+import numpy as np
+
+from .scoring_engine import top_k_indices
+
+CF_CANDIDATES = 200
+PROBE_FACTOR = 4
+CATEGORY_POOL_SIZE = 100
+TOP_CATEGORIES = 3
+POPULAR_CANDIDATES = 100
+# Danh mục nhỏ hơn ngưỡng này không cần chia cụm: quét toàn bộ vẫn rẻ
+MIN_ITEMS_TO_CLUSTER = 2000
+KMEANS_RANDOM_STATE = 42
+
+
+def cf_item_vectors(engine):
+    """Vector sản phẩm [q_j * scale_j, min_j] sao cho [p, 1] · vector = điểm CF đã chuẩn hóa."""
+    return np.hstack([engine.item_factors * engine.cf_scale[:, None], engine.cf_min[:, None]])
+
+
+def _group(labels, n_groups, values=None):
+    """CSR (indptr, values): `values` (mặc định là vị trí) gom theo nhãn, giữ thứ tự trong mỗi nhóm."""
+    positions = np.argsort(labels, kind='stable')
+    values = positions if values is None else np.asarray(values)[positions]
+    indptr = np.concatenate([[0], np.cumsum(np.bincount(labels, minlength=n_groups))])
+    return indptr, values
+
+
+class CandidateIndex:
+    """Chỉ mục ứng viên: cụm vector CF, nhóm sản phẩm bán chạy theo danh mục và toàn cửa hàng."""
+
+    def __init__(self, centroids, cluster_indptr, cluster_cols, category_indptr, category_cols, popular_cols):
+        self.centroids = np.asarray(centroids)
+        self.cluster_indptr = np.asarray(cluster_indptr)
+        self.cluster_cols = np.asarray(cluster_cols)
+        self.category_indptr = np.asarray(category_indptr)
+        self.category_cols = np.asarray(category_cols)
+        self.popular_cols = np.asarray(popular_cols)
+
+    @classmethod
+    def build(cls, engine, popularity, n_clusters=None):
+        """Chia cụm vector CF của `engine` và lập các nhóm bán chạy từ `popularity`."""
+        vectors = cf_item_vectors(engine)
+        n_items = len(vectors)
+        if n_clusters is None:
+            n_clusters = 1 if n_items < MIN_ITEMS_TO_CLUSTER else int(np.sqrt(n_items))
+        if n_clusters > 1:
+            from sklearn.cluster import MiniBatchKMeans
+            # Phân cụm trên vector gốc (không chuẩn hóa): độ dài vector, chủ yếu do scale_j
+            # và min_j, quyết định thứ hạng không kém gì hướng của nó
+            kmeans = MiniBatchKMeans(n_clusters=n_clusters, n_init=3, random_state=KMEANS_RANDOM_STATE)
+            labels = kmeans.fit_predict(vectors)
+            centroids = kmeans.cluster_centers_
+        else:
+            labels = np.zeros(n_items, dtype=np.intp)
+            centroids = np.zeros((1, vectors.shape[1]))
+        cluster_indptr, cluster_cols = _group(labels, len(centroids))
+        return cls(centroids, cluster_indptr, cluster_cols,
+                   *cls._popularity_pools(engine, popularity))
+
+    def with_popularity(self, engine, popularity):
+        """Bản mới giữ nguyên các cụm CF (nhân tố sản phẩm không đổi khi fold-in), cập nhật nhóm bán chạy."""
+        return CandidateIndex(self.centroids, self.cluster_indptr, self.cluster_cols,
+                              *self._popularity_pools(engine, popularity))
+
+    @staticmethod
+    def _popularity_pools(engine, popularity):
+        ranked_cols = engine.item_index.rows(popularity.segments['all'])
+        ranked_cols = ranked_cols[ranked_cols >= 0]
+        content = engine.content
+        if content.index.shape[1] == 0:
+            return np.zeros(1, dtype=np.int64), ranked_cols[:0], ranked_cols[:POPULAR_CANDIDATES]
+        labels = content.group_columns(0)[ranked_cols]
+        has_category = labels >= 0
+        n_categories = int(content.offsets[1] - content.offsets[0])
+        indptr, cols = _group(labels[has_category], n_categories, ranked_cols[has_category])
+        # Chỉ giữ CATEGORY_POOL_SIZE sản phẩm bán chạy nhất của mỗi danh mục
+        pools = [cols[start:stop][:CATEGORY_POOL_SIZE] for start, stop in zip(indptr[:-1], indptr[1:])]
+        category_indptr = np.concatenate([[0], np.cumsum([len(pool) for pool in pools], dtype=np.int64)])
+        category_cols = np.concatenate(pools) if pools else cols
+        return category_indptr, category_cols, ranked_cols[:POPULAR_CANDIDATES]
+
+    def to_arrays(self):
+        return {
+            'centroids': self.centroids,
+            'cluster_indptr': self.cluster_indptr, 'cluster_cols': self.cluster_cols,
+            'category_indptr': self.category_indptr, 'category_cols': self.category_cols,
+            'popular_cols': self.popular_cols,
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        return cls(**arrays)
+
+    # --------------------------------------------------------------------------
+    # Giai đoạn 1: sinh ứng viên (theo lô người dùng)
+    # --------------------------------------------------------------------------
+    def cf_candidates(self, engine, rows, num_candidates=CF_CANDIDATES):
+        """Mỗi hàng trong `rows`: top `num_candidates` cột theo điểm CF đã chuẩn hóa, chỉ quét
+        các cụm gần nhất (điểm tâm cụm của cả lô tính trong một phép nhân)."""
+        rows = np.asarray(rows, dtype=np.intp)
+        if len(self.centroids) > 1:
+            queries = np.hstack([engine.user_factors[rows], np.ones((len(rows), 1))])
+            probe_orders = np.argsort(-(queries @ self.centroids.T), axis=1, kind='stable')
+            # Số cụm cần quét của từng hàng: cụm đầu tiên mà tổng dồn kích thước đạt PROBE_FACTOR * M
+            sizes = np.cumsum(np.diff(self.cluster_indptr)[probe_orders], axis=1)
+            needed = (sizes < PROBE_FACTOR * num_candidates).sum(axis=1) + 1
+            col_sets = [np.concatenate([self.cluster_cols[self.cluster_indptr[c]:self.cluster_indptr[c + 1]]
+                                        for c in probe_order[:n_probe]])
+                        for probe_order, n_probe in zip(probe_orders, needed)]
+        else:
+            col_sets = [self.cluster_cols] * len(rows)
+        results = []
+        for row, cols in zip(rows, col_sets):
+            cf_scores = (engine.item_factors[cols] @ engine.user_factors[row]) * engine.cf_scale[cols] + engine.cf_min[cols]
+            results.append(cols[top_k_indices(cf_scores, num_candidates)])
+        return results
+
+    def category_candidates(self, engine, rows, top_categories=TOP_CATEGORIES):
+        """Mỗi hàng: sản phẩm bán chạy trong các danh mục chiếm tỉ trọng lớn nhất của hồ sơ người dùng."""
+        offsets = engine.content.offsets
+        if len(offsets) < 2:
+            return [self.category_cols[:0]] * len(rows)
+        profiles = engine.content.index_weights(engine.user_profiles, np.asarray(rows, dtype=np.intp))
+        results = []
+        for profile in profiles[:, offsets[0]:offsets[1]]:
+            categories = [c for c in top_k_indices(profile, top_categories)
+                          if profile[c] > 0 and c + 1 < len(self.category_indptr)]
+            results.append(np.concatenate([self.category_cols[self.category_indptr[c]:self.category_indptr[c + 1]]
+                                           for c in categories] or [self.category_cols[:0]]))
+        return results
+
+    def candidates(self, engine, rows):
+        """Mỗi hàng trong `rows`: hợp (không trùng) của ba nguồn ứng viên, dạng chỉ số cột của `engine`."""
+        return [np.unique(np.concatenate([cf_cols, category_cols, self.popular_cols]).astype(np.intp))
+                for cf_cols, category_cols in zip(self.cf_candidates(engine, rows),
+                                                  self.category_candidates(engine, rows))]
+
+    # --------------------------------------------------------------------------
+    # Giai đoạn 2: xếp hạng lại
+    # --------------------------------------------------------------------------
+    def recommend(self, engine, user_id, num_recommendations, alpha):
+        """Như `engine.recommend` nhưng chỉ chấm điểm lai trên tập ứng viên.
+
+        Nếu tập ứng viên (sau khi bỏ sản phẩm đã mua) ít hơn số gợi ý cần, quay về chấm toàn bộ.
+        """
+        row = engine.user_index[user_id]
+        result = engine.rerank(row, self.candidates(engine, [row])[0], num_recommendations, alpha)
+        if result is None:
+            return engine.recommend(user_id, num_recommendations, alpha)
+        return result
+
+    def recommend_batch(self, engine, user_ids, num_recommendations, alpha):
+        """`recommend` cho nhiều người dùng: dict user_id -> (product_ids, hybrid_scores).
+
+        Cả hai giai đoạn chạy theo lô (tập ứng viên vẫn riêng cho từng người, như `recommend`);
+        người dùng không có trong mô hình bị bỏ qua.
+        """
+        unique_ids = np.array(list(dict.fromkeys(user_ids)), dtype=np.int64)
+        all_rows = engine.user_index.rows(unique_ids)
+        known_ids, rows = unique_ids[all_rows >= 0].tolist(), all_rows[all_rows >= 0]
+        reranked = engine.rerank_batch(rows, self.candidates(engine, rows), num_recommendations, alpha)
+        results = {user_id: result for user_id, result in zip(known_ids, reranked) if result is not None}
+        fallback_ids = [user_id for user_id in known_ids if user_id not in results]
+        if fallback_ids:
+            results.update(engine.recommend_batch(fallback_ids, num_recommendations, alpha))
+        return results
@@ -0,0 +1,134 @@
+# @title Các mô hình CF có thể thay thế: TruncatedSVD và ALS cho phản hồi ngầm (implicit)
+# ==============================================================================
+# Mọi mô hình CF theo giao diện của TruncatedSVD: `fit_transform(ma trận CSR users×items)`
+# trả về nhân tố người dùng (users×k) và đặt `components_` (k×items). Phần còn lại của
+# quy trình (chuẩn hóa, bộ máy chấm điểm, sản phẩm tương tự, chỉ mục ứng viên) chỉ dùng
+# hai mảng này nên không phụ thuộc mô hình. Chọn bằng biến môi trường CF_BACKEND.
+#
+# ALS implicit (Hu, Koren, Volinsky 2008): lượt mua là "sở thích" p_ui = 1 với độ tin cậy
+# c_ui = 1 + alpha·số lượng; ô trống là p = 0 với độ tin cậy 1 (không phải điểm 0 tường
+# minh như SVD). Mỗi nửa vòng lặp giải cho từng hàng u, với Y là nhân tố phía còn lại:
+#   x_u = (YᵀY + λI + Σ_{i∈u} (c_ui − 1)·y_i·y_iᵀ)⁻¹ · Σ_{i∈u} c_ui·y_i
+# YᵀY tính một lần mỗi nửa vòng lặp; phần tổng chỉ chạy trên các lượt mua của u. Các khối
+# hàng (giới hạn theo số phần tử khác 0 để bộ nhớ cố định) được giải song song trên một
+# pool luồng: einsum/reduceat/np.linalg.solve của numpy nhả GIL.
+# ==============================================================================
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import scipy.sparse as sp
+
+CF_BACKENDS = ('svd', 'als')
+DEFAULT_CF_BACKEND = 'svd'
+DEFAULT_REGULARIZATION = 0.1
+DEFAULT_CONFIDENCE_ALPHA = 40.0
+DEFAULT_ITERATIONS = 15
+# Bộ nhớ tạm tối đa (byte) của các ma trận k×k theo từng lượt mua trong một khối
+ALS_BLOCK_BYTES = 32 * 2 ** 20
+ALS_MAX_BLOCK_ROWS = 4096
+
+
+def _row_blocks(indptr, max_nnz, max_rows=ALS_MAX_BLOCK_ROWS):
+    """Chia các hàng thành khối liên tiếp có tối đa `max_nnz` phần tử khác 0 (ít nhất một hàng)."""
+    blocks, start, n_rows = [], 0, len(indptr) - 1
+    while start < n_rows:
+        stop = int(np.searchsorted(indptr, indptr[start] + max_nnz, side='right')) - 1
+        stop = min(max(stop, start + 1), start + max_rows, n_rows)
+        blocks.append((start, stop))
+        start = stop
+    return blocks
+
+
+def implicit_gram(fixed, regularization=DEFAULT_REGULARIZATION):
+    """Phần chung của mọi hàng trong hệ phương trình ALS: fixedᵀ·fixed + λI (k×k)."""
+    fixed = np.asarray(fixed, dtype=np.float64)
+    return fixed.T @ fixed + regularization * np.eye(fixed.shape[1])
+
+
+def solve_implicit_least_squares(fixed, ratings, regularization=DEFAULT_REGULARIZATION,
+                                 alpha=DEFAULT_CONFIDENCE_ALPHA, executor=None, gram=None):
+    """Nhân tố tối ưu của mọi hàng `ratings` (CSR, số lượng mua) khi cố định nhân tố `fixed`.
+
+    Hàng không có lượt mua nào có nhân tố 0. `executor` (nếu có) giải các khối song song.
+    `gram` là implicit_gram(fixed, regularization) tính sẵn, khi giải lặp lại với cùng `fixed`.
+    """
+    ratings = sp.csr_matrix(ratings)
+    fixed = np.asarray(fixed, dtype=np.float64)
+    k = fixed.shape[1]
+    if gram is None:
+        gram = implicit_gram(fixed, regularization)
+    result = np.zeros((ratings.shape[0], k))
+    indptr = ratings.indptr
+
+    def solve_block(bounds):
+        start, stop = bounds
+        low, high = indptr[start], indptr[stop]
+        counts = np.diff(indptr[start:stop + 1])
+        nonempty = np.flatnonzero(counts)
+        if not len(nonempty):
+            return
+        y = fixed[ratings.indices[low:high]]
+        extra_confidence = alpha * ratings.data[low:high]  # c_ui - 1
+        segments = indptr[start:stop][nonempty] - low
+        a = gram + np.add.reduceat(np.einsum('nk,nl->nkl', y * extra_confidence[:, None], y), segments, axis=0)
+        b = np.add.reduceat(y * (1.0 + extra_confidence)[:, None], segments, axis=0)
+        result[start + nonempty] = np.linalg.solve(a, b[..., None])[..., 0]
+
+    blocks = _row_blocks(indptr, max(1, ALS_BLOCK_BYTES // (8 * k * k)))
+    if executor is None:
+        for bounds in blocks:
+            solve_block(bounds)
+    else:
+        list(executor.map(solve_block, blocks))
+    return result
+
+
+class ImplicitALS:
+    """ALS cho phản hồi ngầm, cùng giao diện fit_transform/components_ với TruncatedSVD."""
+
+    def __init__(self, n_components=10, regularization=DEFAULT_REGULARIZATION, alpha=DEFAULT_CONFIDENCE_ALPHA,
+                 iterations=DEFAULT_ITERATIONS, n_workers=None, random_state=42):
+        self.n_components = n_components
+        self.regularization = regularization
+        self.alpha = alpha
+        self.iterations = iterations
+        self.n_workers = n_workers
+        self.random_state = random_state
+
+    @property
+    def fold_in_params(self):
+        """Tham số cần để fold-in người dùng mới (lưu trong bộ máy chấm điểm)."""
+        return np.array([self.regularization, self.alpha])
+
+    def fit_transform(self, matrix):
+        matrix = sp.csr_matrix(matrix, dtype=np.float64)
+        matrix.eliminate_zeros()
+        by_item = matrix.T.tocsr()
+        rng = np.random.default_rng(self.random_state)
+        user_factors = rng.normal(scale=0.01, size=(matrix.shape[0], self.n_components))
+
+        n_workers = self.n_workers or os.cpu_count() or 1
+        executor = ThreadPoolExecutor(n_workers) if n_workers > 1 else None
+        try:
+            # Sản phẩm trước, người dùng sau: nhân tố người dùng trả về khớp nhân tố sản phẩm cuối cùng
+            for _ in range(self.iterations):
+                item_factors = solve_implicit_least_squares(user_factors, by_item, self.regularization,
+                                                            self.alpha, executor)
+                user_factors = solve_implicit_least_squares(item_factors, matrix, self.regularization,
+                                                            self.alpha, executor)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        self.components_ = item_factors.T
+        return user_factors
+
+
+def create_cf_model(backend, n_components, random_state=42, n_workers=None):
+    """Mô hình CF theo tên trong CF_BACKENDS."""
+    if backend == 'svd':
+        from sklearn.decomposition import TruncatedSVD
+        return TruncatedSVD(n_components=n_components, random_state=random_state)
+    if backend == 'als':
+        return ImplicitALS(n_components=n_components, n_workers=n_workers, random_state=random_state)
+    raise ValueError(f"CF_BACKEND không hợp lệ: {backend!r} (chọn trong {CF_BACKENDS})")
@@ -0,0 +1,50 @@
+# @title Cấu hình dùng chung của các entry point (đọc từ biến môi trường)
+# ==============================================================================
+# train, tune, serve, update, materialize đều lấy thông tin CSDL và thư mục mô hình
+# ở đây thay vì tự khai báo trong từng script:
+#   RECOMMENDER_DB_URI                 chuỗi kết nối SQLAlchemy đầy đủ (ưu tiên), hoặc
+#   RECOMMENDER_DB_USER / _PASSWORD / _HOST / _PORT / _NAME  để ghép chuỗi MySQL
+#   RECOMMENDER_MODEL_DIR              thư mục gói mô hình (mặc định saved_models)
+# Module không nhập SQLAlchemy và không mở kết nối khi import: engine chỉ được tạo khi
+# entry point gọi create_database_engine().
+# ==============================================================================
+import os
+from urllib.parse import quote_plus
+
+DEFAULT_DB_USER = 'root'
+DEFAULT_DB_HOST = 'localhost'
+DEFAULT_DB_PORT = '3306'
+DEFAULT_DB_NAME = 'websellproduct'
+
+MODEL_DIR = os.environ.get('RECOMMENDER_MODEL_DIR', 'saved_models')
+INTERACTIONS_SNAPSHOT_FILENAME = 'interactions_snapshot.npz'
+
+
+def parse_values(text, cast, default):
+    """Đọc danh sách giá trị phân tách bằng dấu phẩy (ví dụ từ biến môi trường)."""
+    if not text:
+        return tuple(default)
+    return tuple(cast(value) for value in text.split(',') if value.strip())
+
+
+def database_uri():
+    """Chuỗi kết nối CSDL: RECOMMENDER_DB_URI, hoặc MySQL ghép từ các biến RECOMMENDER_DB_*."""
+    uri = os.environ.get('RECOMMENDER_DB_URI')
+    if uri:
+        return uri
+    user = quote_plus(os.environ.get('RECOMMENDER_DB_USER', DEFAULT_DB_USER))
+    password = quote_plus(os.environ.get('RECOMMENDER_DB_PASSWORD', ''))
+    host = os.environ.get('RECOMMENDER_DB_HOST', DEFAULT_DB_HOST)
+    port = os.environ.get('RECOMMENDER_DB_PORT', DEFAULT_DB_PORT)
+    name = os.environ.get('RECOMMENDER_DB_NAME', DEFAULT_DB_NAME)
+    return f"mysql+mysqlconnector://{user}:{password}@{host}:{port}/{name}"
+
+
+def create_database_engine(db_uri=None):
+    """Engine SQLAlchemy cho các job huấn luyện/cập nhật (kết nối mở khi truy vấn đầu tiên)."""
+    from sqlalchemy import create_engine
+    return create_engine(db_uri or database_uri())
+
+
+def interactions_snapshot_path(model_dir=None):
+    return os.path.join(model_dir or MODEL_DIR, INTERACTIONS_SNAPSHOT_FILENAME)
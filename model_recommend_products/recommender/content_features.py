@@ -0,0 +1,170 @@
+# @title Đặc trưng nội dung thưa cho CBF (danh mục, khoảng giá, TF-IDF tên sản phẩm)
+# ==============================================================================
+# Đặc trưng sản phẩm gồm hai phần trong cùng một không gian cột:
+#   - Nhóm chỉ số: mỗi sản phẩm thuộc đúng một cột (giá trị 1) trong mỗi nhóm, ví dụ
+#     danh mục, khoảng giá. Lưu là mảng items×nhóm các số cột (-1 nếu không có).
+#     Điểm CBF phần này = trọng số hồ sơ người dùng tại cột đó: tra theo chỉ số,
+#     không cần nhân ma trận users×items.
+#   - Phần thưa có trọng số (CSR items×cột), ví dụ TF-IDF của tên sản phẩm: điểm là
+#     tích thưa, chi phí theo số phần tử khác 0.
+# Hồ sơ người dùng = ma trận tương tác (CSR) × đặc trưng (CSR), cũng lưu dạng CSR.
+# ==============================================================================
+import numpy as np
+import scipy.sparse as sp
+
+DEFAULT_PRICE_BUCKETS = 5
+DEFAULT_MAX_TEXT_FEATURES = 5000
+DEFAULT_TEXT_WEIGHT = 1.0
+CONTENT_FEATURE_GROUPS = ('category', 'price', 'name')
+DEFAULT_FEATURE_GROUPS = ('category',)
+
+
+class ContentFeatures:
+    """Đặc trưng sản phẩm: các nhóm chỉ số (cột [offsets[g], offsets[g+1])) và phần thưa."""
+
+    def __init__(self, index, offsets, sparse):
+        self.index = np.asarray(index).reshape(len(index), -1)
+        self.offsets = np.asarray(offsets)
+        self.sparse = sp.csr_matrix(sparse)
+
+    @property
+    def n_items(self):
+        return self.sparse.shape[0]
+
+    @property
+    def n_features(self):
+        return self.sparse.shape[1]
+
+    @property
+    def n_index_columns(self):
+        return int(self.offsets[-1])
+
+    @classmethod
+    def from_dense(cls, features):
+        """Từ ma trận dày items×cột (ví dụ one-hot danh mục cũ); hàng đúng một số 1 thành nhóm chỉ số."""
+        features = np.asarray(features, dtype=np.float64)
+        nonzero = (features != 0).sum(axis=1)
+        one_hot = np.all((nonzero == 0) | ((nonzero == 1) & (features.max(axis=1) == 1)))
+        if one_hot:
+            index = np.where(nonzero == 1, features.argmax(axis=1), -1)
+            return cls(index[:, None], [0, features.shape[1]], sp.csr_matrix(features.shape))
+        return cls(np.empty((len(features), 0), dtype=np.int64), [0], sp.csr_matrix(features))
+
+    def matrix(self, items=None):
+        """Đặc trưng dạng CSR items×cột (nhóm chỉ số thành các số 1) của các sản phẩm `items`
+        (mặc định tất cả)."""
+        index = self.index if items is None else self.index[items]
+        sparse = self.sparse if items is None else self.sparse[items]
+        rows, groups = np.nonzero(index >= 0)
+        one_hot = sp.csr_matrix((np.ones(len(rows)), (rows, index[rows, groups])), shape=sparse.shape)
+        return (one_hot + sparse).tocsr()
+
+    def profiles(self, interactions):
+        """Hồ sơ người dùng CSR users×cột = tương tác × đặc trưng."""
+        return sp.csr_matrix(sp.csr_matrix(interactions) @ self.matrix())
+
+    def group_columns(self, group=0):
+        """Cột của từng sản phẩm trong nhóm `group`, đánh số lại từ 0 (-1 nếu không có)."""
+        columns = self.index[:, group]
+        return np.where(columns >= 0, columns - self.offsets[group], -1)
+
+    def index_weights(self, profiles, rows):
+        """Trọng số hồ sơ tại các cột nhóm chỉ số (dày rows×(cột+1)), đọc thẳng từ mảng CSR.
+
+        Cột cuối luôn bằng 0 để chỉ số -1 (sản phẩm không thuộc nhóm) cho điểm 0.
+        """
+        weights = np.zeros((len(rows), self.n_index_columns + 1))
+        starts = profiles.indptr[rows]
+        counts = profiles.indptr[rows + 1] - starts
+        positions = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+        columns = profiles.indices[positions]
+        keep = columns < self.n_index_columns
+        weights[np.repeat(np.arange(len(rows)), counts)[keep], columns[keep]] = profiles.data[positions[keep]]
+        return weights
+
+    def scores(self, profiles, rows, cols=None):
+        """Điểm CBF thô (hồ sơ × đặc trưngᵀ) của các hàng `rows` trong hồ sơ CSR `profiles`,
+        trên các sản phẩm `cols` (mặc định tất cả)."""
+        rows = np.asarray(rows, dtype=np.intp)
+        index = self.index if cols is None else self.index[cols]
+        weights = self.index_weights(profiles, rows)
+        if index.shape[1]:
+            scores = np.take(weights, index[:, 0], axis=1)
+            for group in range(1, index.shape[1]):
+                scores += np.take(weights, index[:, group], axis=1)
+        else:
+            scores = np.zeros((len(rows), len(index)))
+        if self.sparse.nnz:
+            sparse = self.sparse if cols is None else self.sparse[cols]
+            scores += (profiles[rows] @ sparse.T).toarray()
+        return scores
+
+    def row_scores(self, profiles, rows, cols):
+        """Điểm CBF thô của hàng rows[i] trên các sản phẩm cols[i] (`cols` dạng rows×m: mỗi
+        hàng một tập cột riêng), không dựng lưới rows×toàn bộ sản phẩm."""
+        rows = np.asarray(rows, dtype=np.intp)
+        cols = np.asarray(cols, dtype=np.intp)
+        weights = self.index_weights(profiles, rows)
+        row_positions = np.arange(len(rows))[:, None]
+        scores = np.zeros(cols.shape)
+        for group in range(self.index.shape[1]):
+            scores += weights[row_positions, self.index[cols, group]]
+        if self.sparse.nnz:
+            pairs = profiles[np.repeat(rows, cols.shape[1])].multiply(self.sparse[cols.ravel()])
+            scores += np.asarray(pairs.sum(axis=1)).reshape(cols.shape)
+        return scores
+
+    def to_arrays(self):
+        return {
+            'feature_index': self.index, 'feature_offsets': self.offsets,
+            'feature_indptr': self.sparse.indptr, 'feature_indices': self.sparse.indices,
+            'feature_data': self.sparse.data, 'feature_shape': np.asarray(self.sparse.shape),
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        sparse = sp.csr_matrix(
+            (arrays['feature_data'], arrays['feature_indices'], arrays['feature_indptr']),
+            shape=tuple(int(n) for n in arrays['feature_shape']))
+        return cls(arrays['feature_index'], arrays['feature_offsets'], sparse)
+
+
+def build_content_features(products_df, item_ids, groups=DEFAULT_FEATURE_GROUPS, category_column='category',
+                           price_column='price', name_column='product_name',
+                           n_price_buckets=DEFAULT_PRICE_BUCKETS, max_text_features=DEFAULT_MAX_TEXT_FEATURES,
+                           text_weight=DEFAULT_TEXT_WEIGHT):
+    """Dựng đặc trưng cho các sản phẩm `item_ids` (theo thứ tự cột của ma trận tương tác).
+
+    `groups` chọn trong CONTENT_FEATURE_GROUPS: 'category' (one-hot danh mục, giống
+    pd.get_dummies), 'price' (khoảng giá theo phân vị), 'name' (TF-IDF tên sản phẩm,
+    nhân `text_weight`). Sản phẩm không có trong `products_df` không có đặc trưng nào.
+    """
+    import pandas as pd
+    unknown = set(groups) - set(CONTENT_FEATURE_GROUPS)
+    if unknown:
+        raise ValueError(f"Nhóm đặc trưng không hợp lệ: {sorted(unknown)}")
+    products = products_df.drop_duplicates('product_id').set_index('product_id').reindex(item_ids)
+
+    index_groups, offsets = [], [0]
+    if 'category' in groups:
+        codes = pd.Categorical(products[category_column]).codes  # danh mục sắp theo tên, NaN -> -1
+        index_groups.append(codes)
+        offsets.append(offsets[-1] + int(codes.max()) + 1 if len(codes) else offsets[-1])
+    if 'price' in groups:
+        prices = pd.to_numeric(products[price_column], errors='coerce')
+        buckets = pd.qcut(prices, n_price_buckets, labels=False, duplicates='drop')
+        codes = buckets.fillna(-1).to_numpy(dtype=np.int64)
+        index_groups.append(codes)
+        offsets.append(offsets[-1] + int(codes.max()) + 1 if len(codes) else offsets[-1])
+    index = np.column_stack([np.where(codes >= 0, codes + start, -1)
+                             for codes, start in zip(index_groups, offsets)]) if index_groups \
+        else np.empty((len(item_ids), 0), dtype=np.int64)
+
+    n_index_columns = offsets[-1]
+    sparse = sp.csr_matrix((len(item_ids), n_index_columns))
+    if 'name' in groups:
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        names = products[name_column].fillna('').astype(str)
+        text = TfidfVectorizer(max_features=max_text_features).fit_transform(names) * text_weight
+        sparse = sp.hstack([sparse, text], format='csr')
+    return ContentFeatures(index, offsets, sparse)
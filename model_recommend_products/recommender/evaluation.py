@@ -0,0 +1,73 @@
+# @title Đánh giá top-k theo lô (precision, recall, NDCG, coverage)
+# ==============================================================================
+# Thay cho vòng lặp từng người dùng (.loc, mặt nạ boolean, sort_values, giao tập
+# hợp), người dùng được đánh giá theo từng khối hàng:
+#   - điểm của cả khối tính bằng một phép nhân ma trận (hàm `score_rows`),
+#   - sản phẩm đã biết (tập huấn luyện) bị gán -inf qua chỉ số CSR,
+#   - top-k lấy bằng argpartition, số lần trúng đọc từ ma trận thưa của tập đánh giá.
+# ==============================================================================
+import numpy as np
+import scipy.sparse as sp
+
+from .interactions import build_interaction_matrix
+from .scoring_engine import BATCH_BLOCK_SIZE, top_k_indices
+
+METRIC_NAMES = ('precision', 'recall', 'ndcg', 'coverage')
+
+
+def holdout_matrix(holdout_df, all_user_ids, all_product_ids):
+    """Ma trận CSR nhị phân users×items của các cặp (user, sản phẩm) trong tập đánh giá."""
+    matrix, _, _ = build_interaction_matrix(
+        holdout_df['user_id'].to_numpy(), holdout_df['product_id'].to_numpy(),
+        np.ones(len(holdout_df)), all_user_ids, all_product_ids,
+    )
+    matrix.data[:] = 1.0
+    return matrix
+
+
+def mask_known(scores, known, rows):
+    """Gán -inf (tại chỗ) cho các sản phẩm đã biết của từng hàng `rows` trong ma trận CSR `known`."""
+    block = known[rows]
+    scores[np.repeat(np.arange(len(rows)), np.diff(block.indptr)), block.indices] = -np.inf
+    return scores
+
+
+def evaluate_top_k(score_rows, known, holdout, k=10, block_size=BATCH_BLOCK_SIZE):
+    """Tính trung bình precision@k, recall@k, NDCG@k và coverage của danh sách top-k.
+
+    `score_rows(rows)` trả về ma trận điểm (len(rows)×items) cho các chỉ số hàng;
+    `known` và `holdout` là CSR users×items cùng hàng/cột. Chỉ những người dùng có
+    ít nhất một sản phẩm trong `holdout` được tính. Precision luôn chia cho k.
+    """
+    known = sp.csr_matrix(known)
+    holdout = sp.csr_matrix(holdout)
+    n_items = holdout.shape[1]
+    eval_rows = np.flatnonzero(np.diff(holdout.indptr))
+    if len(eval_rows) == 0 or k <= 0:
+        return dict.fromkeys(METRIC_NAMES, 0.0)
+
+    discounts = 1.0 / np.log2(np.arange(2, k + 2))
+    ideal_dcg = np.cumsum(discounts)
+    sums = dict.fromkeys(('precision', 'recall', 'ndcg'), 0.0)
+    recommended = np.zeros(n_items, dtype=bool)
+
+    for start in range(0, len(eval_rows), block_size):
+        rows = eval_rows[start:start + block_size]
+        scores = mask_known(np.asarray(score_rows(rows), dtype=np.float64), known, rows)
+        top_cols = top_k_indices(scores, k)
+        valid = np.isfinite(np.take_along_axis(scores, top_cols, axis=1))
+
+        truth = holdout[rows]
+        hits = (np.take_along_axis(truth.toarray(), top_cols, axis=1) > 0) & valid
+        n_hits = hits.sum(axis=1)
+        n_true = np.diff(truth.indptr)
+
+        sums['precision'] += (n_hits / k).sum()
+        sums['recall'] += (n_hits / n_true).sum()
+        dcg = hits @ discounts[:top_cols.shape[1]]
+        sums['ndcg'] += (dcg / ideal_dcg[np.minimum(n_true, k) - 1]).sum()
+        recommended[top_cols[valid]] = True
+
+    metrics = {name: total / len(eval_rows) for name, total in sums.items()}
+    metrics['coverage'] = recommended.sum() / n_items
+    return metrics
@@ -0,0 +1,268 @@
+# @title Ma trận tương tác user-item dạng thưa (CSR)
+# ==============================================================================
+# Dữ liệu mua hàng có hơn 99% là số 0, nên ma trận user-item được dựng trực tiếp
+# dưới dạng scipy.sparse CSR từ các dòng (user_id, product_id, quantity) với id đã
+# mã hóa thành số nguyên liên tục. Bộ nhớ và thời gian tăng theo số lượt mua chứ
+# không theo users×products.
+# ==============================================================================
+import os
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from sqlalchemy import text
+
+
+def encode_ids(values, id_values):
+    """Mã hóa `values` thành chỉ số trong `id_values` (đã sắp xếp); không tìm thấy thì -1."""
+    values = np.asarray(values)
+    if len(id_values) == 0:
+        return np.full(values.shape, -1, dtype=np.int64)
+    positions = np.searchsorted(id_values, values)
+    positions = np.minimum(positions, len(id_values) - 1)
+    return np.where(id_values[positions] == values, positions, -1)
+
+
+def build_interaction_matrix(user_ids, product_ids, quantities, all_user_ids=None, all_product_ids=None,
+                             dtype=np.float64):
+    """Dựng ma trận CSR users×items, cộng dồn số lượng của các cặp (user, product) trùng nhau.
+
+    Trả về (matrix, user_index, item_index) với user_index/item_index là mảng id đã sắp xếp:
+    hàng i ứng với user_index[i], cột j ứng với item_index[j]. Các dòng có id nằm ngoài
+    `all_user_ids`/`all_product_ids` (nếu được truyền vào) bị bỏ qua.
+    """
+    user_ids = np.asarray(user_ids)
+    product_ids = np.asarray(product_ids)
+    user_index = np.unique(user_ids) if all_user_ids is None else np.unique(all_user_ids)
+    item_index = np.unique(product_ids) if all_product_ids is None else np.unique(all_product_ids)
+
+    rows = encode_ids(user_ids, user_index)
+    cols = encode_ids(product_ids, item_index)
+    valid = (rows >= 0) & (cols >= 0)
+
+    matrix = sp.coo_matrix(
+        (np.asarray(quantities, dtype=dtype)[valid], (rows[valid], cols[valid])),
+        shape=(len(user_index), len(item_index)),
+    ).tocsr()
+    matrix.sum_duplicates()
+    matrix.eliminate_zeros()
+    return matrix, user_index, item_index
+
+
+def interaction_matrix_from_frame(ratings_df, all_user_ids=None, all_product_ids=None):
+    """Tiện ích cho DataFrame có các cột user_id, product_id, quantity."""
+    return build_interaction_matrix(
+        ratings_df['user_id'].to_numpy(), ratings_df['product_id'].to_numpy(),
+        ratings_df['quantity'].to_numpy(), all_user_ids, all_product_ids,
+    )
+
+
+# ==============================================================================
+# ĐỌC DỮ LIỆU TƯƠNG TÁC THEO LUỒNG (STREAMING) TỪ MYSQL
+# ==============================================================================
+# Các dòng `order_items JOIN orders` được đọc theo từng khối bằng con trỏ phía máy
+# chủ (stream_results) và cộng dồn ngay vào các mảng số nguyên gọn:
+#   - khóa (user_id << 32 | product_id) -> tổng số lượng
+#   - khóa (ngày << 32 | product_id)    -> tổng số lượng bán trong ngày (cho bảng bán chạy)
+# Mốc thời gian (watermark) là created_at lớn nhất đã đọc. Lần chạy sau chỉ đọc các đơn có
+# created_at > watermark - INCREMENTAL_OVERLAP: đơn commit muộn (giao dịch dài, giờ lấy ở
+# phía ứng dụng) có thể mang created_at <= watermark. Id các đơn đã cộng trong cửa sổ chồng
+# lấn được lưu cùng ảnh chụp, nên đơn đọc lại không bị cộng hai lần.
+SQL_INTERACTIONS = """
+SELECT
+    o.id AS order_id,
+    o.user_id,
+    oi.product_id,
+    oi.quantity,
+    o.created_at
+FROM
+    order_items AS oi
+JOIN
+    orders AS o ON oi.order_id = o.id
+"""
+INGEST_CHUNK_SIZE = 50000
+# Đơn commit muộn hơn khoảng này so với created_at của nó vẫn bị bỏ lỡ
+INCREMENTAL_OVERLAP = pd.Timedelta(seconds=float(os.environ.get('INTERACTIONS_OVERLAP_SECONDS', '3600')))
+ID_BITS = 32
+ID_MASK = (1 << ID_BITS) - 1
+
+
+def _aggregate(keys, quantities):
+    """Cộng dồn số lượng theo khóa; trả về (khóa duy nhất đã sắp xếp, tổng số lượng)."""
+    unique_keys, inverse = np.unique(keys, return_inverse=True)
+    totals = np.bincount(inverse, weights=quantities, minlength=len(unique_keys))
+    return unique_keys, totals.astype(np.int64)
+
+
+def _merge_parts(parts):
+    return _aggregate(np.concatenate([keys for keys, _ in parts]),
+                      np.concatenate([quantities for _, quantities in parts]))
+
+
+class InteractionAccumulator:
+    """Cộng dồn số lượng mua theo (user_id, product_id) và theo (ngày, product_id) qua từng khối.
+
+    `order_ids`/`order_times`: các đơn đã cộng có created_at trong cửa sổ chồng lấn (sau
+    `read_since()`), để lần đọc tăng dần sau bỏ qua chúng. `tracked_since`: ảnh chụp cũ chưa
+    lưu id đơn thì không đọc lại trước mốc này (không biết đơn nào đã được cộng).
+    """
+
+    def __init__(self, pair_keys=None, pair_quantities=None, day_keys=None, day_quantities=None,
+                 watermark=None, order_ids=None, order_times=None, tracked_since=None,
+                 overlap=INCREMENTAL_OVERLAP):
+        empty = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64))
+        self._pairs = [(np.asarray(pair_keys), np.asarray(pair_quantities))] if pair_keys is not None else [empty]
+        self._days = [(np.asarray(day_keys), np.asarray(day_quantities))] if day_keys is not None else [empty]
+        self.watermark = pd.Timestamp(watermark) if watermark else None
+        self.order_ids = np.asarray(order_ids if order_ids is not None else [], dtype=np.int64)
+        self.order_times = np.asarray(order_times if order_times is not None else [], dtype='datetime64[ns]')
+        self.tracked_since = pd.Timestamp(tracked_since) if tracked_since else None
+        self.overlap = overlap
+        self._new_orders = []
+        self.rows_read = 0
+
+    def read_since(self):
+        """Mốc dưới của lần đọc tăng dần (None: đọc toàn bộ)."""
+        if self.watermark is None:
+            return None
+        since = self.watermark - self.overlap
+        return max(since, self.tracked_since) if self.tracked_since is not None else since
+
+    def incremental(self):
+        """Bộ tích lũy rỗng để đọc phần đơn mới của bộ này (cùng watermark và các đơn đã cộng)."""
+        return InteractionAccumulator(watermark=self.watermark, order_ids=self.order_ids,
+                                      order_times=self.order_times, tracked_since=self.tracked_since,
+                                      overlap=self.overlap)
+
+    @staticmethod
+    def _compact(parts):
+        """Gộp các phần khi phần mới tích lũy đủ lớn, giữ chi phí cộng dồn tuyến tính theo tổng số dòng."""
+        pending = sum(len(keys) for keys, _ in parts[1:])
+        if pending < max(len(parts[0][0]), INGEST_CHUNK_SIZE):
+            return parts
+        return [_merge_parts(parts)]
+
+    def add_chunk(self, chunk):
+        """Thêm một khối DataFrame (user_id, product_id, quantity, created_at)."""
+        chunk = chunk.dropna(subset=['user_id', 'product_id', 'quantity'])
+        if 'order_id' in chunk:
+            # Đơn đã cộng ở lần đọc trước (đọc lại trong cửa sổ chồng lấn)
+            chunk = chunk[~np.isin(chunk['order_id'].to_numpy(dtype=np.int64), self.order_ids)]
+        if chunk.empty:
+            return
+        user_ids = chunk['user_id'].to_numpy(dtype=np.int64)
+        product_ids = chunk['product_id'].to_numpy(dtype=np.int64)
+        quantities = chunk['quantity'].to_numpy(dtype=np.int64)
+        created_at = pd.to_datetime(chunk['created_at'])
+        days = created_at.to_numpy(dtype='datetime64[D]').astype(np.int64)
+
+        self._pairs.append(_aggregate((user_ids << ID_BITS) | product_ids, quantities))
+        self._days.append(_aggregate((days << ID_BITS) | product_ids, quantities))
+        self._pairs = self._compact(self._pairs)
+        self._days = self._compact(self._days)
+
+        if 'order_id' in chunk:
+            # Chỉ ghi nhận sau khi đọc xong (finish_read): dòng của cùng một đơn có thể nằm ở khối sau
+            self._new_orders.append((chunk['order_id'].to_numpy(dtype=np.int64),
+                                     created_at.to_numpy(dtype='datetime64[ns]')))
+        chunk_max = created_at.max()
+        if self.watermark is None or chunk_max > self.watermark:
+            self.watermark = chunk_max
+        self.rows_read += len(chunk)
+
+    def finish_read(self):
+        """Ghi nhận các đơn vừa đọc và chỉ giữ các đơn còn trong cửa sổ chồng lấn của watermark mới."""
+        order_ids = np.concatenate([self.order_ids] + [ids for ids, _ in self._new_orders])
+        order_times = np.concatenate([self.order_times] + [times for _, times in self._new_orders])
+        self._new_orders = []
+        since = self.read_since()
+        if since is not None:
+            keep = order_times > np.datetime64(since.to_datetime64(), 'ns')
+            order_ids, order_times = order_ids[keep], order_times[keep]
+        self.order_ids, positions = np.unique(order_ids, return_index=True)
+        self.order_times = order_times[positions]
+
+    def merge(self, other):
+        """Cộng dồn một bộ tích lũy khác (ví dụ phần đơn hàng mới từ `incremental()`) vào bộ này."""
+        self._pairs = self._compact(self._pairs + other._pairs)
+        self._days = self._compact(self._days + other._days)
+        if other.watermark is not None and (self.watermark is None or other.watermark > self.watermark):
+            self.watermark = other.watermark
+        self.order_ids = np.concatenate([self.order_ids, other.order_ids])
+        self.order_times = np.concatenate([self.order_times, other.order_times])
+        self.finish_read()
+        self.rows_read += other.rows_read
+        return self
+
+    def _merged(self, attr):
+        parts = getattr(self, attr)
+        if len(parts) > 1:
+            parts = [_merge_parts(parts)]
+            setattr(self, attr, parts)
+        return parts[0]
+
+    def to_frame(self):
+        """Tương tác đã cộng dồn: DataFrame (user_id, product_id, quantity), mỗi cặp một dòng."""
+        keys, quantities = self._merged('_pairs')
+        return pd.DataFrame({'user_id': keys >> ID_BITS, 'product_id': keys & ID_MASK, 'quantity': quantities})
+
+    def daily_sales_frame(self):
+        """Số lượng bán theo ngày: DataFrame (product_id, created_at, quantity) cho bảng bán chạy."""
+        keys, quantities = self._merged('_days')
+        return pd.DataFrame({
+            'product_id': keys & ID_MASK,
+            'created_at': (keys >> ID_BITS).astype('datetime64[D]'),
+            'quantity': quantities,
+        })
+
+    def save(self, path):
+        pair_keys, pair_quantities = self._merged('_pairs')
+        day_keys, day_quantities = self._merged('_days')
+        np.savez(path, pair_keys=pair_keys, pair_quantities=pair_quantities,
+                 day_keys=day_keys, day_quantities=day_quantities,
+                 watermark=np.array(self.watermark.isoformat() if self.watermark is not None else ''),
+                 order_ids=self.order_ids, order_times=self.order_times.astype(np.int64),
+                 tracked_since=np.array(self.tracked_since.isoformat() if self.tracked_since is not None else ''))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            watermark = str(data['watermark']) or None
+            if 'order_ids' not in data.files:
+                # Ảnh chụp cũ không có id đơn: không đọc lại trước watermark của nó
+                return cls(data['pair_keys'], data['pair_quantities'], data['day_keys'], data['day_quantities'],
+                           watermark, tracked_since=watermark)
+            return cls(data['pair_keys'], data['pair_quantities'], data['day_keys'], data['day_quantities'],
+                       watermark, data['order_ids'], data['order_times'].astype('datetime64[ns]'),
+                       str(data['tracked_since']) or None)
+
+
+def stream_interactions(engine, accumulator=None, chunksize=INGEST_CHUNK_SIZE):
+    """Đọc các dòng tương tác theo khối (con trỏ phía máy chủ) và cộng dồn vào `accumulator`.
+
+    Nếu `accumulator` đã có watermark, chỉ đọc các đơn hàng tạo sau `read_since()` và bỏ qua
+    các đơn nó đã cộng.
+    """
+    accumulator = accumulator if accumulator is not None else InteractionAccumulator()
+    sql = SQL_INTERACTIONS
+    params = {}
+    since = accumulator.read_since()
+    if since is not None:
+        sql += "WHERE o.created_at > :updated_since\n"
+        params['updated_since'] = since.to_pydatetime()
+
+    with engine.connect() as connection:
+        connection = connection.execution_options(stream_results=True, max_row_buffer=chunksize)
+        for chunk in pd.read_sql(text(sql), connection, params=params, chunksize=chunksize):
+            accumulator.add_chunk(chunk)
+    accumulator.finish_read()
+    return accumulator
+
+
+def load_interactions(engine, snapshot_path=None, chunksize=INGEST_CHUNK_SIZE):
+    """Nạp ảnh chụp tương tác đã cộng dồn (nếu có) rồi chỉ đọc thêm các đơn mới sau watermark."""
+    if snapshot_path and os.path.exists(snapshot_path):
+        accumulator = InteractionAccumulator.load(snapshot_path)
+    else:
+        accumulator = InteractionAccumulator()
+    return stream_interactions(engine, accumulator, chunksize)
@@ -0,0 +1,104 @@
+# @title Chỉ mục sản phẩm lân cận (item-to-item) tính sẵn khi huấn luyện
+# ==============================================================================
+# Bảng top-N sản phẩm tương tự được tính một lần từ các vector đặc tính sản phẩm
+# (Feature_1..k của df_final_q) đã chuẩn hóa L2, nên độ tương đồng cosine chỉ là
+# tích vô hướng. Khi phục vụ, tra cứu là O(1); chỉ khi sản phẩm được thêm sau lúc
+# huấn luyện hoặc cần nhiều hơn N lân cận mới phải quét theo từng khối sản phẩm.
+# ==============================================================================
+import numpy as np
+
+from .model_bundle import IdRowMap
+from .scoring_engine import top_k_indices
+
+DEFAULT_TOP_N = 50
+DEFAULT_BLOCK_SIZE = 1024
+
+
+def normalize_rows(vectors):
+    """Chuẩn hóa L2 từng hàng; hàng toàn 0 giữ nguyên (giống cosine_similarity)."""
+    vectors = np.asarray(vectors, dtype=np.float64)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class ItemNeighborIndex:
+    """Bảng top-N sản phẩm tương tự cùng các vector đặc tính đã chuẩn hóa."""
+
+    def __init__(self, item_ids, item_vectors, neighbor_cols, neighbor_scores,
+                 block_size=DEFAULT_BLOCK_SIZE):
+        self.item_ids = np.asarray(item_ids)
+        self.item_vectors = np.asarray(item_vectors)
+        self.neighbor_cols = np.asarray(neighbor_cols)
+        self.neighbor_scores = np.asarray(neighbor_scores)
+        self.block_size = block_size
+        self.item_index = IdRowMap(self.item_ids)
+
+    @classmethod
+    def build(cls, item_ids, item_factors, top_n=DEFAULT_TOP_N, block_size=DEFAULT_BLOCK_SIZE):
+        """Tính bảng lân cận bằng tích ma trận theo từng khối `block_size` sản phẩm."""
+        item_vectors = normalize_rows(item_factors)
+        n_items = len(item_vectors)
+        top_n = max(0, min(top_n, n_items - 1))
+        neighbor_cols = np.empty((n_items, top_n), dtype=np.int32)
+        neighbor_scores = np.empty((n_items, top_n), dtype=np.float32)
+
+        for start in range(0, n_items, block_size):
+            stop = min(start + block_size, n_items)
+            similarity = item_vectors[start:stop] @ item_vectors.T
+            # Loại chính sản phẩm đó khỏi danh sách lân cận của nó
+            similarity[np.arange(stop - start), np.arange(start, stop)] = -np.inf
+            top_cols = top_k_indices(similarity, top_n)
+            neighbor_cols[start:stop] = top_cols
+            neighbor_scores[start:stop] = np.take_along_axis(similarity, top_cols, axis=1)
+
+        return cls(item_ids, item_vectors, neighbor_cols, neighbor_scores, block_size)
+
+    def to_arrays(self):
+        return {
+            'item_ids': self.item_ids, 'item_vectors': self.item_vectors,
+            'neighbor_cols': self.neighbor_cols, 'neighbor_scores': self.neighbor_scores,
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        return cls(**arrays)
+
+    @property
+    def top_n(self):
+        return self.neighbor_cols.shape[1]
+
+    def has_item(self, product_id):
+        return product_id in self.item_index
+
+    def add_items(self, item_ids, item_factors):
+        """Thêm sản phẩm mới sau huấn luyện; chúng được phục vụ qua đường quét theo khối."""
+        new_vectors = normalize_rows(item_factors)
+        self.item_ids = np.concatenate([self.item_ids, np.asarray(item_ids)])
+        self.item_vectors = np.vstack([self.item_vectors, new_vectors])
+        self.item_index = IdRowMap(self.item_ids)
+
+    def similar_items(self, product_id, num_similar):
+        """Trả về (product_ids, similarity_scores) của các sản phẩm tương tự nhất."""
+        # Số âm cắt mảng từ cuối (trả top_n-1 sản phẩm), nên coi như không lấy sản phẩm nào
+        num_similar = max(num_similar, 0)
+        col = self.item_index[product_id]
+        if col < len(self.neighbor_cols) and num_similar <= self.top_n:
+            top_cols = self.neighbor_cols[col, :num_similar]
+            return self.item_ids[top_cols], self.neighbor_scores[col, :num_similar].astype(np.float64)
+        return self._scan_similar(col, num_similar)
+
+    def _scan_similar(self, col, num_similar):
+        """Đường dự phòng: quét toàn bộ vector sản phẩm theo từng khối."""
+        target = self.item_vectors[col]
+        best_cols = np.empty(0, dtype=np.intp)
+        best_scores = np.empty(0)
+        for start in range(0, len(self.item_vectors), self.block_size):
+            block_scores = self.item_vectors[start:start + self.block_size] @ target
+            block_cols = np.arange(start, start + len(block_scores))
+            keep = block_cols != col
+            merged_cols = np.concatenate([best_cols, block_cols[keep]])
+            merged_scores = np.concatenate([best_scores, block_scores[keep]])
+            top = top_k_indices(merged_scores, num_similar)
+            best_cols, best_scores = merged_cols[top], merged_scores[top]
+        return self.item_ids[best_cols], best_scores
@@ -0,0 +1,49 @@
+# ==============================================================================
+# TÍNH SẴN GỢI Ý CHO TOÀN BỘ NGƯỜI DÙNG (CHẠY HẰNG ĐÊM)
+# ==============================================================================
+# Chấm điểm mọi người dùng của gói mô hình CURRENT song song theo từng khối và ghi
+# top-N vào saved_models/materialized/ (xem materialized_recommendations.py). API tự
+# nạp phiên bản mới và phục vụ /recommendations/user từ đó khi bản tính sẵn còn mới và
+# được tính từ đúng phiên bản mô hình đang phục vụ; sau `recommender update` hãy chạy lại
+# lệnh này nếu muốn tiếp tục phục vụ từ bản tính sẵn.
+# Ví dụ crontab (2 giờ sáng, sau lần huấn luyện đầy đủ):
+#   0 2 * * * cd /path/to/model_recommend_products && python -m recommender materialize
+# Cấu hình qua biến môi trường:
+#   MATERIALIZE_TOP_N=50  MATERIALIZE_ALPHA=0.5  MATERIALIZE_WORKERS=0 (mọi lõi)  MATERIALIZE_BLOCK_SIZE=512
+# ==============================================================================
+import os
+import sys
+import time
+
+from . import config
+from .materialized_recommendations import (DEFAULT_ALPHA, DEFAULT_TOP_N, MATERIALIZED_DIRNAME,
+                                           materialize)
+from .model_bundle import load_bundle, read_current_version
+from .scoring_engine import BATCH_BLOCK_SIZE, HybridScoringEngine
+
+
+def main():
+    model_dir = config.MODEL_DIR
+    top_n = int(os.environ.get('MATERIALIZE_TOP_N', DEFAULT_TOP_N))
+    alpha = float(os.environ.get('MATERIALIZE_ALPHA', DEFAULT_ALPHA))
+    n_workers = int(os.environ.get('MATERIALIZE_WORKERS', '0')) or None
+    block_size = int(os.environ.get('MATERIALIZE_BLOCK_SIZE', BATCH_BLOCK_SIZE))
+
+    start_time = time.perf_counter()
+    print("--- TÍNH SẴN GỢI Ý CHO TOÀN BỘ NGƯỜI DÙNG ---")
+
+    version = read_current_version(model_dir)
+    if version is None:
+        print("❌ Chưa có gói mô hình. Hãy chạy `python -m recommender train` trước.")
+        sys.exit(1)
+
+    scoring_engine = load_bundle(model_dir, version, {'scoring_engine': HybridScoringEngine}).scoring_engine
+    materialized_version = materialize(
+        scoring_engine, os.path.join(model_dir, MATERIALIZED_DIRNAME), top_n=top_n, alpha=alpha,
+        n_workers=n_workers, block_size=block_size, source_version=version)
+    print(f"✅ Đã ghi top-{top_n} (alpha={alpha}) của {len(scoring_engine.user_ids)} người dùng từ mô hình {version} "
+          f"thành phiên bản {materialized_version} trong {time.perf_counter() - start_time:.2f}s.")
+
+
+if __name__ == '__main__':
+    main()
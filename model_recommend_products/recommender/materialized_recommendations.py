@@ -0,0 +1,145 @@
+# @title Gợi ý tính sẵn hằng đêm: top-N của mọi người dùng trong file cố định độ rộng (mmap)
+# ==============================================================================
+# `python -m recommender materialize` (chạy theo lịch, ví dụ mỗi đêm) chấm điểm toàn bộ
+# người dùng của gói mô hình CURRENT theo từng khối hàng trên một pool tiến trình
+# (fork), ghi thẳng vào hai mảng .npy dạng memmap nên bộ nhớ chỉ phụ thuộc kích thước
+# khối, không phụ thuộc số người dùng:
+#   saved_models/materialized/
+#     CURRENT, bundles/<version>/manifest.json   <- cùng định dạng với model_bundle
+#     bundles/<version>/top_n/top_cols.npy       <- users×N int32 (cột sản phẩm, -1 nếu thiếu)
+#     bundles/<version>/top_n/top_scores.npy     <- users×N float32
+# API tra hàng của người dùng (searchsorted) và trả kết quả nếu bản tính sẵn còn dùng được
+# (tính từ đúng phiên bản mô hình đang phục vụ, tuổi <= max_age, cùng alpha, num_recs <= N);
+# ngược lại chấm điểm trực tiếp. Sau `recommender update` (phiên bản mới chứa đơn hàng mới),
+# bản tính sẵn cũ bị bỏ qua cho đến lần materialize tiếp theo.
+# ==============================================================================
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+
+from .model_bundle import BundleWriter, IdRowMap
+from .scoring_engine import BATCH_BLOCK_SIZE
+
+MATERIALIZED_DIRNAME = 'materialized'
+DEFAULT_TOP_N = 50
+DEFAULT_ALPHA = 0.5
+# Bản tính sẵn cũ hơn ngưỡng này (giây) không được dùng: job hằng đêm bị lỗi thì API tự chấm trực tiếp
+DEFAULT_MAX_AGE_SECONDS = 36 * 3600
+
+# Bộ máy chấm điểm dùng chung của các worker (kế thừa qua fork)
+_worker_state = {}
+
+
+class MaterializedRecommendations:
+    """Top-N tính sẵn: hàng i là của user_ids[i], cột là chỉ số vào item_ids."""
+
+    def __init__(self, user_ids, item_ids, top_cols, top_scores):
+        self.user_ids = np.asarray(user_ids)
+        self.item_ids = np.asarray(item_ids)
+        self.top_cols = np.asarray(top_cols)
+        self.top_scores = np.asarray(top_scores)
+        self.user_index = IdRowMap(self.user_ids)
+
+    @property
+    def top_n(self):
+        return self.top_cols.shape[1]
+
+    def lookup(self, user_id, num_recommendations):
+        """(product_ids, điểm) của người dùng, hoặc None nếu không có hay cần nhiều hơn N gợi ý."""
+        row = self.user_index.get(user_id)
+        if row is None or num_recommendations > self.top_n:
+            return None
+        cols = self.top_cols[row, :num_recommendations]
+        valid = cols >= 0
+        return self.item_ids[cols[valid]], self.top_scores[row, :num_recommendations][valid].astype(np.float64)
+
+    def to_arrays(self):
+        return {'user_ids': self.user_ids, 'item_ids': self.item_ids,
+                'top_cols': self.top_cols, 'top_scores': self.top_scores}
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        return cls(**arrays)
+
+
+def fresh_lookup(bundle, model_version, user_id, num_recommendations, alpha,
+                 max_age_seconds=DEFAULT_MAX_AGE_SECONDS):
+    """Tra gói tính sẵn `bundle` (ModelBundle hoặc None); None nếu không dùng được bản tính sẵn.
+
+    Chỉ dùng bản tính từ đúng `model_version` (phiên bản mô hình đang phục vụ request): gói
+    mới hơn có thể chứa lượt mua mới mà bản tính sẵn chưa biết.
+    """
+    if bundle is None:
+        return None
+    manifest = bundle.manifest
+    if manifest.get('source_version') != model_version:
+        return None
+    if time.time() - manifest['created_at_epoch'] > max_age_seconds:
+        return None
+    if abs(manifest['alpha'] - alpha) > 1e-9:
+        return None
+    return bundle.top_n.lookup(user_id, num_recommendations)
+
+
+def _init_worker(engine, top_n, alpha):
+    _worker_state.update(engine=engine, top_n=top_n, alpha=alpha)
+
+
+def _score_block(bounds):
+    start, stop = bounds
+    top_cols, top_scores = _worker_state['engine'].top_rows(
+        np.arange(start, stop), _worker_state['top_n'], _worker_state['alpha'])
+    finite = np.isfinite(top_scores)
+    return start, np.where(finite, top_cols, -1).astype(np.int32), np.where(finite, top_scores, 0).astype(np.float32)
+
+
+def materialize(engine, model_dir, top_n=DEFAULT_TOP_N, alpha=DEFAULT_ALPHA, n_workers=None,
+                block_size=BATCH_BLOCK_SIZE, source_version=None):
+    """Tính top-N của mọi người dùng trong `engine` và ghi thành phiên bản mới trong `model_dir`.
+
+    Mỗi worker chấm `block_size` hàng một lần (bộ nhớ ~ n_workers × block_size × số sản phẩm);
+    kết quả được ghi ngay vào mảng memmap. `n_workers=None` dùng mọi lõi CPU.
+    """
+    n_users = len(engine.user_ids)
+    top_n = min(int(top_n), len(engine.item_ids))
+    blocks = [(start, min(start + block_size, n_users)) for start in range(0, n_users, block_size)]
+
+    writer = BundleWriter(model_dir)
+    try:
+        writer.add_array('top_n', 'user_ids', engine.user_ids)
+        writer.add_array('top_n', 'item_ids', engine.item_ids)
+        top_cols = writer.create_array('top_n', 'top_cols', (n_users, top_n), np.int32)
+        top_scores = writer.create_array('top_n', 'top_scores', (n_users, top_n), np.float32)
+
+        n_workers = min(n_workers or os.cpu_count() or 1, max(len(blocks), 1))
+        if n_workers <= 1:
+            _init_worker(engine, top_n, alpha)
+            results = map(_score_block, blocks)
+            executor = None
+        else:
+            if 'fork' in multiprocessing.get_all_start_methods():
+                executor = ProcessPoolExecutor(n_workers, mp_context=multiprocessing.get_context('fork'),
+                                               initializer=_init_worker, initargs=(engine, top_n, alpha))
+            else:
+                # Phép nhân ma trận của numpy nhả GIL nên luồng vẫn chạy song song được
+                _init_worker(engine, top_n, alpha)
+                executor = ThreadPoolExecutor(n_workers)
+            results = executor.map(_score_block, blocks)
+        try:
+            for start, cols, scores in results:
+                top_cols[start:start + len(cols)] = cols
+                top_scores[start:start + len(cols)] = scores
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        return writer.commit(metadata={
+            'source_version': source_version, 'alpha': float(alpha), 'top_n': top_n,
+            'created_at_epoch': time.time(),
+        })
+    except BaseException:
+        writer.abort()
+        raise
@@ -0,0 +1,75 @@
+# @title Gom lô vi mô (micro-batching) các request chấm điểm đồng thời trong một tiến trình
+# ==============================================================================
+# Các luồng phục vụ request (worker gthread của gunicorn) gọi `submit(key)` và chờ kết
+# quả. Luồng đầu tiên mở một lô và làm "trưởng lô": chờ tối đa `window_seconds` (hoặc
+# đến khi lô có `max_batch_size` khóa khác nhau), đóng lô, gọi `batch_fn` MỘT lần với
+# mọi khóa đã gom rồi trả kết quả cho các luồng đang chờ. Khóa trùng (cùng người dùng,
+# cùng tham số) chỉ được tính một lần. Không có luồng nền nên an toàn với fork (--preload).
+# ==============================================================================
+import threading
+
+DEFAULT_WINDOW_SECONDS = 0.002
+DEFAULT_MAX_BATCH_SIZE = 64
+
+
+class _Batch:
+    def __init__(self):
+        self.keys = {}  # dict thay cho set: giữ thứ tự đến, bỏ khóa trùng
+        self.requests = 0
+        self.full = threading.Event()
+        self.done = threading.Event()
+        self.results = None
+        self.error = None
+
+
+class MicroBatcher:
+    """Gom các lời gọi `submit(key)` đồng thời thành một lần `batch_fn(keys) -> {key: kết quả}`."""
+
+    def __init__(self, batch_fn, window_seconds=DEFAULT_WINDOW_SECONDS, max_batch_size=DEFAULT_MAX_BATCH_SIZE):
+        self.batch_fn = batch_fn
+        self.window_seconds = window_seconds
+        self.max_batch_size = max_batch_size
+        self._lock = threading.Lock()
+        self._open = None
+
+    def _close(self, batch):
+        with self._lock:
+            if self._open is batch:
+                self._open = None
+
+    def submit(self, key):
+        """Chờ lô chứa `key` được tính xong; trả về (kết quả của `key`, số request trong lô).
+
+        Lỗi của `batch_fn` (kể cả BaseException) được ném lại ở mọi request trong lô.
+        """
+        with self._lock:
+            batch = self._open
+            leader = batch is None
+            if leader:
+                batch = self._open = _Batch()
+            batch.keys[key] = None
+            batch.requests += 1
+            if len(batch.keys) >= self.max_batch_size:
+                # Lô đã đầy: request đến sau mở lô mới, trưởng lô không cần chờ hết cửa sổ
+                self._open = None
+                batch.full.set()
+
+        if leader:
+            try:
+                batch.full.wait(self.window_seconds)
+                self._close(batch)
+                batch.results = self.batch_fn(list(batch.keys))
+            except BaseException as e:
+                # Kể cả lỗi không phải Exception (worker bị hết giờ, KeyboardInterrupt trong luồng
+                # trưởng lô): các request đang chờ nhận lại đúng lỗi đó thay vì kết quả None
+                batch.error = e
+                raise
+            finally:
+                self._close(batch)
+                batch.done.set()
+        else:
+            batch.done.wait()
+
+        if batch.error is not None:
+            raise batch.error
+        return batch.results[key], batch.requests
@@ -0,0 +1,245 @@
+# @title Gói mô hình có phiên bản, đọc bằng memory-map và nạp lại nóng
+# ==============================================================================
+# Bố cục trên đĩa:
+#   saved_models/
+#     CURRENT                       <- tên phiên bản đang phục vụ (ghi nguyên tử)
+#     bundles/<version>/
+#       manifest.json               <- phiên bản, thời điểm, danh sách mảng, ánh xạ id
+#       <component>/<array>.npy     <- mảng numpy thô, đọc bằng np.load(mmap_mode='r')
+# Nhiều worker cùng mmap một phiên bản sẽ dùng chung các trang bộ nhớ của hệ điều hành,
+# nên thời gian khởi động và RSS của mỗi worker không tăng theo kích thước mô hình.
+# ==============================================================================
+import json
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+
+BUNDLES_DIRNAME = 'bundles'
+CURRENT_FILENAME = 'CURRENT'
+MANIFEST_FILENAME = 'manifest.json'
+KEEP_VERSIONS = 3
+
+
+class IdRowMap:
+    """Ánh xạ id -> chỉ số hàng dựa trên mảng id, tra bằng searchsorted thay vì dict."""
+
+    def __init__(self, ids):
+        self.ids = np.asarray(ids)
+        if len(self.ids) < 2 or np.all(self.ids[:-1] <= self.ids[1:]):
+            self._sorter = None
+            self._sorted_ids = self.ids
+        else:
+            self._sorter = np.argsort(self.ids, kind='stable')
+            self._sorted_ids = self.ids[self._sorter]
+
+    def __len__(self):
+        return len(self.ids)
+
+    def rows(self, ids):
+        """Chỉ số hàng của từng id; id không tồn tại trả về -1."""
+        ids = np.asarray(ids)
+        if len(self._sorted_ids) == 0:
+            return np.full(ids.shape, -1, dtype=np.intp)
+        positions = np.searchsorted(self._sorted_ids, ids)
+        positions = np.minimum(positions, len(self._sorted_ids) - 1)
+        found = self._sorted_ids[positions] == ids
+        rows = positions if self._sorter is None else self._sorter[positions]
+        return np.where(found, rows, -1)
+
+    def get(self, id_value, default=None):
+        row = int(self.rows(np.asarray([id_value]))[0])
+        return default if row < 0 else row
+
+    def __contains__(self, id_value):
+        return self.get(id_value) is not None
+
+    def __getitem__(self, id_value):
+        row = self.get(id_value)
+        if row is None:
+            raise KeyError(id_value)
+        return row
+
+
+# ------------------------------------------------------------------------------
+# Ghi gói mô hình (bước huấn luyện)
+# ------------------------------------------------------------------------------
+def _new_version(bundles_dir):
+    version = time.strftime('%Y%m%d-%H%M%S')
+    suffix = 1
+    candidate = version
+    while os.path.exists(os.path.join(bundles_dir, candidate)):
+        suffix += 1
+        candidate = f'{version}-{suffix}'
+    return candidate
+
+
+def _write_current(model_dir, version):
+    """Cập nhật con trỏ CURRENT một cách nguyên tử (ghi file tạm rồi os.replace)."""
+    tmp_path = os.path.join(model_dir, f'.{CURRENT_FILENAME}.tmp')
+    with open(tmp_path, 'w') as f:
+        f.write(version)
+    os.replace(tmp_path, os.path.join(model_dir, CURRENT_FILENAME))
+
+
+class BundleWriter:
+    """Ghi một phiên bản mới theo từng mảng rồi công bố nguyên tử bằng `commit()`.
+
+    Mảng lớn có thể tạo bằng `create_array` (np.memmap trên file .npy trong thư mục tạm)
+    và ghi dần theo từng khối, nên bộ nhớ không phụ thuộc kích thước mảng.
+    """
+
+    def __init__(self, model_dir, keep_versions=KEEP_VERSIONS):
+        self.model_dir = model_dir
+        self.keep_versions = keep_versions
+        self.bundles_dir = os.path.join(model_dir, BUNDLES_DIRNAME)
+        os.makedirs(self.bundles_dir, exist_ok=True)
+        self.version = _new_version(self.bundles_dir)
+        self.staging_dir = os.path.join(self.bundles_dir, f'.tmp-{self.version}')
+        os.makedirs(self.staging_dir)
+        self.components = {}
+        self._open_arrays = []
+
+    def _path(self, component, array_name):
+        os.makedirs(os.path.join(self.staging_dir, component), exist_ok=True)
+        return os.path.join(self.staging_dir, component, f'{array_name}.npy')
+
+    def add_array(self, component, array_name, array):
+        array = np.ascontiguousarray(array)
+        np.save(self._path(component, array_name), array)
+        self.components.setdefault(component, {})[array_name] = {'dtype': str(array.dtype), 'shape': list(array.shape)}
+
+    def add_component(self, component, value):
+        """Ghi mọi mảng của một đối tượng có `to_arrays()`."""
+        for array_name, array in value.to_arrays().items():
+            self.add_array(component, array_name, array)
+
+    def create_array(self, component, array_name, shape, dtype):
+        """Mảng .npy rỗng dạng memmap để ghi dần; được flush khi commit."""
+        array = np.lib.format.open_memmap(self._path(component, array_name), mode='w+', dtype=dtype, shape=shape)
+        self.components.setdefault(component, {})[array_name] = {'dtype': str(array.dtype), 'shape': list(shape)}
+        self._open_arrays.append(array)
+        return array
+
+    def commit(self, id_maps=None, metadata=None):
+        """Ghi manifest, đổi tên thư mục tạm thành phiên bản và trỏ CURRENT tới nó."""
+        for array in self._open_arrays:
+            array.flush()
+        self._open_arrays.clear()
+        manifest = {'version': self.version, 'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                    'components': self.components, 'id_maps': id_maps or {}, **(metadata or {})}
+        with open(os.path.join(self.staging_dir, MANIFEST_FILENAME), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+        os.rename(self.staging_dir, os.path.join(self.bundles_dir, self.version))
+        _write_current(self.model_dir, self.version)
+        _prune_versions(self.bundles_dir, self.keep_versions, keep=self.version)
+        return self.version
+
+    def abort(self):
+        self._open_arrays.clear()
+        shutil.rmtree(self.staging_dir, ignore_errors=True)
+
+
+def write_bundle(model_dir, components, id_maps=None, keep_versions=KEEP_VERSIONS, metadata=None):
+    """Ghi các thành phần (đối tượng có `to_arrays()`) thành một phiên bản mới và trỏ CURRENT tới nó.
+
+    `id_maps` ghi vào manifest tên mảng id của từng thực thể, ví dụ
+    {'users': 'scoring_engine/user_ids.npy'}: vị trí của id trong mảng chính là số hàng.
+    `metadata` là các trường bổ sung của manifest (giá trị JSON).
+    """
+    writer = BundleWriter(model_dir, keep_versions)
+    try:
+        for name, component in components.items():
+            writer.add_component(name, component)
+        return writer.commit(id_maps, metadata)
+    except BaseException:
+        writer.abort()
+        raise
+
+
+def _prune_versions(bundles_dir, keep_versions, keep):
+    versions = sorted(name for name in os.listdir(bundles_dir) if not name.startswith('.'))
+    for version in versions[:-keep_versions]:
+        if version != keep:
+            shutil.rmtree(os.path.join(bundles_dir, version), ignore_errors=True)
+
+
+# ------------------------------------------------------------------------------
+# Đọc gói mô hình (API)
+# ------------------------------------------------------------------------------
+class ModelBundle:
+    """Một phiên bản mô hình đã nạp; các thành phần truy cập như thuộc tính."""
+
+    def __init__(self, version, manifest, components):
+        self.version = version
+        self.manifest = manifest
+        self.components = components
+
+    def __getattr__(self, name):
+        try:
+            return self.__dict__['components'][name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+
+def read_current_version(model_dir):
+    try:
+        with open(os.path.join(model_dir, CURRENT_FILENAME)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def read_manifest(model_dir, version):
+    with open(os.path.join(model_dir, BUNDLES_DIRNAME, version, MANIFEST_FILENAME), encoding='utf-8') as f:
+        return json.load(f)
+
+
+def load_bundle(model_dir, version, component_types, mmap_mode='r', optional=()):
+    """Nạp một phiên bản; mỗi thành phần được dựng bằng `component_types[name].from_arrays(...)`.
+
+    Thành phần có tên trong `optional` được bỏ qua nếu phiên bản không chứa nó (gói cũ).
+    """
+    bundle_dir = os.path.join(model_dir, BUNDLES_DIRNAME, version)
+    manifest = read_manifest(model_dir, version)
+
+    components = {}
+    for name, component_type in component_types.items():
+        if name in optional and name not in manifest['components']:
+            continue
+        arrays = {
+            array_name: np.load(os.path.join(bundle_dir, name, f'{array_name}.npy'), mmap_mode=mmap_mode)
+            for array_name in manifest['components'][name]
+        }
+        components[name] = component_type.from_arrays(arrays)
+    return ModelBundle(version, manifest, components)
+
+
+class ModelStore:
+    """Giữ phiên bản mô hình đang phục vụ và hoán đổi nguyên tử khi có phiên bản mới."""
+
+    def __init__(self, model_dir, component_types, optional=()):
+        self.model_dir = model_dir
+        self.component_types = component_types
+        self.optional = tuple(optional)
+        self.current = None
+        self._lock = threading.Lock()
+
+    @property
+    def version(self):
+        bundle = self.current
+        return bundle.version if bundle is not None else None
+
+    def reload(self):
+        """Nạp phiên bản CURRENT nếu khác phiên bản đang phục vụ. Trả về True nếu đã hoán đổi."""
+        with self._lock:
+            version = read_current_version(self.model_dir)
+            if version is None or version == self.version:
+                return False
+            bundle = load_bundle(self.model_dir, version, self.component_types, optional=self.optional)
+            # Gán một tham chiếu duy nhất: các request đang chạy vẫn dùng bản cũ đến khi xong
+            self.current = bundle
+            return True
@@ -0,0 +1,188 @@
+# @title Đo độ trễ từng bước, chỉ số Prometheus và log có cấu trúc cho API gợi ý
+# ==============================================================================
+# - Histogram độ trễ theo (endpoint, bước): score, db_fetch, merge, serialize.
+# - Histogram độ trễ toàn request theo (endpoint, mã trạng thái).
+# - Histogram số người dùng mỗi lô vi mô (RECOMMENDER_MICRO_BATCH_WINDOW_MS).
+# - Bộ đếm người dùng mới (cold start), phiên bản mô hình đang phục vụ, tỉ lệ trúng
+#   bộ nhớ đệm sản phẩm và bộ nhớ đệm kết quả (đọc tại thời điểm Prometheus thu thập).
+# - Mỗi request ghi đúng một dòng log JSON (thay cho print) kèm thời gian từng bước.
+# - Nhiều worker gunicorn: đặt PROMETHEUS_MULTIPROC_DIR (gunicorn.conf.py tự đặt) để gộp số liệu.
+# ==============================================================================
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager
+
+from flask import g, has_request_context, request
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, InfoMetricFamily
+
+LOGGER_NAME = 'recommender.api'
+# Bước chấm điểm thường dưới 1 ms, truy vấn CSDL tới hàng trăm ms
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+MICRO_BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+logger = logging.getLogger(LOGGER_NAME)
+registry = CollectorRegistry()
+
+STAGE_SECONDS = Histogram(
+    'recommender_request_stage_seconds', 'Thời gian của từng bước xử lý request.',
+    ['endpoint', 'stage'], buckets=LATENCY_BUCKETS, registry=registry)
+REQUEST_SECONDS = Histogram(
+    'recommender_request_seconds', 'Thời gian xử lý toàn bộ request.',
+    ['endpoint', 'status'], buckets=LATENCY_BUCKETS, registry=registry)
+COLD_START_TOTAL = Counter(
+    'recommender_cold_start_total', 'Số lần gợi ý bán chạy cho người dùng chưa có trong mô hình.',
+    ['endpoint'], registry=registry)
+MICRO_BATCH_USERS = Histogram(
+    'recommender_micro_batch_users', 'Số người dùng (không trùng) được chấm điểm trong mỗi lô vi mô.',
+    buckets=MICRO_BATCH_BUCKETS, registry=registry)
+
+
+class JsonLogFormatter(logging.Formatter):
+    """Mỗi bản ghi log là một dòng JSON; các trường trong `extra={'fields': {...}}` được gộp vào."""
+
+    def format(self, record):
+        entry = {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(record.created)),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        entry.update(getattr(record, 'fields', {}))
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def configure_logging(level=logging.INFO):
+    """Gắn handler JSON cho logger của API (một lần)."""
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(JsonLogFormatter())
+        logger.addHandler(handler)
+        logger.setLevel(level)
+        logger.propagate = False
+    return logger
+
+
+class ServingStateCollector:
+    """Chỉ số đọc tại thời điểm thu thập: phiên bản mô hình, bộ nhớ đệm sản phẩm và kết quả."""
+
+    def __init__(self, model_store, product_cache, result_cache=None):
+        self.model_store = model_store
+        self.product_cache = product_cache
+        self.result_cache = result_cache
+
+    def collect(self):
+        info = InfoMetricFamily('recommender_model', 'Phiên bản gói mô hình đang phục vụ.')
+        info.add_metric([], {'version': self.model_store.version or ''})
+        yield info
+
+        loaded = GaugeMetricFamily('recommender_model_loaded', '1 nếu đã nạp được mô hình.')
+        loaded.add_metric([], 1.0 if self.model_store.current is not None else 0.0)
+        yield loaded
+
+        hits, misses = self.product_cache.hits, self.product_cache.misses
+        lookups = CounterMetricFamily('recommender_product_cache_lookups', 'Số lần tra bộ nhớ đệm sản phẩm.',
+                                      labels=['result'])
+        lookups.add_metric(['hit'], hits)
+        lookups.add_metric(['miss'], misses)
+        yield lookups
+
+        ratio = GaugeMetricFamily('recommender_product_cache_hit_ratio', 'Tỉ lệ trúng bộ nhớ đệm sản phẩm.')
+        ratio.add_metric([], hits / (hits + misses) if hits + misses else 0.0)
+        yield ratio
+
+        if self.result_cache is not None:
+            results = CounterMetricFamily('recommender_result_cache_requests',
+                                          'Số request theo nguồn kết quả (local, redis, computed).',
+                                          labels=['source'])
+            for source, count in self.result_cache.counts.items():
+                results.add_metric([source], count)
+            yield results
+
+
+_serving_state = []
+
+
+def register_serving_state(model_store, product_cache, result_cache=None):
+    """Đăng ký (hoặc thay thế) nguồn chỉ số trạng thái phục vụ của tiến trình."""
+    while _serving_state:
+        registry.unregister(_serving_state.pop())
+    collector = ServingStateCollector(model_store, product_cache, result_cache)
+    registry.register(collector)
+    _serving_state.append(collector)
+
+
+def render_metrics():
+    """Văn bản Prometheus. Khi chạy nhiều worker (PROMETHEUS_MULTIPROC_DIR), histogram và bộ đếm
+    được gộp từ mọi worker; trạng thái phục vụ là của worker trả lời request."""
+    if 'PROMETHEUS_MULTIPROC_DIR' not in os.environ:
+        return generate_latest(registry)
+    combined = CollectorRegistry()
+    multiprocess.MultiProcessCollector(combined)
+    for collector in _serving_state:
+        combined.register(collector)
+    return generate_latest(combined)
+
+
+# ------------------------------------------------------------------------------
+# Đo theo request (dùng flask.g; ngoài request context thì không ghi nhận gì)
+# ------------------------------------------------------------------------------
+def start_request():
+    g.request_started = time.perf_counter()
+    g.stage_seconds = {}
+    g.log_fields = {}
+
+
+@contextmanager
+def timed_stage(stage):
+    """Đo một bước của request hiện tại: ghi vào histogram và vào log của request."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if has_request_context() and 'stage_seconds' in g:
+            elapsed = time.perf_counter() - start
+            STAGE_SECONDS.labels(request.endpoint or 'unknown', stage).observe(elapsed)
+            g.stage_seconds[stage] = g.stage_seconds.get(stage, 0.0) + elapsed
+
+
+def annotate(**fields):
+    """Thêm trường vào dòng log của request hiện tại (ví dụ user_id, cold_start)."""
+    if has_request_context() and 'log_fields' in g:
+        g.log_fields.update(fields)
+
+
+def record_cold_start(count=1):
+    """Đếm `count` người dùng mới được phục vụ bằng bảng bán chạy."""
+    endpoint = request.endpoint if has_request_context() else None
+    COLD_START_TOTAL.labels(endpoint or 'unknown').inc(count)
+    annotate(cold_starts=count)
+
+
+def record_micro_batch(n_users):
+    """Ghi kích thước một lô vi mô (gọi từ luồng trưởng lô, có thể ngoài request context)."""
+    MICRO_BATCH_USERS.observe(n_users)
+
+
+def finish_request(response, model_version=None):
+    """Ghi histogram toàn request và một dòng log JSON; trả lại `response` cho after_request."""
+    if 'request_started' not in g:
+        return response
+    elapsed = time.perf_counter() - g.request_started
+    endpoint = request.endpoint or 'unknown'
+    REQUEST_SECONDS.labels(endpoint, str(response.status_code)).observe(elapsed)
+    logger.info('request', extra={'fields': {
+        'method': request.method,
+        'path': request.path,
+        'endpoint': endpoint,
+        'status': response.status_code,
+        'duration_ms': round(elapsed * 1000, 3),
+        'stages_ms': {stage: round(seconds * 1000, 3) for stage, seconds in g.stage_seconds.items()},
+        'model_version': model_version,
+        **g.log_fields,
+    }})
+    return response
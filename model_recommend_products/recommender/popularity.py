@@ -0,0 +1,72 @@
+# @title Bảng xếp hạng sản phẩm bán chạy (tính sẵn cho người dùng mới)
+# ==============================================================================
+# Thứ hạng bán chạy được tính một lần khi huấn luyện và lưu cùng các artefact
+# khác. Mỗi "phân đoạn" là một mảng product_id đã sắp xếp giảm dần theo số
+# lượng bán, nên gợi ý cho người dùng mới chỉ là lấy lát cắt đầu mảng:
+#   - 'all'            : toàn bộ lịch sử
+#   - 'category_<id>'  : các sản phẩm trong một danh mục
+#   - 'window_<n>d'    : bán chạy trong n ngày gần nhất (phần còn lại xếp theo 'all')
+# ==============================================================================
+import numpy as np
+
+POPULARITY_WINDOWS_DAYS = (7, 30)
+
+
+def _rank(item_ids, quantities, tie_break=None):
+    """Sắp xếp item_ids giảm dần theo số lượng; hòa thì theo `tie_break` (thứ hạng trước đó)."""
+    if tie_break is None:
+        tie_break = np.arange(len(item_ids))
+    return np.asarray(item_ids)[np.lexsort((tie_break, -np.asarray(quantities)))]
+
+
+class PopularityRanking:
+    """Tập các mảng product_id đã xếp hạng theo phân đoạn."""
+
+    def __init__(self, segments):
+        self.segments = {name: np.asarray(ranked_ids) for name, ranked_ids in segments.items()}
+
+    @classmethod
+    def build(cls, ratings_df, products_df, windows_days=POPULARITY_WINDOWS_DAYS, as_of=None):
+        """Tính các bảng xếp hạng từ dữ liệu tương tác (user_id, product_id, quantity[, created_at])."""
+        import pandas as pd
+        item_ids = np.sort(products_df['product_id'].unique())
+        totals = ratings_df.groupby('product_id')['quantity'].sum().reindex(item_ids, fill_value=0)
+        overall = _rank(item_ids, totals.to_numpy())
+        segments = {'all': overall}
+        overall_position = pd.Series(np.arange(len(overall)), index=overall)
+
+        if 'category_id' in products_df.columns:
+            for category_id, group in products_df.dropna(subset=['category_id']).groupby('category_id'):
+                category_items = np.sort(group['product_id'].unique())
+                segments[f'category_{int(category_id)}'] = _rank(
+                    category_items, totals.reindex(category_items).to_numpy(),
+                    overall_position.reindex(category_items).to_numpy())
+
+        if 'created_at' in ratings_df.columns and windows_days:
+            created_at = pd.to_datetime(ratings_df['created_at'])
+            as_of = pd.Timestamp.now() if as_of is None else pd.Timestamp(as_of)
+            for days in windows_days:
+                recent = ratings_df[created_at >= as_of - pd.Timedelta(days=days)]
+                window_totals = recent.groupby('product_id')['quantity'].sum().reindex(item_ids, fill_value=0)
+                segments[f'window_{days}d'] = _rank(
+                    item_ids, window_totals.to_numpy(), overall_position.reindex(item_ids).to_numpy())
+
+        return cls(segments)
+
+    def to_arrays(self):
+        return dict(self.segments)
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        return cls(arrays)
+
+    def top(self, num_recommendations, category_id=None, window_days=None):
+        """Lát cắt đầu của bảng xếp hạng phù hợp; phân đoạn không tồn tại thì dùng 'all'."""
+        if category_id is not None:
+            name = f'category_{category_id}'
+        elif window_days is not None:
+            name = f'window_{window_days}d'
+        else:
+            name = 'all'
+        ranked_ids = self.segments.get(name, self.segments['all'])
+        return ranked_ids[:max(num_recommendations, 0)]
@@ -0,0 +1,129 @@
+# @title Tầng truy cập dữ liệu sản phẩm cho API gợi ý
+# ==============================================================================
+# - Engine dùng connection pool đã tinh chỉnh (giữ sẵn kết nối, kiểm tra trước khi dùng).
+# - Câu lệnh SQL cố định với tham số ràng buộc (bind parameter), không ghép chuỗi.
+# - Chỉ lấy các cột API trả về (bỏ created_at/updated_at).
+# - Bộ nhớ đệm LRU có TTL trong tiến trình, khóa theo product_id; mỗi sản phẩm lưu cả
+#   dict và mảnh JSON đã tuần tự hóa sẵn (response_encoding) để API ghép phản hồi.
+# ==============================================================================
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import bindparam, create_engine, text
+
+from .response_encoding import object_fragment
+
+POOL_SIZE = 10
+POOL_MAX_OVERFLOW = 20
+POOL_TIMEOUT_SECONDS = 5
+POOL_RECYCLE_SECONDS = 1800
+
+CACHE_MAX_SIZE = 10000
+CACHE_TTL_SECONDS = 60
+
+PRODUCT_COLUMNS = ['product_id', 'name', 'description', 'image_url',
+                   'category_id', 'status', 'price', 'quantity']
+
+SQL_PRODUCTS_BY_IDS = text("""
+    SELECT
+        id AS product_id, name, description, image_url,
+        category_id, status, price, quantity
+    FROM products
+    WHERE id IN :product_ids
+""").bindparams(bindparam('product_ids', expanding=True))
+
+
+def create_pooled_engine(db_uri, pool_size=POOL_SIZE, max_overflow=POOL_MAX_OVERFLOW,
+                         pool_timeout=POOL_TIMEOUT_SECONDS, pool_recycle=POOL_RECYCLE_SECONDS):
+    """Tạo engine với pool kết nối cố định, tự kiểm tra và làm mới kết nối cũ."""
+    return create_engine(
+        db_uri,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=pool_timeout,
+        pool_recycle=pool_recycle,
+        pool_pre_ping=True,
+    )
+
+
+class TTLCache:
+    """Bộ nhớ đệm LRU có giới hạn kích thước và thời gian sống, an toàn đa luồng."""
+
+    def __init__(self, max_size=CACHE_MAX_SIZE, ttl_seconds=CACHE_TTL_SECONDS):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class ProductRepository:
+    """Lấy thông tin sản phẩm theo id, ưu tiên bộ nhớ đệm, gộp các id thiếu vào một truy vấn."""
+
+    def __init__(self, engine, cache=None):
+        self.engine = engine
+        self.cache = cache if cache is not None else TTLCache()
+
+    def get_products(self, product_ids):
+        """Trả về danh sách dict sản phẩm theo đúng thứ tự `product_ids` (bỏ qua id không tồn tại)."""
+        entries = self._lookup(product_ids)
+        return [entries[product_id][0] for product_id in map(int, product_ids) if product_id in entries]
+
+    def get_fragments(self, product_ids):
+        """Trả về {product_id: mảnh JSON} theo thứ tự `product_ids` (bỏ qua id không tồn tại)."""
+        entries = self._lookup(product_ids)
+        return {product_id: entries[product_id][1] for product_id in map(int, product_ids)
+                if product_id in entries}
+
+    def _lookup(self, product_ids):
+        """{product_id: (dict, mảnh JSON)}: lấy từ bộ nhớ đệm, id thiếu gộp vào một truy vấn."""
+        entries = {}
+        missing_ids = []
+        for product_id in dict.fromkeys(int(product_id) for product_id in product_ids):
+            entry = self.cache.get(product_id)
+            if entry is None:
+                missing_ids.append(product_id)
+            else:
+                entries[product_id] = entry
+
+        if missing_ids:
+            for row in self._fetch(missing_ids):
+                entry = (row, object_fragment(row))
+                entries[row['product_id']] = entry
+                self.cache.set(row['product_id'], entry)
+        return entries
+
+    def _fetch(self, product_ids):
+        with self.engine.connect() as connection:
+            result = connection.execute(SQL_PRODUCTS_BY_IDS, {'product_ids': product_ids})
+            for record in result.mappings():
+                row = dict(record)
+                # Chuyển DECIMAL sang float để đảm bảo tính nhất quán
+                if row['price'] is not None:
+                    row['price'] = float(row['price'])
+                yield row
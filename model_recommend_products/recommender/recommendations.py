@@ -0,0 +1,51 @@
+# @title Hàm gợi ý dùng chung cho API và phần trình diễn sau huấn luyện
+# ==============================================================================
+# `model` là một gói mô hình (ModelBundle): các thành phần scoring_engine, popularity,
+# item_neighbors và (tùy chọn) candidate_index truy cập như thuộc tính. Các hàm trả về
+# mảng id và điểm; API tự đo thời gian, lấy chi tiết sản phẩm và tuần tự hóa.
+# ==============================================================================
+import numpy as np
+
+from .scoring_engine import SESSION_USER_ID
+
+
+def recommend_for_user(model, user_id, num_recommendations, alpha, category_id=None, window_days=None):
+    """(product_ids, điểm) đã xếp hạng; người dùng chưa có trong mô hình nhận bảng bán chạy
+    (theo danh mục hoặc trong n ngày gần nhất nếu có) với điểm None."""
+    if not model.scoring_engine.has_user(user_id):
+        return model.popularity.top(num_recommendations, category_id, window_days), None
+    # Hai giai đoạn: sinh vài trăm ứng viên rồi chỉ xếp hạng lại chúng; gói cũ thì chấm toàn bộ
+    candidate_index = getattr(model, 'candidate_index', None)
+    if candidate_index is not None:
+        return candidate_index.recommend(model.scoring_engine, user_id, num_recommendations, alpha)
+    return model.scoring_engine.recommend(user_id, num_recommendations, alpha)
+
+
+def recommend_for_known_users(model, user_ids, num_recommendations, alpha):
+    """Như `recommend_for_user` cho nhiều người dùng đã có trong mô hình, chấm theo lô:
+    dict user_id -> (product_ids, điểm); người dùng không có trong mô hình bị bỏ qua."""
+    candidate_index = getattr(model, 'candidate_index', None)
+    if candidate_index is not None:
+        return candidate_index.recommend_batch(model.scoring_engine, user_ids, num_recommendations, alpha)
+    return model.scoring_engine.recommend_batch(user_ids, num_recommendations, alpha)
+
+
+def recommend_for_session(model, product_ids, num_recommendations, alpha):
+    """(product_ids, điểm) cho một phiên chưa gắn với người dùng nào (giỏ hàng, sản phẩm vừa xem),
+    không gồm các sản phẩm của phiên. Phiên được fold-in thành người dùng tạm rồi gợi ý như người
+    dùng đã biết; không sản phẩm nào có trong mô hình thì nhận bảng bán chạy với điểm None."""
+    session = model.scoring_engine.session_engine(product_ids)
+    if session is None:
+        popular_ids = model.popularity.top(num_recommendations + len(product_ids))
+        return popular_ids[~np.isin(popular_ids, product_ids)][:num_recommendations], None
+    candidate_index = getattr(model, 'candidate_index', None)
+    if candidate_index is not None:
+        return candidate_index.recommend(session, SESSION_USER_ID, num_recommendations, alpha)
+    return session.recommend(SESSION_USER_ID, num_recommendations, alpha)
+
+
+def find_similar_products(model, product_id, num_similar):
+    """(product_ids, độ tương tự) từ bảng lân cận tính sẵn, hoặc None nếu sản phẩm không có trong mô hình."""
+    if not model.item_neighbors.has_item(product_id):
+        return None
+    return model.item_neighbors.similar_items(product_id, num_similar)
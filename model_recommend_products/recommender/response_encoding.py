@@ -0,0 +1,47 @@
+# @title Tuần tự hóa JSON nhanh cho phản hồi API (không qua pandas)
+# ==============================================================================
+# Mỗi sản phẩm được tuần tự hóa MỘT lần khi vào bộ nhớ đệm thành "mảnh" JSON
+# (phần thân object, không có dấu ngoặc), ví dụ  "product_id":7,"name":"Áo",...
+# Mỗi request chỉ còn nối các mảnh đã có với điểm số của nó:
+#   [{<mảnh>,"hybrid_score":0.91},{<mảnh>,"hybrid_score":0.87}]
+# Dùng orjson nếu đã cài (nhanh hơn, hỗ trợ số numpy); không có thì dùng json chuẩn.
+# ==============================================================================
+import json
+import math
+
+try:
+    import orjson
+except ImportError:  # tùy chọn: kết quả giống nhau, chỉ chậm hơn
+    orjson = None
+
+
+def _plain(value):
+    """Đổi số numpy về kiểu Python; NaN/vô cực thành null như orjson."""
+    if hasattr(value, 'item'):
+        value = value.item()
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+def dumps(value):
+    """Tuần tự hóa `value` thành bytes UTF-8."""
+    if orjson is not None:
+        return orjson.dumps(value, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'), default=_plain).encode('utf-8')
+
+
+def object_fragment(row):
+    """Phần thân JSON của một dict (bỏ '{' và '}'), để ghép thêm trường khi trả về."""
+    if orjson is None:
+        row = {name: _plain(value) for name, value in row.items()}
+    return dumps(row)[1:-1]
+
+
+def records_array(fragments, field=None, values=None):
+    """Mảng JSON các object từ `fragments`; nếu có `field`, object thứ i thêm `field: values[i]`."""
+    if field is None:
+        return b'[' + b','.join(b'{' + fragment + b'}' for fragment in fragments) + b']'
+    member = b',' + dumps(field) + b':'
+    return b'[' + b','.join(b'{' + fragment + member + dumps(_plain(value)) + b'}'
+                            for fragment, value in zip(fragments, values)) + b']'
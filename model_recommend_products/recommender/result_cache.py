@@ -0,0 +1,148 @@
+# @title Bộ nhớ đệm kết quả gợi ý hai tầng (LRU trong tiến trình + Redis)
+# ==============================================================================
+# Kết quả của /recommendations/user và /recommendations/item chỉ đổi khi mô hình đổi,
+# nên phần thân JSON đã tuần tự hóa được lưu theo khóa
+#   rec:<phiên bản mô hình>:<endpoint>:<tham số...>  (alpha đã lượng tử hóa)
+# Khi nạp phiên bản mới, khóa tự "cuộn" sang không gian mới; khóa cũ hết hạn theo TTL.
+#   - Tầng 1: TTLCache trong tiến trình (không qua mạng).
+#   - Tầng 2: Redis dùng chung giữa các worker/máy (RECOMMENDER_REDIS_URL); lỗi Redis
+#     chỉ làm giảm về tầng 1, không làm hỏng request.
+#   - Chống dồn request (stampede): trong một tiến trình chỉ một luồng tính cho mỗi
+#     khóa; giữa các tiến trình dùng khóa Redis SET NX PX, bên thua chờ kết quả.
+# ==============================================================================
+import logging
+import os
+import threading
+import time
+import uuid
+
+from .product_repository import TTLCache
+
+KEY_PREFIX = 'rec'
+ALPHA_STEP = 0.05
+RESULT_CACHE_MAX_SIZE = 20000
+RESULT_CACHE_TTL_SECONDS = int(os.environ.get('RECOMMENDER_RESULT_CACHE_TTL', '300'))
+LOCK_TTL_MS = 5000
+LOCK_WAIT_SECONDS = 2.0
+LOCK_POLL_SECONDS = 0.02
+REDIS_TIMEOUT_SECONDS = 0.1
+REDIS_RETRY_AFTER_SECONDS = 30
+
+logger = logging.getLogger('recommender.api')
+
+
+def quantize_alpha(alpha, step=ALPHA_STEP):
+    """Làm tròn alpha (số hữu hạn, endpoint đã kiểm tra) về bội số của `step` trong [0, 1]
+    để các giá trị gần nhau dùng chung khóa."""
+    return round(min(max(round(alpha / step) * step, 0.0), 1.0), 4)
+
+
+def result_key(endpoint, model_version, **params):
+    """Khóa bộ nhớ đệm: phiên bản mô hình, endpoint và các tham số (theo thứ tự tên)."""
+    parts = [f'{name}={params[name]}' for name in sorted(params) if params[name] is not None]
+    return ':'.join([KEY_PREFIX, str(model_version), endpoint] + parts)
+
+
+def create_redis_client(url=None):
+    """Tạo client Redis từ URL (mặc định RECOMMENDER_REDIS_URL); không cấu hình hoặc thiếu thư viện thì None."""
+    url = url or os.environ.get('RECOMMENDER_REDIS_URL')
+    if not url:
+        return None
+    try:
+        import redis
+    except ImportError:
+        logger.warning("Chưa cài thư viện 'redis'; bộ nhớ đệm kết quả chỉ dùng tầng trong tiến trình.")
+        return None
+    return redis.Redis.from_url(url, socket_timeout=REDIS_TIMEOUT_SECONDS,
+                                socket_connect_timeout=REDIS_TIMEOUT_SECONDS)
+
+
+class ResultCache:
+    """Bộ nhớ đệm hai tầng cho giá trị bytes; `get_or_compute` trả về (giá trị, nguồn)."""
+
+    def __init__(self, redis_client=None, local=None, ttl_seconds=RESULT_CACHE_TTL_SECONDS,
+                 lock_ttl_ms=LOCK_TTL_MS, lock_wait_seconds=LOCK_WAIT_SECONDS):
+        self.redis = redis_client
+        self.local = local if local is not None else TTLCache(RESULT_CACHE_MAX_SIZE, ttl_seconds)
+        self.ttl_seconds = ttl_seconds
+        self.lock_ttl_ms = lock_ttl_ms
+        self.lock_wait_seconds = lock_wait_seconds
+        self.counts = {'local': 0, 'redis': 0, 'computed': 0}
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
+        self._redis_down_until = 0.0
+
+    def get_or_compute(self, key, compute):
+        """Trả về giá trị đã lưu hoặc gọi `compute()` (trả về bytes, hoặc None để không lưu)."""
+        value = self.local.get(key)
+        if value is not None:
+            self.counts['local'] += 1
+            return value, 'local'
+
+        # Single-flight trong tiến trình: các luồng khác chờ luồng đầu tiên tính xong
+        with self._inflight_lock:
+            done = self._inflight.get(key)
+            leader = done is None
+            if leader:
+                done = self._inflight[key] = threading.Event()
+        if not leader:
+            done.wait(self.lock_wait_seconds)
+            value = self.local.get(key)
+            if value is not None:
+                self.counts['local'] += 1
+                return value, 'local'
+            return self._compute(key, compute), 'computed'
+
+        try:
+            return self._get_shared_or_compute(key, compute)
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+            done.set()
+
+    def _get_shared_or_compute(self, key, compute):
+        value = self._redis_call('get', key)
+        if value is not None:
+            self.local.set(key, value)
+            self.counts['redis'] += 1
+            return value, 'redis'
+
+        lock_key, token = f'{key}:lock', uuid.uuid4().hex
+        acquired = self._redis_call('set', lock_key, token, nx=True, px=self.lock_ttl_ms)
+        if not acquired and self._redis_usable():
+            # Tiến trình khác đang tính: chờ kết quả xuất hiện trên Redis
+            deadline = time.monotonic() + self.lock_wait_seconds
+            while time.monotonic() < deadline:
+                time.sleep(LOCK_POLL_SECONDS)
+                value = self._redis_call('get', key)
+                if value is not None:
+                    self.local.set(key, value)
+                    self.counts['redis'] += 1
+                    return value, 'redis'
+        try:
+            return self._compute(key, compute), 'computed'
+        finally:
+            if acquired and self._redis_call('get', lock_key) == token.encode():
+                self._redis_call('delete', lock_key)
+
+    def _compute(self, key, compute):
+        value = compute()
+        self.counts['computed'] += 1
+        if value is not None:
+            self.local.set(key, value)
+            self._redis_call('set', key, value, ex=self.ttl_seconds)
+        return value
+
+    def _redis_usable(self):
+        return self.redis is not None and time.monotonic() >= self._redis_down_until
+
+    def _redis_call(self, method, *args, **kwargs):
+        """Gọi Redis; lỗi kết nối thì tạm bỏ qua tầng Redis một lúc (trả về None)."""
+        if not self._redis_usable():
+            return None
+        try:
+            return getattr(self.redis, method)(*args, **kwargs)
+        except Exception as e:  # redis.RedisError và lỗi mạng: giảm về tầng trong tiến trình
+            self._redis_down_until = time.monotonic() + REDIS_RETRY_AFTER_SECONDS
+            logger.warning(f"Redis không khả dụng ({e}); tạm dùng bộ nhớ đệm trong tiến trình.")
+            return None
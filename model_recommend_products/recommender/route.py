@@ -0,0 +1,262 @@
+# @title Router cho chế độ phục vụ phân mảnh theo người dùng
+# ==============================================================================
+# Mỗi shard là một API thường (`python -m recommender serve` hoặc gunicorn) trỏ tới thư mục
+# shard do `python -m recommender shard` ghi (xem sharding.py). Router không nạp mô hình,
+# không kết nối CSDL, chỉ chuyển tiếp qua kết nối HTTP keep-alive:
+#   GET  /recommendations/user   -> shard sở hữu user_id (shard_of)
+#   POST /recommendations/users  -> chia user_ids theo shard, gửi song song, ghép lại theo thứ tự
+#   GET  /recommendations/item   -> dữ liệu sản phẩm có ở mọi shard; chọn shard theo product_id
+#                                   để bộ nhớ đệm kết quả của mỗi shard chỉ giữ một phần sản phẩm
+#   POST /recommendations/session -> chỉ dùng dữ liệu sản phẩm; chọn shard theo sản phẩm đầu tiên
+#   POST /admin/reload           -> gửi tới mọi shard
+# Chạy thử nhiều tiến trình trên một máy: xem shard.py.
+# Cấu hình qua biến môi trường:
+#   RECOMMENDER_SHARD_URLS=http://127.0.0.1:5101,http://127.0.0.1:5102  (đúng thứ tự chỉ số shard)
+#   RECOMMENDER_ROUTER_TIMEOUT_SECONDS, RECOMMENDER_HOST, RECOMMENDER_PORT
+# ==============================================================================
+import http.client
+import json
+import os
+import threading
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import Flask, Response, jsonify, request
+from flask_cors import CORS
+
+from . import observability
+from .observability import annotate, timed_stage
+from .response_encoding import dumps
+from .serve import MAX_BATCH_USERS, is_valid_alpha, is_valid_id
+from .sharding import SHARD_HEADER, shard_label, shard_of
+
+# Địa chỉ các shard theo thứ tự chỉ số shard (0, 1, ...), phân tách bằng dấu phẩy
+SHARD_URLS = [url.strip() for url in os.environ.get('RECOMMENDER_SHARD_URLS', '').split(',') if url.strip()]
+TIMEOUT_SECONDS = float(os.environ.get('RECOMMENDER_ROUTER_TIMEOUT_SECONDS', '10'))
+# Số luồng gửi song song cho mỗi shard (dùng chung giữa các request)
+FANOUT_THREADS_PER_SHARD = 4
+
+logger = observability.logger
+
+
+class ShardUnavailable(Exception):
+    """Không gửi được request tới shard (mất kết nối, hết thời gian chờ)."""
+
+
+class ShardClient:
+    """Kết nối HTTP keep-alive tới một shard, mỗi luồng một kết nối."""
+
+    def __init__(self, url, timeout_seconds=TIMEOUT_SECONDS):
+        parsed = urllib.parse.urlsplit(url)
+        self.url = url
+        self.host = parsed.hostname
+        self.port = parsed.port
+        self.connection_class = http.client.HTTPSConnection if parsed.scheme == 'https' else http.client.HTTPConnection
+        self.timeout_seconds = timeout_seconds
+        self._local = threading.local()
+
+    def request(self, method, path, body=None, headers=None):
+        """(mã trạng thái, Content-Type, nội dung). Kết nối keep-alive đã bị shard đóng thì mở lại một lần."""
+        for attempt in range(2):
+            connection = getattr(self._local, 'connection', None)
+            if connection is None:
+                connection = self._local.connection = self.connection_class(
+                    self.host, self.port, timeout=self.timeout_seconds)
+            try:
+                connection.request(method, path, body=body, headers=headers or {})
+                response = connection.getresponse()
+                return response.status, response.getheader('Content-Type', 'application/json'), response.read()
+            except (OSError, http.client.HTTPException) as e:
+                connection.close()
+                self._local.connection = None
+                if attempt or isinstance(e, TimeoutError):
+                    raise ShardUnavailable(f"{self.url}: {e}") from e
+
+
+class ShardRouter:
+    """Chọn shard cho từng request và gửi song song khi một request cần nhiều shard."""
+
+    def __init__(self, shard_urls=None, timeout_seconds=TIMEOUT_SECONDS):
+        shard_urls = SHARD_URLS if shard_urls is None else shard_urls
+        if not shard_urls:
+            raise ValueError("Chưa cấu hình RECOMMENDER_SHARD_URLS (địa chỉ các shard theo thứ tự).")
+        self.shards = [ShardClient(url, timeout_seconds) for url in shard_urls]
+        # Luồng của executor chỉ được tạo khi có request đầu tiên (an toàn khi fork)
+        self.executor = ThreadPoolExecutor(max_workers=FANOUT_THREADS_PER_SHARD * len(self.shards))
+
+    @property
+    def n_shards(self):
+        return len(self.shards)
+
+    def owner(self, entity_id):
+        return int(shard_of([entity_id], self.n_shards)[0])
+
+    def forward(self, index, method, path, body=None, headers=None):
+        """Gửi tới shard `index`, kèm nhãn shard đích để shard từ chối nếu cấu hình sai thứ tự."""
+        headers = {**(headers or {}), SHARD_HEADER: shard_label(index, self.n_shards)}
+        return self.shards[index].request(method, path, body, headers)
+
+    def recommend_for_users(self, user_ids, num_recs, alpha):
+        """Như POST /recommendations/users của API, theo thứ tự `user_ids`; lỗi của shard được trả nguyên."""
+        groups = {}
+        for user_id, index in zip(user_ids, shard_of(user_ids, self.n_shards).tolist()):
+            groups.setdefault(index, {})[user_id] = None
+
+        def send(index):
+            body = dumps({'user_ids': list(groups[index]), 'num_recs': num_recs, 'alpha': alpha})
+            return self.forward(index, 'POST', '/recommendations/users', body, {'Content-Type': 'application/json'})
+
+        recommendations = {}
+        for status, content_type, body in self.executor.map(send, groups):
+            if status != 200:
+                return status, content_type, body
+            for entry in json.loads(body):
+                recommendations[entry['user_id']] = entry['recommendations']
+        annotate(shards=len(groups))
+        return 200, 'application/json', dumps([{'user_id': user_id, 'recommendations': recommendations[user_id]}
+                                               for user_id in user_ids])
+
+    def broadcast(self, method, path, headers=None):
+        """Gửi tới mọi shard song song: danh sách (mã, Content-Type, nội dung) theo thứ tự shard."""
+        return list(self.executor.map(lambda index: self.forward(index, method, path, headers=headers),
+                                      range(self.n_shards)))
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+
+
+def shard_reply(status, content_type, body):
+    """Nội dung JSON của shard dạng dict; trang lỗi HTML, nội dung rỗng... thành {'error': <200 ký tự đầu>}."""
+    if (content_type or '').startswith('application/json'):
+        try:
+            reply = json.loads(body)
+            if isinstance(reply, dict):
+                return {'status': status, **reply}
+        except ValueError:
+            pass
+    return {'status': status, 'error': body[:200].decode(errors='replace')}
+
+
+def shard_response(result):
+    status, content_type, body = result
+    return Response(body, status=status, content_type=content_type)
+
+
+# ==============================================================================
+# TẠO ỨNG DỤNG FLASK CỦA ROUTER
+# ==============================================================================
+def create_app(router=None, **options):
+    """App Flask chuyển tiếp tới các shard; mặc định tạo ShardRouter(**options)."""
+    observability.configure_logging()
+    router = router or ShardRouter(**options)
+    app = Flask(__name__)
+    CORS(app)
+    app.extensions['recommender_router'] = router
+
+    @app.before_request
+    def start_request_timer():
+        observability.start_request()
+
+    @app.after_request
+    def log_request(response):
+        return observability.finish_request(response)
+
+    @app.errorhandler(ShardUnavailable)
+    def shard_unavailable(error):
+        logger.error(f"Shard không phản hồi: {error}")
+        return jsonify({"error": f"Shard không phản hồi: {error}"}), 502
+
+    @app.route('/recommendations/user', methods=['GET'])
+    def recommend_for_user_endpoint():
+        user_id = request.args.get('user_id', type=int)
+        if user_id is None:
+            return jsonify({"error": "Vui lòng cung cấp 'user_id'."}), 400
+        if not is_valid_id(user_id):
+            return jsonify({"error": "'user_id' nằm ngoài khoảng id hợp lệ."}), 400
+        index = router.owner(user_id)
+        annotate(user_id=user_id, shard=index)
+        with timed_stage('forward'):
+            return shard_response(router.forward(index, 'GET', request.full_path))
+
+    @app.route('/recommendations/users', methods=['POST'])
+    def recommend_for_users_endpoint():
+        payload = request.get_json(silent=True) or {}
+        user_ids = payload.get('user_ids')
+        if not isinstance(user_ids, list) or not user_ids:
+            return jsonify({"error": "Vui lòng cung cấp danh sách 'user_ids'."}), 400
+        if len(user_ids) > MAX_BATCH_USERS:
+            return jsonify({"error": f"Tối đa {MAX_BATCH_USERS} user_id cho mỗi yêu cầu."}), 400
+        try:
+            user_ids = [int(user_id) for user_id in user_ids]
+            num_recs = int(payload.get('num_recs', 5))
+            alpha = float(payload.get('alpha', 0.5))
+        except (TypeError, ValueError):
+            return jsonify({"error": "'user_ids', 'num_recs' và 'alpha' phải là số."}), 400
+        # Kiểm tra trước khi băm id (shard_of dùng int64) và trước khi gửi alpha đi các shard
+        if not all(is_valid_id(user_id) for user_id in user_ids):
+            return jsonify({"error": "'user_ids' có id nằm ngoài khoảng id hợp lệ."}), 400
+        if not is_valid_alpha(alpha):
+            return jsonify({"error": "'alpha' phải là số trong khoảng [0, 1]."}), 400
+        annotate(users=len(user_ids))
+        with timed_stage('forward'):
+            return shard_response(router.recommend_for_users(user_ids, num_recs, alpha))
+
+    @app.route('/recommendations/session', methods=['POST'])
+    def recommend_for_session_endpoint():
+        payload = request.get_json(silent=True) or {}
+        product_ids = payload.get('product_ids')
+        if not isinstance(product_ids, list) or not product_ids:
+            return jsonify({"error": "Vui lòng cung cấp danh sách 'product_ids'."}), 400
+        try:
+            first_product_id = int(product_ids[0])
+        except (TypeError, ValueError):
+            return jsonify({"error": "'product_ids', 'num_recs' và 'alpha' phải là số."}), 400
+        # Phần còn lại của payload do shard kiểm tra
+        if not is_valid_id(first_product_id):
+            return jsonify({"error": "'product_ids' có id nằm ngoài khoảng id hợp lệ."}), 400
+        index = router.owner(first_product_id)
+        annotate(shard=index)
+        with timed_stage('forward'):
+            return shard_response(router.forward(index, 'POST', '/recommendations/session', request.get_data(),
+                                                 {'Content-Type': 'application/json'}))
+
+    @app.route('/recommendations/item', methods=['GET'])
+    def recommend_for_item_endpoint():
+        product_id = request.args.get('product_id', type=int)
+        if product_id is None:
+            return jsonify({"error": "Vui lòng cung cấp 'product_id'."}), 400
+        if not is_valid_id(product_id):
+            return jsonify({"error": f"Không tìm thấy sản phẩm với product_id = {product_id}."}), 404
+        index = router.owner(product_id)
+        annotate(product_id=product_id, shard=index)
+        with timed_stage('forward'):
+            return shard_response(router.forward(index, 'GET', request.full_path))
+
+    @app.route('/admin/reload', methods=['POST'])
+    def reload_model_endpoint():
+        headers = {'X-Admin-Token': request.headers['X-Admin-Token']} if 'X-Admin-Token' in request.headers else {}
+        results = router.broadcast('POST', '/admin/reload', headers)
+        shards = []
+        for index, (status, content_type, body) in enumerate(results):
+            shards.append({'shard': shard_label(index, router.n_shards), **shard_reply(status, content_type, body)})
+        status = next((status for status, _, _ in results if status != 200), 200)
+        return jsonify({"shards": shards}), status
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics_endpoint():
+        """Chỉ số Prometheus của router (độ trễ chuyển tiếp); mỗi shard có /metrics riêng."""
+        return Response(observability.render_metrics(), mimetype=observability.CONTENT_TYPE_LATEST)
+
+    return app
+
+
+# Chạy router bằng server phát triển; production: gunicorn 'recommender.route:create_app()'
+def main():
+    app = create_app()
+    app.run(host=os.environ.get('RECOMMENDER_HOST', '0.0.0.0'),
+            port=int(os.environ.get('RECOMMENDER_PORT', '5001')),
+            debug=os.environ.get('RECOMMENDER_DEBUG') == '1', threaded=True)
+
+
+if __name__ == '__main__':
+    main()
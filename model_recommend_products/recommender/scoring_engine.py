@@ -0,0 +1,424 @@
+# @title Bộ máy chấm điểm gợi ý lai (tính theo yêu cầu từ các nhân tố SVD)
+# ==============================================================================
+# Thay vì giữ các bảng điểm dày đặc users×products (df_cf_scores, df_cbf_scores,
+# user_item_matrix_full), bộ máy này chỉ giữ:
+#   - nhân tố người dùng P (users×k) và nhân tố sản phẩm Q (items×k) của SVD hoặc ALS,
+#   - hồ sơ CBF của người dùng (CSR users×đặc trưng) và đặc trưng sản phẩm thưa
+#     (ContentFeatures: danh mục/khoảng giá tra theo chỉ số, TF-IDF dạng CSR),
+#   - tập sản phẩm đã mua của từng người dùng (dạng CSR),
+#   - tham số chuẩn hóa MinMax của CF và CBF (theo từng sản phẩm).
+# Điểm của một người dùng được tính lại khi có yêu cầu, top-k lấy bằng argpartition.
+# ==============================================================================
+import numpy as np
+import scipy.sparse as sp
+
+from .cf_backends import implicit_gram, solve_implicit_least_squares
+from .content_features import ContentFeatures
+from .model_bundle import IdRowMap
+
+BATCH_BLOCK_SIZE = 512
+# Id của "người dùng" tạm dựng từ một phiên mua sắm (session_engine); id thật luôn dương
+SESSION_USER_ID = -1
+
+
+def top_k_indices(scores, k):
+    """Trả về chỉ số của k điểm cao nhất (giảm dần) theo trục cuối, dùng argpartition."""
+    scores = np.asarray(scores)
+    n_items = scores.shape[-1]
+    k = min(int(k), n_items)
+    if k <= 0:
+        return np.empty(scores.shape[:-1] + (0,), dtype=np.intp)
+
+    if k < n_items:
+        candidates = np.argpartition(-scores, k - 1, axis=-1)[..., :k]
+    else:
+        candidates = np.broadcast_to(np.arange(n_items), scores.shape).copy()
+
+    # Chỉ sắp xếp k ứng viên thay vì toàn bộ danh mục sản phẩm
+    candidate_scores = np.take_along_axis(scores, candidates, axis=-1)
+    order = np.argsort(-candidate_scores, axis=-1, kind='stable')
+    return np.take_along_axis(candidates, order, axis=-1)
+
+
+def fit_minmax_scaler(user_matrix, item_matrix, block_size=BATCH_BLOCK_SIZE):
+    """Fit MinMaxScaler (theo từng sản phẩm) cho ma trận điểm user_matrix @ item_matrix.T.
+
+    Ma trận điểm users×items được tính theo từng khối người dùng và đưa vào
+    `partial_fit`, nên không bao giờ phải giữ toàn bộ ma trận trong bộ nhớ.
+    """
+    # Chỉ cần sklearn khi huấn luyện: API phục vụ từ các mảng đã lưu, không nhập sklearn
+    from sklearn.preprocessing import MinMaxScaler
+    scaler = MinMaxScaler()
+    for start in range(0, user_matrix.shape[0], block_size):
+        block_scores = user_matrix[start:start + block_size] @ item_matrix.T
+        scaler.partial_fit(block_scores.toarray() if sp.issparse(block_scores) else block_scores)
+    return scaler
+
+
+def fit_content_scaler(user_profiles, content, block_size=BATCH_BLOCK_SIZE):
+    """Như fit_minmax_scaler cho điểm CBF, tính bằng ContentFeatures.scores (tra chỉ số + tích thưa)."""
+    from sklearn.preprocessing import MinMaxScaler
+    user_profiles = sp.csr_matrix(user_profiles)
+    n_users = user_profiles.shape[0]
+    scaler = MinMaxScaler()
+    for start in range(0, n_users, block_size):
+        scaler.partial_fit(content.scores(user_profiles, np.arange(start, min(start + block_size, n_users))))
+    return scaler
+
+
+class HybridScoringEngine:
+    """Tính điểm lai CF + CBF cho từng người dùng theo yêu cầu."""
+
+    def __init__(self, user_ids, item_ids, user_factors, item_factors,
+                 user_profiles, content, purchased_indptr, purchased_indices,
+                 cf_scale, cf_min, cbf_scale, cbf_min, als_params=None):
+        self.user_ids = np.asarray(user_ids)
+        self.item_ids = np.asarray(item_ids)
+        self.user_factors = np.asarray(user_factors)
+        self.item_factors = np.asarray(item_factors)
+        self.user_profiles = sp.csr_matrix(user_profiles)
+        self.content = content
+        self.purchased_indptr = np.asarray(purchased_indptr)
+        self.purchased_indices = np.asarray(purchased_indices)
+        self.cf_scale = np.asarray(cf_scale)
+        self.cf_min = np.asarray(cf_min)
+        self.cbf_scale = np.asarray(cbf_scale)
+        self.cbf_min = np.asarray(cbf_min)
+        # [regularization, alpha] nếu nhân tố CF đến từ ImplicitALS (fold-in bằng cách giải lại)
+        self.als_params = None if als_params is None else np.asarray(als_params)
+
+        self.user_index = IdRowMap(self.user_ids)
+        self.item_index = IdRowMap(self.item_ids)
+        self._als_gram = None
+
+    # --------------------------------------------------------------------------
+    # Xây dựng từ kết quả huấn luyện và chuyển đổi sang/từ gói mô hình
+    # --------------------------------------------------------------------------
+    @classmethod
+    def from_training(cls, interactions, user_ids, item_ids, user_factors, item_factors,
+                      item_features, scaler_cf=None, scaler_cbf=None, als_params=None):
+        """Tạo bộ máy từ ma trận tương tác thưa, nhân tố SVD và đặc trưng sản phẩm.
+
+        `interactions` là CSR users×items (hàng theo `user_ids`, cột theo `item_ids`),
+        `user_factors` là P = fit_transform(...) (users×k), `item_factors` là
+        `components_` của SVD (k×items), `item_features` là ContentFeatures (hoặc ma trận
+        dày items×đặc trưng, ví dụ one-hot danh mục). Nếu không truyền scaler, tham số
+        chuẩn hóa được fit theo từng khối người dùng. `als_params` là `fold_in_params`
+        của mô hình ALS (None với TruncatedSVD).
+        """
+        interactions = sp.csr_matrix(interactions)
+        content = item_features if isinstance(item_features, ContentFeatures) else ContentFeatures.from_dense(item_features)
+        item_factors = np.asarray(item_factors).T
+        user_profiles = content.profiles(interactions)
+        if scaler_cf is None:
+            scaler_cf = fit_minmax_scaler(user_factors, item_factors)
+        if scaler_cbf is None:
+            scaler_cbf = fit_content_scaler(user_profiles, content)
+
+        return cls(
+            user_ids=user_ids,
+            item_ids=item_ids,
+            user_factors=user_factors,
+            item_factors=item_factors,
+            user_profiles=user_profiles,
+            content=content,
+            purchased_indptr=interactions.indptr,
+            purchased_indices=interactions.indices,
+            cf_scale=scaler_cf.scale_,
+            cf_min=scaler_cf.min_,
+            cbf_scale=scaler_cbf.scale_,
+            cbf_min=scaler_cbf.min_,
+            als_params=als_params,
+        )
+
+    def to_arrays(self):
+        arrays = {
+            'user_ids': self.user_ids, 'item_ids': self.item_ids,
+            'user_factors': self.user_factors, 'item_factors': self.item_factors,
+            'profile_indptr': self.user_profiles.indptr, 'profile_indices': self.user_profiles.indices,
+            'profile_data': self.user_profiles.data,
+            **self.content.to_arrays(),
+            'purchased_indptr': self.purchased_indptr, 'purchased_indices': self.purchased_indices,
+            'cf_scale': self.cf_scale, 'cf_min': self.cf_min,
+            'cbf_scale': self.cbf_scale, 'cbf_min': self.cbf_min,
+        }
+        if self.als_params is not None:
+            arrays['als_params'] = self.als_params
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        content = ContentFeatures.from_arrays(arrays)
+        user_profiles = sp.csr_matrix(
+            (arrays['profile_data'], arrays['profile_indices'], arrays['profile_indptr']),
+            shape=(len(arrays['profile_indptr']) - 1, content.n_features))
+        return cls(user_profiles=user_profiles, content=content, als_params=arrays.get('als_params'), **{
+            name: arrays[name] for name in (
+                'user_ids', 'item_ids', 'user_factors', 'item_factors', 'purchased_indptr',
+                'purchased_indices', 'cf_scale', 'cf_min', 'cbf_scale', 'cbf_min')})
+
+    # --------------------------------------------------------------------------
+    # Cập nhật tăng dần (fold-in) không cần huấn luyện lại
+    # --------------------------------------------------------------------------
+    def fold_in(self, user_ids, product_ids, quantities, history=None):
+        """Thêm các lượt mua mới vào mô hình và trả về bộ máy mới (bản hiện tại không bị sửa).
+
+        Với TruncatedSVD, nhân tố người dùng là P = X @ components_.T và hồ sơ CBF là
+        X @ đặc trưng sản phẩm, cả hai đều tuyến tính theo vector tương tác X. Vì vậy chỉ cần
+        chiếu phần tăng thêm của từng người dùng vào không gian ẩn đã có và cộng vào hàng
+        cũ; người dùng mới được thêm hàng mới. Sản phẩm chưa có trong mô hình bị bỏ qua
+        cho đến lần huấn luyện lại đầy đủ. Tham số chuẩn hóa giữ nguyên.
+
+        Với ALS, nhân tố người dùng không tuyến tính theo X: nhân tố của người dùng thay đổi
+        được giải lại từ toàn bộ lượt mua của họ, truyền qua `history` = (user_ids,
+        product_ids, quantities) tổng cộng đến thời điểm hiện tại.
+        """
+        cols = self.item_index.rows(np.asarray(product_ids, dtype=np.int64))
+        valid = cols >= 0
+        changed_ids, changed_pos = np.unique(np.asarray(user_ids, dtype=np.int64)[valid], return_inverse=True)
+        delta = sp.csr_matrix(
+            (np.asarray(quantities, dtype=np.float64)[valid], (changed_pos, cols[valid])),
+            shape=(len(changed_ids), len(self.item_ids)),
+        )
+        delta.sum_duplicates()
+
+        rows = self.user_index.rows(changed_ids)
+        new_ids = changed_ids[rows < 0]
+        rows[rows < 0] = len(self.user_ids) + np.arange(len(new_ids))
+        n_users = len(self.user_ids) + len(new_ids)
+
+        def grow(matrix):
+            grown = np.zeros((n_users, matrix.shape[1]), dtype=matrix.dtype)
+            grown[:len(matrix)] = matrix
+            return grown
+
+        user_factors = grow(self.user_factors)
+        if self.als_params is None:
+            user_factors[rows] += delta @ self.item_factors
+        else:
+            if history is None:
+                raise ValueError("Mô hình ALS cần `history` (toàn bộ lượt mua của người dùng thay đổi) để fold-in.")
+            history_users, history_products, history_quantities = (np.asarray(values) for values in history)
+            positions = IdRowMap(changed_ids).rows(history_users)
+            history_cols = self.item_index.rows(history_products)
+            keep = (positions >= 0) & (history_cols >= 0)
+            history_matrix = sp.csr_matrix(
+                (np.asarray(history_quantities, dtype=np.float64)[keep], (positions[keep], history_cols[keep])),
+                shape=(len(changed_ids), len(self.item_ids)))
+            history_matrix.sum_duplicates()
+            regularization, alpha = self.als_params
+            user_factors[rows] = solve_implicit_least_squares(self.item_factors, history_matrix, regularization, alpha)
+
+        # Phần tăng thêm theo hàng người dùng của mô hình mới (users×items)
+        delta_by_row = sp.csr_matrix(
+            (delta.data, (rows[np.repeat(np.arange(len(rows)), np.diff(delta.indptr))], delta.indices)),
+            shape=(n_users, len(self.item_ids)),
+        )
+        user_profiles = sp.csr_matrix(self.user_profiles, copy=True)
+        user_profiles.resize((n_users, self.content.n_features))
+        user_profiles = (user_profiles + self.content.profiles(delta_by_row)).tocsr()
+
+        # Tập đã mua = mẫu thưa của (tập cũ + lượt mua mới)
+        purchased = sp.csr_matrix(
+            (np.ones(len(self.purchased_indices)), self.purchased_indices, self.purchased_indptr),
+            shape=(len(self.user_ids), len(self.item_ids)),
+        )
+        purchased.resize((n_users, len(self.item_ids)))
+        purchased = (purchased + sp.csr_matrix(
+            (np.ones(delta_by_row.nnz), delta_by_row.indices, delta_by_row.indptr), shape=purchased.shape,
+        )).tocsr()
+        purchased.sort_indices()
+
+        return HybridScoringEngine(
+            user_ids=np.concatenate([self.user_ids, new_ids.astype(self.user_ids.dtype)]),
+            item_ids=self.item_ids,
+            user_factors=user_factors,
+            item_factors=self.item_factors,
+            user_profiles=user_profiles,
+            content=self.content,
+            purchased_indptr=purchased.indptr.astype(self.purchased_indptr.dtype),
+            purchased_indices=purchased.indices.astype(self.purchased_indices.dtype),
+            cf_scale=self.cf_scale,
+            cf_min=self.cf_min,
+            cbf_scale=self.cbf_scale,
+            cbf_min=self.cbf_min,
+            als_params=self.als_params,
+        )
+
+    def select_users(self, rows):
+        """Bộ máy chỉ gồm người dùng ở các hàng `rows` (theo thứ tự đó), ví dụ một shard
+        người dùng; dữ liệu phía sản phẩm và tham số chuẩn hóa giữ nguyên nên điểm không đổi."""
+        rows = np.asarray(rows, dtype=np.intp)
+        purchased = sp.csr_matrix(
+            (np.ones(len(self.purchased_indices)), self.purchased_indices, self.purchased_indptr),
+            shape=(len(self.user_ids), len(self.item_ids)),
+        )[rows]
+        return HybridScoringEngine(
+            user_ids=self.user_ids[rows],
+            item_ids=self.item_ids,
+            user_factors=self.user_factors[rows],
+            item_factors=self.item_factors,
+            user_profiles=self.user_profiles[rows],
+            content=self.content,
+            purchased_indptr=purchased.indptr.astype(self.purchased_indptr.dtype),
+            purchased_indices=purchased.indices.astype(self.purchased_indices.dtype),
+            cf_scale=self.cf_scale,
+            cf_min=self.cf_min,
+            cbf_scale=self.cbf_scale,
+            cbf_min=self.cbf_min,
+            als_params=self.als_params,
+        )
+
+    def session_engine(self, product_ids, quantities=None):
+        """Bộ máy một người dùng (id SESSION_USER_ID) dựng từ các sản phẩm của một phiên chưa gắn
+        với hàng người dùng nào (giỏ hàng, sản phẩm vừa xem), để gợi ý bằng đúng các hàm của
+        người dùng đã biết.
+
+        Phiên được fold-in như một người dùng mới (xem `fold_in`): nhân tố CF là phép chiếu
+        vector phiên lên nhân tố sản phẩm (ALS: giải một hệ k×k), hồ sơ CBF (danh mục, khoảng
+        giá, TF-IDF) là vector phiên × đặc trưng sản phẩm, và các sản phẩm của phiên được coi
+        là đã mua nên không được gợi ý lại. Dữ liệu phía sản phẩm dùng chung với bộ máy này.
+        Trả về None nếu không sản phẩm nào của phiên có trong mô hình.
+        """
+        cols = self.item_index.rows(np.asarray(product_ids, dtype=np.int64))
+        valid = cols >= 0
+        if not valid.any():
+            return None
+        weights = np.ones(len(cols)) if quantities is None else np.asarray(quantities, dtype=np.float64)
+        session = sp.csr_matrix((weights[valid], (np.zeros(valid.sum(), dtype=np.intp), cols[valid])),
+                                shape=(1, len(self.item_ids)))
+        session.sum_duplicates()
+
+        if self.als_params is None:
+            user_factors = session @ self.item_factors
+        else:
+            regularization, alpha = self.als_params
+            if self._als_gram is None:
+                # QᵀQ + λI chỉ phụ thuộc nhân tố sản phẩm: tính một lần cho mỗi gói mô hình
+                self._als_gram = implicit_gram(self.item_factors, regularization)
+            user_factors = solve_implicit_least_squares(self.item_factors, session, regularization, alpha,
+                                                        gram=self._als_gram)
+
+        return HybridScoringEngine(
+            user_ids=np.array([SESSION_USER_ID], dtype=self.user_ids.dtype),
+            item_ids=self.item_ids,
+            user_factors=np.asarray(user_factors, dtype=self.user_factors.dtype),
+            item_factors=self.item_factors,
+            # Chỉ dựng đặc trưng của các sản phẩm trong phiên thay vì cả danh mục
+            user_profiles=sp.csr_matrix(sp.csr_matrix(session.data[None, :]) @ self.content.matrix(session.indices)),
+            content=self.content,
+            purchased_indptr=session.indptr.astype(self.purchased_indptr.dtype),
+            purchased_indices=session.indices.astype(self.purchased_indices.dtype),
+            cf_scale=self.cf_scale,
+            cf_min=self.cf_min,
+            cbf_scale=self.cbf_scale,
+            cbf_min=self.cbf_min,
+            als_params=self.als_params,
+        )
+
+    # --------------------------------------------------------------------------
+    # Chấm điểm
+    # --------------------------------------------------------------------------
+    def has_user(self, user_id):
+        return user_id in self.user_index
+
+    def purchased_columns(self, row):
+        """Chỉ số cột các sản phẩm mà người dùng ở hàng `row` đã mua."""
+        return self.purchased_indices[self.purchased_indptr[row]:self.purchased_indptr[row + 1]]
+
+    def score_rows(self, rows, alpha):
+        """Điểm lai đã chuẩn hóa của nhiều người dùng (theo chỉ số hàng) trong một phép nhân ma trận."""
+        cf_scores = self.user_factors[rows] @ self.item_factors.T
+        cf_scores = cf_scores * self.cf_scale + self.cf_min
+        cbf_scores = self.content.scores(self.user_profiles, rows)
+        cbf_scores = cbf_scores * self.cbf_scale + self.cbf_min
+        return alpha * cf_scores + (1 - alpha) * cbf_scores
+
+    def score_user(self, user_id, alpha):
+        """Điểm lai đã chuẩn hóa của một người dùng trên toàn bộ sản phẩm."""
+        return self.score_rows([self.user_index[user_id]], alpha)[0]
+
+    def mask_purchased(self, scores, rows):
+        """Gán -inf cho các sản phẩm đã mua của từng hàng trong `scores` (tại chỗ)."""
+        rows = np.asarray(rows)
+        starts = self.purchased_indptr[rows]
+        counts = self.purchased_indptr[rows + 1] - starts
+        score_rows = np.repeat(np.arange(len(rows)), counts)
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        scores[score_rows, self.purchased_indices[np.repeat(starts, counts) + offsets]] = -np.inf
+        return scores
+
+    def score_columns(self, row, cols, alpha):
+        """Điểm lai đã chuẩn hóa của người dùng ở hàng `row`, chỉ trên các cột `cols`."""
+        cf_scores = (self.item_factors[cols] @ self.user_factors[row]) * self.cf_scale[cols] + self.cf_min[cols]
+        cbf_scores = self.content.scores(self.user_profiles, [row], cols)[0] * self.cbf_scale[cols] + self.cbf_min[cols]
+        return alpha * cf_scores + (1 - alpha) * cbf_scores
+
+    def rerank(self, row, cols, num_recommendations, alpha):
+        """Xếp hạng lại tập ứng viên `cols` (bỏ sản phẩm đã mua): (product_ids, hybrid_scores).
+
+        Trả về None nếu số ứng viên chưa mua ít hơn `num_recommendations`.
+        """
+        cols = cols[~np.isin(cols, self.purchased_columns(row))]
+        if len(cols) < num_recommendations:
+            return None
+        scores = self.score_columns(row, cols, alpha)
+        top = top_k_indices(scores, num_recommendations)
+        return self.item_ids[cols[top]], scores[top]
+
+    def score_row_sets(self, rows, cols, alpha):
+        """Điểm lai đã chuẩn hóa của hàng rows[i] trên các cột cols[i] (`cols` dạng rows×m)."""
+        cf_scores = np.matmul(self.item_factors[cols], self.user_factors[rows][:, :, None])[..., 0]
+        cf_scores = cf_scores * self.cf_scale[cols] + self.cf_min[cols]
+        cbf_scores = self.content.row_scores(self.user_profiles, rows, cols) * self.cbf_scale[cols] + self.cbf_min[cols]
+        return alpha * cf_scores + (1 - alpha) * cbf_scores
+
+    def rerank_batch(self, rows, candidate_sets, num_recommendations, alpha):
+        """`rerank` cho nhiều hàng: các tập ứng viên xếp thành ma trận rows×(tập lớn nhất), chấm
+        điểm trong một lượt và lấy top-k một lần; ô đệm có điểm -inf.
+
+        Trả về danh sách (product_ids, hybrid_scores) theo thứ tự `rows`; None ở hàng có ít
+        hơn `num_recommendations` ứng viên chưa mua.
+        """
+        candidate_sets = [cols[~np.isin(cols, self.purchased_columns(row))] for row, cols in zip(rows, candidate_sets)]
+        lengths = np.array([len(cols) for cols in candidate_sets], dtype=np.intp)
+        filled = np.arange(lengths.max(initial=0)) < lengths[:, None]
+        padded_cols = np.zeros(filled.shape, dtype=np.intp)
+        padded_cols[filled] = np.concatenate(candidate_sets or [np.empty(0, dtype=np.intp)])
+        scores = np.where(filled, self.score_row_sets(rows, padded_cols, alpha), -np.inf)
+        top = top_k_indices(scores, num_recommendations)
+        return [None if length < num_recommendations
+                else (self.item_ids[row_cols[row_top]], row_scores[row_top])
+                for length, row_cols, row_scores, row_top in zip(lengths, padded_cols, scores, top)]
+
+    def top_rows(self, rows, num_recommendations, alpha):
+        """Top sản phẩm chưa mua của các hàng `rows`: (cột, điểm) dạng mảng rows×num.
+
+        Vị trí không đủ sản phẩm (đã mua gần hết) có điểm -inf.
+        """
+        hybrid_scores = self.mask_purchased(self.score_rows(rows, alpha), rows)
+        top_cols = top_k_indices(hybrid_scores, num_recommendations)
+        return top_cols, np.take_along_axis(hybrid_scores, top_cols, axis=1)
+
+    def recommend(self, user_id, num_recommendations, alpha):
+        """Trả về (product_ids, hybrid_scores) của các sản phẩm chưa mua có điểm cao nhất."""
+        return self.recommend_batch([user_id], num_recommendations, alpha)[user_id]
+
+    def recommend_batch(self, user_ids, num_recommendations, alpha, block_size=BATCH_BLOCK_SIZE):
+        """Gợi ý cho nhiều người dùng đã biết: dict user_id -> (product_ids, hybrid_scores).
+
+        Người dùng được chấm điểm theo từng khối `block_size` hàng để giới hạn bộ nhớ;
+        người dùng không có trong mô hình bị bỏ qua (API xử lý như người dùng mới).
+        """
+        unique_ids = np.array(list(dict.fromkeys(user_ids)), dtype=np.int64)
+        all_rows = self.user_index.rows(unique_ids)
+        known_ids, known_rows = unique_ids[all_rows >= 0].tolist(), all_rows[all_rows >= 0]
+        results = {}
+        for start in range(0, len(known_ids), block_size):
+            block_ids = known_ids[start:start + block_size]
+            rows = known_rows[start:start + block_size]
+            top_cols, top_scores = self.top_rows(rows, num_recommendations, alpha)
+            for user_id, cols, scores in zip(block_ids, top_cols, top_scores):
+                finite = np.isfinite(scores)
+                results[user_id] = (self.item_ids[cols[finite]], scores[finite])
+        return results
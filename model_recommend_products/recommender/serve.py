@@ -0,0 +1,472 @@
+# @title API (Tối ưu hóa SQL, lấy category_id)
+# ==============================================================================
+# create_app() dựng app Flask cùng RecommenderService: engine CSDL, bộ nhớ đệm và các
+# gói mô hình của tiến trình. Import module này không mở kết nối, không nạp mô hình và
+# không cần sklearn/pandas, nên test, benchmark và worker mới đều khởi động nhanh.
+# Chạy:
+#   python -m recommender serve        server phát triển (một tiến trình)
+#   gunicorn -c gunicorn.conf.py       production (app = recommender.serve:create_app())
+#   phân mảnh theo người dùng: mỗi shard là một API như trên, đứng sau router (shard.py, route.py)
+# Cấu hình qua biến môi trường (CSDL và thư mục mô hình: xem config.py):
+#   RECOMMENDER_ADMIN_TOKEN, RECOMMENDER_RELOAD_POLL_SECONDS,
+#   RECOMMENDER_MATERIALIZED_MAX_AGE_SECONDS, RECOMMENDER_REDIS_URL,
+#   RECOMMENDER_MICRO_BATCH_WINDOW_MS, RECOMMENDER_MICRO_BATCH_MAX_SIZE,
+#   RECOMMENDER_HOST, RECOMMENDER_PORT, RECOMMENDER_DEBUG
+# ==============================================================================
+import math
+import os
+import signal
+import threading
+import time
+from flask import Flask, Response, request, jsonify
+from flask_cors import CORS
+
+from . import config, observability
+from .observability import annotate, record_cold_start, timed_stage
+
+from .candidate_retrieval import CandidateIndex
+from .item_neighbors import ItemNeighborIndex
+from .materialized_recommendations import (DEFAULT_MAX_AGE_SECONDS, MATERIALIZED_DIRNAME,
+                                           MaterializedRecommendations, fresh_lookup)
+from .micro_batching import DEFAULT_MAX_BATCH_SIZE, MicroBatcher
+from .model_bundle import ModelStore
+from .popularity import PopularityRanking
+from .product_repository import ProductRepository, create_pooled_engine
+from .recommendations import (find_similar_products, recommend_for_known_users, recommend_for_session,
+                              recommend_for_user)
+from .response_encoding import dumps, records_array
+from .result_cache import ResultCache, create_redis_client, quantize_alpha, result_key
+from .scoring_engine import HybridScoringEngine
+from .sharding import SHARD_HEADER, manifest_shard_label
+
+MAX_BATCH_USERS = 5000
+MAX_SESSION_PRODUCTS = 200
+# Khoảng hợp lệ của id (BIGINT của CSDL): id được tra trong các mảng int64 của gói mô hình
+MIN_ID, MAX_ID = -2 ** 63, 2 ** 63 - 1
+# Đặt biến môi trường này để yêu cầu header X-Admin-Token cho các endpoint quản trị
+ADMIN_TOKEN = os.environ.get('RECOMMENDER_ADMIN_TOKEN')
+# Chu kỳ (giây) kiểm tra con trỏ CURRENT để nhận phiên bản mới từ `recommender update`; 0 để tắt
+RELOAD_POLL_SECONDS = float(os.environ.get('RECOMMENDER_RELOAD_POLL_SECONDS', '5'))
+# Tuổi tối đa (giây) của gợi ý tính sẵn hằng đêm; quá hạn thì chấm điểm trực tiếp
+MATERIALIZED_MAX_AGE_SECONDS = float(os.environ.get('RECOMMENDER_MATERIALIZED_MAX_AGE_SECONDS',
+                                                    DEFAULT_MAX_AGE_SECONDS))
+# Gom các request /recommendations/user đồng thời của một worker (nhiều luồng) thành lô
+# trong cửa sổ này (mili giây, ví dụ 2) hoặc đến khi đủ MAX_SIZE người dùng; 0 để tắt
+MICRO_BATCH_WINDOW_SECONDS = float(os.environ.get('RECOMMENDER_MICRO_BATCH_WINDOW_MS', '0')) / 1000
+MICRO_BATCH_MAX_SIZE = int(os.environ.get('RECOMMENDER_MICRO_BATCH_MAX_SIZE', DEFAULT_MAX_BATCH_SIZE))
+
+# Gói mô hình có phiên bản: các mảng .npy được mmap (dùng chung trang nhớ giữa các worker)
+MODEL_COMPONENTS = {
+    'scoring_engine': HybridScoringEngine,   # nhân tố CF, hồ sơ CBF, tập đã mua
+    'item_neighbors': ItemNeighborIndex,     # bảng top-N sản phẩm tương tự
+    'popularity': PopularityRanking,         # bảng xếp hạng bán chạy cho người dùng mới
+    'candidate_index': CandidateIndex,       # truy hồi ứng viên hai giai đoạn (không có trong gói cũ)
+}
+OPTIONAL_COMPONENTS = ('candidate_index',)
+
+# Log có cấu trúc (một dòng JSON mỗi sự kiện) thay cho print; handler được gắn trong create_app
+logger = observability.logger
+
+
+def is_valid_alpha(alpha):
+    """alpha là số hữu hạn trong [0, 1]; NaN, ±inf hay ngoài khoảng bị endpoint từ chối (400)."""
+    return math.isfinite(alpha) and 0 <= alpha <= 1
+
+
+def is_valid_id(entity_id):
+    """id vừa kiểu int64 của gói mô hình; id lớn hơn không thể có trong CSDL."""
+    return MIN_ID <= entity_id <= MAX_ID
+
+
+class RecommenderService:
+    """Trạng thái phục vụ của một tiến trình và các hàm gợi ý dùng cho endpoint.
+
+    Khởi tạo chỉ tạo engine (chưa mở kết nối nào); `load()` nạp gói mô hình.
+    """
+
+    def __init__(self, db_uri=None, model_dir=None, admin_token=ADMIN_TOKEN,
+                 reload_poll_seconds=RELOAD_POLL_SECONDS,
+                 materialized_max_age_seconds=MATERIALIZED_MAX_AGE_SECONDS, redis_client=None,
+                 micro_batch_window_seconds=MICRO_BATCH_WINDOW_SECONDS, micro_batch_max_size=MICRO_BATCH_MAX_SIZE):
+        self.model_dir = model_dir or config.MODEL_DIR
+        self.admin_token = admin_token
+        self.reload_poll_seconds = reload_poll_seconds
+        self.materialized_max_age_seconds = materialized_max_age_seconds
+
+        # Engine CSDL (có connection pool) và tầng truy cập sản phẩm có bộ nhớ đệm
+        try:
+            self.engine = create_pooled_engine(db_uri or config.database_uri())
+        except Exception as e:
+            logger.error(f"Lỗi kết nối CSDL: {e}")
+            raise
+        self.product_repository = ProductRepository(self.engine)
+        # Bộ nhớ đệm kết quả: LRU trong tiến trình + Redis nếu đặt RECOMMENDER_REDIS_URL
+        self.result_cache = ResultCache(redis_client if redis_client is not None else create_redis_client())
+
+        self.model_store = ModelStore(self.model_dir, MODEL_COMPONENTS, optional=OPTIONAL_COMPONENTS)
+        # Top-N tính sẵn của `recommender materialize` (có thể chưa có)
+        self.materialized_store = ModelStore(os.path.join(self.model_dir, MATERIALIZED_DIRNAME), {
+            'top_n': MaterializedRecommendations,
+        })
+        self.micro_batcher = (MicroBatcher(self._score_micro_batch, micro_batch_window_seconds, micro_batch_max_size)
+                              if micro_batch_window_seconds > 0 else None)
+        self._watcher_pid = None
+
+    # --------------------------------------------------------------------------
+    # Nạp và theo dõi phiên bản mô hình
+    # --------------------------------------------------------------------------
+    def load(self):
+        """Nạp gói mô hình hiện tại (mmap, không đọc dữ liệu vào bộ nhớ) và gợi ý tính sẵn."""
+        try:
+            if self.model_store.reload():
+                logger.info("Đã tải mô hình.", extra={'fields': {
+                    'model_version': self.model_store.version,
+                    'shard': manifest_shard_label(self.model_store.current.manifest)}})
+            else:
+                logger.warning("Chưa có gói mô hình. Hãy chạy `python -m recommender train`; "
+                               "API sẽ trả 503 cho đến khi nạp được mô hình.")
+        except (FileNotFoundError, KeyError) as e:
+            logger.error(f"Lỗi khi tải gói mô hình: {e}. API sẽ trả 503 cho đến khi nạp được mô hình.")
+        self.reload_materialized()
+
+    def reload_materialized(self):
+        """Nạp phiên bản gợi ý tính sẵn mới nếu có; lỗi chỉ được ghi log (API vẫn chấm trực tiếp)."""
+        try:
+            if self.materialized_store.reload():
+                logger.info("Đã nạp gợi ý tính sẵn.", extra={'fields': {
+                    'materialized_version': self.materialized_store.version,
+                    'source_version': self.materialized_store.current.manifest.get('source_version')}})
+        except (FileNotFoundError, KeyError) as e:
+            logger.error(f"Lỗi khi nạp gợi ý tính sẵn: {e}")
+
+    def reload_in_background(self, signum=None, frame=None):
+        """Nạp lại mô hình trong luồng riêng để không chặn luồng đang nhận tín hiệu."""
+        threading.Thread(target=self.model_store.reload, daemon=True).start()
+        threading.Thread(target=self.reload_materialized, daemon=True).start()
+
+    def poll_model_version(self):
+        """Định kỳ đọc CURRENT; chỉ nạp lại khi phiên bản thay đổi (mỗi lần kiểm tra chỉ đọc một file nhỏ)."""
+        while True:
+            time.sleep(self.reload_poll_seconds)
+            try:
+                if self.model_store.reload():
+                    logger.info("Đã chuyển sang mô hình mới.",
+                                extra={'fields': {'model_version': self.model_store.version}})
+            except (FileNotFoundError, KeyError) as e:
+                logger.error(f"Lỗi khi nạp gói mô hình mới: {e}")
+            self.reload_materialized()
+
+    def start_model_watcher(self):
+        """Bật luồng theo dõi CURRENT cho tiến trình hiện tại (một lần mỗi tiến trình).
+
+        Không tự chạy trong create_app: với gunicorn --preload, app được tạo trong tiến
+        trình master trước khi fork, mà luồng không được sao chép sang worker.
+        gunicorn.conf.py gọi after_fork() trong post_fork của từng worker.
+        """
+        if self.reload_poll_seconds <= 0 or self._watcher_pid == os.getpid():
+            return
+        self._watcher_pid = os.getpid()
+        threading.Thread(target=self.poll_model_version, daemon=True).start()
+
+    def after_fork(self):
+        # Không dùng chung kết nối trong pool của master giữa các tiến trình
+        self.engine.dispose(close=False)
+        # Worker được fork sau khi có phiên bản mới (ví dụ sau SIGHUP) thì nạp ngay phiên bản đó
+        self.model_store.reload()
+        self.start_model_watcher()
+
+    def close(self):
+        self.engine.dispose()
+
+    # --------------------------------------------------------------------------
+    # Các hàm gợi ý (SỬ DỤNG SQL)
+    # --------------------------------------------------------------------------
+    def products_body(self, product_ids, score_field=None, scores=None):
+        """JSON của danh sách sản phẩm theo thứ tự `product_ids` (kèm điểm nếu có), ghép từ các
+        mảnh đã tuần tự hóa sẵn trong bộ nhớ đệm sản phẩm; id không còn trong CSDL bị bỏ qua."""
+        with timed_stage('db_fetch'):
+            fragments = self.product_repository.get_fragments(product_ids) if product_ids else {}
+        with timed_stage('merge'):
+            if score_field is not None:
+                found = [(fragments[product_id], score) for product_id, score in zip(product_ids, scores)
+                         if product_id in fragments]
+                scores = [score for _, score in found]
+                fragments = [fragment for fragment, _ in found]
+            else:
+                fragments = [fragments[product_id] for product_id in product_ids if product_id in fragments]
+        with timed_stage('serialize'):
+            return records_array(fragments, score_field, scores)
+
+    # Hàm gợi ý lai: tính điểm của một người dùng theo yêu cầu từ bộ máy chấm điểm
+    def hybrid_recommend_for_user(self, user_id, num_recommendations, alpha, category_id=None, window_days=None):
+        """Trả về (product_ids, điểm) đã xếp hạng; người dùng mới nhận bảng bán chạy với điểm None."""
+        model = self.model_store.current
+        annotate(user_id=user_id)
+        with timed_stage('score'):
+            if model.scoring_engine.has_user(user_id):
+                # Bản tính sẵn hằng đêm nếu còn mới (chỉ là một lần tra hàng trong file mmap)
+                materialized = fresh_lookup(self.materialized_store.current, model.version, user_id,
+                                            num_recommendations, alpha, self.materialized_max_age_seconds)
+                annotate(materialized=materialized is not None)
+                if materialized is not None:
+                    top_product_ids, top_scores = materialized
+                    return top_product_ids.tolist(), top_scores.tolist()
+            if self.micro_batcher is not None and model.scoring_engine.has_user(user_id):
+                (top_product_ids, top_scores), batch_requests = self.micro_batcher.submit(
+                    (model, user_id, num_recommendations, alpha))
+                annotate(micro_batch_requests=batch_requests)
+            else:
+                top_product_ids, top_scores = recommend_for_user(model, user_id, num_recommendations, alpha,
+                                                                 category_id, window_days)
+        if top_scores is None:
+            # Người dùng mới: gợi ý sản phẩm bán chạy nhất
+            record_cold_start()
+            return top_product_ids.tolist(), None
+        return top_product_ids.tolist(), top_scores.tolist()
+
+    def _score_micro_batch(self, keys):
+        """Hàm chấm của MicroBatcher: khóa (gói mô hình, user_id, num, alpha) đã bỏ trùng, mỗi
+        nhóm (gói, num, alpha) chấm một lượt. Khóa giữ gói mô hình của request nên người dùng
+        luôn được chấm trên đúng gói đã kiểm tra has_user, kể cả khi mô hình vừa đổi phiên bản."""
+        observability.record_micro_batch(len(keys))
+        groups = {}
+        for model, user_id, num_recommendations, alpha in keys:
+            groups.setdefault((model, num_recommendations, alpha), []).append(user_id)
+        results = {}
+        for (model, num_recommendations, alpha), user_ids in groups.items():
+            scored = recommend_for_known_users(model, user_ids, num_recommendations, alpha)
+            for user_id in user_ids:
+                results[(model, user_id, num_recommendations, alpha)] = scored[user_id]
+        return results
+
+    # Gợi ý cho nhiều người dùng: chấm điểm theo lô và lấy chi tiết sản phẩm bằng một truy vấn
+    def hybrid_recommend_for_users(self, user_ids, num_recommendations, alpha):
+        """JSON [{"user_id": ..., "recommendations": [...]}, ...] theo thứ tự `user_ids`."""
+        model = self.model_store.current
+        with timed_stage('score'):
+            scored = model.scoring_engine.recommend_batch(user_ids, num_recommendations, alpha)
+            popular_ids = model.popularity.top(num_recommendations).tolist()
+        annotate(users=len(user_ids))
+        cold_starts = len(set(user_ids) - scored.keys())
+        if cold_starts:
+            record_cold_start(cold_starts)
+
+        with timed_stage('db_fetch'):
+            product_ids_to_fetch = set(popular_ids)
+            for product_ids, _ in scored.values():
+                product_ids_to_fetch.update(product_ids.tolist())
+            fragments = self.product_repository.get_fragments(sorted(product_ids_to_fetch))
+
+        with timed_stage('serialize'):
+            popular_body = records_array([fragments[product_id] for product_id in popular_ids
+                                          if product_id in fragments])
+            results = []
+            for user_id in user_ids:
+                if user_id in scored:
+                    product_ids, scores = scored[user_id]
+                    found = [(fragments[product_id], score)
+                             for product_id, score in zip(product_ids.tolist(), scores.tolist())
+                             if product_id in fragments]
+                    recommendations = records_array([fragment for fragment, _ in found], 'hybrid_score',
+                                                    [score for _, score in found])
+                else:
+                    recommendations = popular_body
+                results.append(b'{"user_id":' + dumps(user_id) + b',"recommendations":' + recommendations + b'}')
+            return b'[' + b','.join(results) + b']'
+
+    # Gợi ý theo phiên (giỏ hàng, sản phẩm vừa xem): chấm hoàn toàn trong bộ nhớ từ gói mô hình
+    def session_recommendations_body(self, product_ids, num_recommendations, alpha):
+        """JSON gợi ý cho các sản phẩm của một phiên; không sản phẩm nào có trong mô hình thì trả bảng bán chạy."""
+        annotate(session_products=len(product_ids))
+        with timed_stage('score'):
+            top_product_ids, top_scores = recommend_for_session(self.model_store.current, product_ids,
+                                                                num_recommendations, alpha)
+        if top_scores is None:
+            return self.products_body(top_product_ids.tolist())
+        return self.products_body(top_product_ids.tolist(), 'hybrid_score', top_scores.tolist())
+
+    # Hàm tìm sản phẩm tương tự: tra cứu bảng lân cận đã tính sẵn
+    def find_similar_products(self, product_id, num_similar):
+        """Trả về (product_ids, độ tương tự), hoặc None nếu sản phẩm không có trong mô hình."""
+        annotate(product_id=product_id)
+        with timed_stage('score'):
+            similar = find_similar_products(self.model_store.current, product_id, num_similar)
+        if similar is None:
+            return None
+        similar_ids, similarity_scores = similar
+        return similar_ids.tolist(), similarity_scores.tolist()
+
+    def user_recommendations_body(self, user_id, num_recs, alpha, category_id, window_days):
+        product_ids, scores = self.hybrid_recommend_for_user(user_id, num_recs, alpha, category_id, window_days)
+        if scores is None:
+            return self.products_body(product_ids)
+        return self.products_body(product_ids, 'hybrid_score', scores)
+
+    def similar_products_body(self, product_id, num_similar):
+        similar = self.find_similar_products(product_id, num_similar)
+        if similar is None:
+            return None
+        similar_ids, similarity_scores = similar
+        body = self.products_body(similar_ids, 'similarity_score', similarity_scores)
+        return body if body != b'[]' else None  # không lưu kết quả rỗng vào bộ nhớ đệm
+
+
+def json_response(body):
+    return Response(body, mimetype='application/json')
+
+
+# ==============================================================================
+# TẠO ỨNG DỤNG FLASK VÀ CÁC ĐIỂM TRUY CẬP API (API ENDPOINTS)
+# ==============================================================================
+def create_app(service=None, **options):
+    """App Flask phục vụ `service`; mặc định tạo RecommenderService(**options) và nạp mô hình."""
+    observability.configure_logging()
+    if service is None:
+        service = RecommenderService(**options)
+        service.load()
+    app = Flask(__name__)
+    CORS(app)
+    app.extensions['recommender'] = service
+    observability.register_serving_state(service.model_store, service.product_repository.cache,
+                                         service.result_cache)
+
+    @app.before_request
+    def start_request_timer():
+        observability.start_request()
+
+    @app.after_request
+    def log_request(response):
+        return observability.finish_request(response, service.model_store.version)
+
+    @app.before_request
+    def require_loaded_model():
+        if request.path.startswith('/recommendations') and service.model_store.current is None:
+            return jsonify({"error": "Mô hình gợi ý chưa sẵn sàng."}), 503
+
+    @app.before_request
+    def require_owning_shard():
+        # Chỉ áp dụng khi chạy gói shard sau router: shard khác chỉ thấy người dùng này là người
+        # dùng mới và trả gợi ý sai mà không báo lỗi, nên từ chối khi router gửi nhầm shard
+        expected = request.headers.get(SHARD_HEADER)
+        if expected is None or not request.path.startswith('/recommendations'):
+            return None
+        label = manifest_shard_label(service.model_store.current.manifest)
+        if label is not None and label != expected:
+            return jsonify({"error": f"Request dành cho shard {expected}, tiến trình này phục vụ shard {label}."}), 421
+
+    @app.route('/recommendations/user', methods=['GET'])
+    def recommend_for_user_endpoint():
+        user_id = request.args.get('user_id', type=int)
+        num_recs = request.args.get('num_recs', default=5, type=int)
+        # alpha được lượng tử hóa (bước 0.05) để các yêu cầu gần giống nhau dùng chung kết quả đã lưu
+        alpha = request.args.get('alpha', default=0.5, type=float)
+        # Tùy chọn cho người dùng mới: bán chạy theo danh mục hoặc trong n ngày gần nhất
+        category_id = request.args.get('category_id', type=int)
+        window_days = request.args.get('window_days', type=int)
+        if user_id is None:
+            return jsonify({"error": "Vui lòng cung cấp 'user_id'."}), 400
+        if not is_valid_id(user_id):
+            return jsonify({"error": "'user_id' nằm ngoài khoảng id hợp lệ."}), 400
+        if not is_valid_alpha(alpha):
+            return jsonify({"error": "'alpha' phải là số trong khoảng [0, 1]."}), 400
+        alpha = quantize_alpha(alpha)
+        key = result_key('user', service.model_store.version, user_id=user_id, num_recs=num_recs, alpha=alpha,
+                         category_id=category_id, window_days=window_days)
+        body, source = service.result_cache.get_or_compute(
+            key, lambda: service.user_recommendations_body(user_id, num_recs, alpha, category_id, window_days))
+        annotate(result_cache=source)
+        return json_response(body)
+
+    @app.route('/recommendations/users', methods=['POST'])
+    def recommend_for_users_endpoint():
+        payload = request.get_json(silent=True) or {}
+        user_ids = payload.get('user_ids')
+        if not isinstance(user_ids, list) or not user_ids:
+            return jsonify({"error": "Vui lòng cung cấp danh sách 'user_ids'."}), 400
+        if len(user_ids) > MAX_BATCH_USERS:
+            return jsonify({"error": f"Tối đa {MAX_BATCH_USERS} user_id cho mỗi yêu cầu."}), 400
+        try:
+            user_ids = [int(user_id) for user_id in user_ids]
+            num_recs = int(payload.get('num_recs', 5))
+            alpha = float(payload.get('alpha', 0.5))
+        except (TypeError, ValueError):
+            return jsonify({"error": "'user_ids', 'num_recs' và 'alpha' phải là số."}), 400
+        if not all(is_valid_id(user_id) for user_id in user_ids):
+            return jsonify({"error": "'user_ids' có id nằm ngoài khoảng id hợp lệ."}), 400
+        if not is_valid_alpha(alpha):
+            return jsonify({"error": "'alpha' phải là số trong khoảng [0, 1]."}), 400
+        return json_response(service.hybrid_recommend_for_users(user_ids, num_recs, alpha))
+
+    @app.route('/recommendations/session', methods=['POST'])
+    def recommend_for_session_endpoint():
+        """Gợi ý bán kèm cho giỏ hàng / sản phẩm vừa xem, kể cả khách chưa đăng nhập:
+        {"product_ids": [...], "num_recs": 5, "alpha": 0.5}."""
+        payload = request.get_json(silent=True) or {}
+        product_ids = payload.get('product_ids')
+        if not isinstance(product_ids, list) or not product_ids:
+            return jsonify({"error": "Vui lòng cung cấp danh sách 'product_ids'."}), 400
+        if len(product_ids) > MAX_SESSION_PRODUCTS:
+            return jsonify({"error": f"Tối đa {MAX_SESSION_PRODUCTS} product_id cho mỗi yêu cầu."}), 400
+        try:
+            product_ids = [int(product_id) for product_id in product_ids]
+            num_recs = int(payload.get('num_recs', 5))
+            alpha = float(payload.get('alpha', 0.5))
+        except (TypeError, ValueError):
+            return jsonify({"error": "'product_ids', 'num_recs' và 'alpha' phải là số."}), 400
+        if not all(is_valid_id(product_id) for product_id in product_ids):
+            return jsonify({"error": "'product_ids' có id nằm ngoài khoảng id hợp lệ."}), 400
+        if not is_valid_alpha(alpha):
+            return jsonify({"error": "'alpha' phải là số trong khoảng [0, 1]."}), 400
+        return json_response(service.session_recommendations_body(product_ids, num_recs, alpha))
+
+    @app.route('/recommendations/item', methods=['GET'])
+    def recommend_for_item_endpoint():
+        product_id = request.args.get('product_id', type=int)
+        num_similar = request.args.get('num_similar', default=3, type=int)
+        if product_id is None:
+            return jsonify({"error": "Vui lòng cung cấp 'product_id'."}), 400
+        if num_similar < 0:
+            return jsonify({"error": "'num_similar' không được âm."}), 400
+        key = result_key('item', service.model_store.version, product_id=product_id, num_similar=num_similar)
+        body, source = service.result_cache.get_or_compute(
+            key, lambda: service.similar_products_body(product_id, num_similar))
+        annotate(result_cache=source)
+        if body is None:
+            return jsonify({"error": f"Không tìm thấy sản phẩm với product_id = {product_id}."}), 404
+        return json_response(body)
+
+    @app.route('/admin/reload', methods=['POST'])
+    def reload_model_endpoint():
+        if service.admin_token and request.headers.get('X-Admin-Token') != service.admin_token:
+            return jsonify({"error": "Không có quyền."}), 403
+        try:
+            reloaded = service.model_store.reload()
+            service.reload_materialized()
+        except (FileNotFoundError, KeyError) as e:
+            return jsonify({"error": f"Không thể nạp gói mô hình: {e}"}), 500
+        return jsonify({"version": service.model_store.version, "reloaded": reloaded})
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics_endpoint():
+        """Chỉ số Prometheus: độ trễ từng bước, người dùng mới, phiên bản mô hình, bộ nhớ đệm."""
+        return Response(observability.render_metrics(), mimetype=observability.CONTENT_TYPE_LATEST)
+
+    return app
+
+
+# Chạy server phát triển (một tiến trình). Môi trường production dùng gunicorn (gunicorn.conf.py).
+# Cổng mặc định 5001 để không trùng với backend Node (cổng 5000).
+def main():
+    app = create_app()
+    service = app.extensions['recommender']
+    # `kill -HUP <pid>` để chuyển sang phiên bản mô hình mới mà không cần khởi động lại
+    if hasattr(signal, 'SIGHUP'):
+        signal.signal(signal.SIGHUP, service.reload_in_background)
+    service.start_model_watcher()
+    app.run(host=os.environ.get('RECOMMENDER_HOST', '0.0.0.0'),
+            port=int(os.environ.get('RECOMMENDER_PORT', '5001')),
+            debug=os.environ.get('RECOMMENDER_DEBUG') == '1', threaded=True)
+
+
+if __name__ == '__main__':
+    main()
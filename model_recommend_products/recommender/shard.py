@@ -0,0 +1,47 @@
+# ==============================================================================
+# CHIA GÓI MÔ HÌNH THEO NGƯỜI DÙNG CHO CHẾ ĐỘ PHỤC VỤ PHÂN MẢNH
+# ==============================================================================
+# Chạy sau mỗi lần `train`/`update` (shard đã chia từ đúng phiên bản hiện tại được bỏ qua):
+#   SHARD_COUNT=4 python -m recommender shard
+# Mỗi shard là một API thường trỏ tới thư mục của nó (xem sharding.py), ví dụ trên một máy:
+#   RECOMMENDER_MODEL_DIR=saved_models/shards/0-of-4 RECOMMENDER_PORT=5101 python -m recommender serve
+#   ...
+#   RECOMMENDER_MODEL_DIR=saved_models/shards/3-of-4 RECOMMENDER_PORT=5104 python -m recommender serve
+#   RECOMMENDER_SHARD_URLS=http://127.0.0.1:5101,...,http://127.0.0.1:5104 python -m recommender route
+# Gợi ý tính sẵn của một shard: RECOMMENDER_MODEL_DIR=<thư mục shard> python -m recommender materialize
+# ==============================================================================
+import os
+import sys
+import time
+
+from . import config
+from .sharding import write_shards
+
+DEFAULT_SHARD_COUNT = 2
+
+
+def main():
+    model_dir = config.MODEL_DIR
+    n_shards = int(os.environ.get('SHARD_COUNT', DEFAULT_SHARD_COUNT))
+
+    start_time = time.perf_counter()
+    print("--- CHIA GÓI MÔ HÌNH THEO NGƯỜI DÙNG ---")
+    if n_shards < 1:
+        print(f"❌ SHARD_COUNT phải lớn hơn 0 (nhận {n_shards}).")
+        sys.exit(1)
+
+    try:
+        version, shards = write_shards(model_dir, n_shards)
+    except FileNotFoundError:
+        print("❌ Chưa có gói mô hình. Hãy chạy `python -m recommender train` trước.")
+        sys.exit(1)
+    for directory, shard_version, n_users in shards:
+        if shard_version is None:
+            print(f"⏭️  {directory}: đã chia từ phiên bản {version} ({n_users} người dùng).")
+        else:
+            print(f"✅ {directory}: phiên bản {shard_version} ({n_users} người dùng).")
+    print(f"✅ Đã chia mô hình {version} thành {n_shards} shard trong {time.perf_counter() - start_time:.2f}s.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+# @title Chia gói mô hình theo người dùng cho chế độ phục vụ phân mảnh (nhiều tiến trình/máy)
+# ==============================================================================
+# Người dùng thuộc shard shard_of(user_id, N): băm splitmix64 rồi lấy dư, ổn định giữa
+# các tiến trình, máy và lần chạy, phân bố đều kể cả khi id liên tiếp. Mỗi shard là một
+# thư mục mô hình bình thường
+#   saved_models/shards/<i>-of-<N>/CURRENT, bundles/<phiên bản>/...
+# chỉ chứa các hàng người dùng của nó (nhân tố CF, hồ sơ CBF, tập đã mua); dữ liệu phía
+# sản phẩm (nhân tố sản phẩm, đặc trưng, bảng lân cận, bán chạy, chỉ mục ứng viên) được
+# chép nguyên vào mọi shard. Vì vậy mỗi shard chạy bằng chính API thường
+# (RECOMMENDER_MODEL_DIR=<thư mục shard>) và `recommender route` chuyển request tới
+# shard sở hữu người dùng. RAM của một tiến trình chỉ còn tỉ lệ với 1/N số người dùng.
+# ==============================================================================
+import os
+
+import numpy as np
+
+from .candidate_retrieval import CandidateIndex
+from .item_neighbors import ItemNeighborIndex
+from .model_bundle import load_bundle, read_current_version, read_manifest, write_bundle
+from .popularity import PopularityRanking
+from .scoring_engine import HybridScoringEngine
+
+SHARDS_DIRNAME = 'shards'
+# Router gửi kèm shard đích; API của shard khác trả 421 (cấu hình sai thứ tự shard)
+SHARD_HEADER = 'X-Recommender-Shard'
+# Thành phần phía sản phẩm: chép nguyên vào mọi shard
+REPLICATED_COMPONENTS = {
+    'item_neighbors': ItemNeighborIndex,
+    'popularity': PopularityRanking,
+    'candidate_index': CandidateIndex,
+}
+
+
+def shard_of(user_ids, n_shards):
+    """Chỉ số shard sở hữu từng user_id (mảng cùng kích thước); id phải vừa int64 (endpoint đã kiểm tra)."""
+    x = np.asarray(user_ids, dtype=np.int64).astype(np.uint64)
+    with np.errstate(over='ignore'):
+        x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        x = x ^ (x >> np.uint64(31))
+    return (x % np.uint64(n_shards)).astype(np.intp)
+
+
+def shard_label(index, n_shards):
+    return f'{index}-of-{n_shards}'
+
+
+def shard_dir(model_dir, index, n_shards):
+    return os.path.join(model_dir, SHARDS_DIRNAME, shard_label(index, n_shards))
+
+
+def manifest_shard_label(manifest):
+    """Nhãn shard ghi trong manifest của gói, hoặc None nếu là gói đầy đủ."""
+    if 'n_shards' not in manifest:
+        return None
+    return shard_label(manifest['shard'], manifest['n_shards'])
+
+
+def write_shards(model_dir, n_shards):
+    """Chia gói CURRENT của `model_dir` thành `n_shards` gói shard.
+
+    Trả về (phiên bản nguồn, [(thư mục shard, phiên bản shard hoặc None nếu giữ nguyên, số
+    người dùng)]). Shard đã được chia từ đúng phiên bản nguồn thì bỏ qua, nên chạy lại sau
+    mỗi lần train/update là đủ.
+    """
+    version = read_current_version(model_dir)
+    if version is None:
+        raise FileNotFoundError(f"Chưa có gói mô hình trong {model_dir}")
+    bundle = load_bundle(model_dir, version, {'scoring_engine': HybridScoringEngine, **REPLICATED_COMPONENTS},
+                         optional=('candidate_index',))
+    engine = bundle.scoring_engine
+    replicated = {name: getattr(bundle, name) for name in REPLICATED_COMPONENTS if hasattr(bundle, name)}
+    owners = shard_of(engine.user_ids, n_shards)
+
+    written = []
+    for index in range(n_shards):
+        directory = shard_dir(model_dir, index, n_shards)
+        rows = np.flatnonzero(owners == index)
+        current = read_current_version(directory)
+        if current is not None and read_manifest(directory, current).get('source_version') == version:
+            written.append((directory, None, len(rows)))
+            continue
+        shard_version = write_bundle(directory, {'scoring_engine': engine.select_users(rows), **replicated},
+                                     id_maps=bundle.manifest.get('id_maps'),
+                                     metadata={'source_version': version, 'shard': index, 'n_shards': n_shards})
+        written.append((directory, shard_version, len(rows)))
+    return version, written
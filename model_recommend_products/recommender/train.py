@@ -0,0 +1,263 @@
+# ==============================================================================
+# QUY TRÌNH HOÀN CHỈNH - ĐIỀU CHỈNH THEO CSDL 'websellproduct'
+# ==============================================================================
+# Chạy:  python -m recommender train
+# Cấu hình qua biến môi trường: CSDL và thư mục mô hình (config.py), CF_BACKEND,
+# CF_WORKERS, CBF_FEATURES, TRAINING_FORCE_STAGES, TRAINING_DEMO=1.
+# ==============================================================================
+import os
+import sys
+
+import joblib
+import pandas as pd
+
+from . import config
+from .candidate_retrieval import CandidateIndex
+from .cf_backends import DEFAULT_CF_BACKEND, create_cf_model
+from .content_features import DEFAULT_FEATURE_GROUPS, build_content_features
+from .interactions import interaction_matrix_from_frame, load_interactions
+from .item_neighbors import ItemNeighborIndex
+from .model_bundle import ModelBundle, read_current_version, read_manifest, write_bundle
+from .popularity import PopularityRanking
+from .recommendations import find_similar_products, recommend_for_user
+from .scoring_engine import HybridScoringEngine, fit_content_scaler, fit_minmax_scaler
+from .training_pipeline import PIPELINE_CACHE_DIRNAME, PipelineRunner, Stage, content_hash
+
+# 1. Bảng sản phẩm (JOIN `products` và `categories`)
+# Sử dụng `AS` để đổi tên cột cho khớp với phần còn lại của quy trình
+SQL_PRODUCTS = """
+SELECT
+    p.id AS product_id,
+    p.name AS product_name,
+    p.category_id,
+    p.price,
+    c.name AS category
+FROM
+    products AS p
+LEFT JOIN
+    categories AS c ON p.category_id = c.id;
+"""
+
+
+def load_products(engine):
+    products_df = pd.read_sql(SQL_PRODUCTS, engine)
+    # Xử lý trường hợp có sản phẩm không có danh mục
+    products_df['category'] = products_df['category'].fillna('Chưa phân loại')
+    return products_df
+
+
+def load_training_data(engine, snapshot_path):
+    """Bảng sản phẩm và bộ cộng dồn tương tác (chỉ đọc các đơn hàng sau ảnh chụp, nếu có)."""
+    return load_products(engine), load_interactions(engine, snapshot_path)
+
+
+def create_runner(output_dir, products_df, interaction_accumulator, log=print):
+    """PipelineRunner với bộ nhớ đệm trong `output_dir` và các đầu vào lấy từ CSDL."""
+    runner = PipelineRunner(os.path.join(output_dir, PIPELINE_CACHE_DIRNAME), log=log)
+    runner.set('products_df', products_df)
+    runner.set('product_ids', products_df['product_id'].unique())
+    runner.set('ratings_df', interaction_accumulator.to_frame())
+    runner.set('daily_sales_df', interaction_accumulator.daily_sales_frame())
+    return runner
+
+
+# ==============================================================================
+# CÁC BƯỚC HUẤN LUYỆN (CHẠY BẰNG PipelineRunner, LƯU ĐỆM THEO BĂM ĐẦU VÀO)
+# ==============================================================================
+# Mỗi bước chỉ chạy lại khi đầu vào, tham số hoặc mã nguồn của nó thay đổi; kết quả
+# trung gian nằm trong saved_models/pipeline_cache. Lần chạy sau một lần lỗi tiếp tục
+# từ bước hỏng. TRAINING_FORCE_STAGES=cf,cbf để buộc chạy lại một số bước.
+
+# ------------------------------------------------------------------------------
+# BƯỚC 2: CHUẨN BỊ MA TRẬN TỪ TOÀN BỘ DỮ LIỆU (DẠNG THƯA - CSR)
+# ------------------------------------------------------------------------------
+def stage_matrix(ratings_df, product_ids):
+    # Ma trận được dựng trực tiếp từ các dòng tương tác với id mã hóa thành số nguyên:
+    # hàng theo user_ids (đã sắp xếp), cột theo toàn bộ product_id trong bảng sản phẩm.
+    matrix, user_ids, item_ids = interaction_matrix_from_frame(ratings_df, all_product_ids=product_ids)
+    density = matrix.nnz / max(1, matrix.shape[0] * matrix.shape[1])
+    print(f"   Ma trận User-Item thưa: kích thước {matrix.shape}, {matrix.nnz} phần tử khác 0 (mật độ {density:.2%})")
+    return {'matrix': matrix, 'user_ids': user_ids, 'item_ids': item_ids}
+
+# ------------------------------------------------------------------------------
+# BƯỚC 3: HUẤN LUYỆN MÔ HÌNH CUỐI CÙNG VỚI k TỐI ƯU
+# ------------------------------------------------------------------------------
+# Mô hình CF chọn bằng CF_BACKEND: 'svd' (TruncatedSVD) hoặc 'als' (ALS cho phản hồi ngầm,
+# giải song song trên CF_WORKERS luồng, mặc định mọi lõi). Cả hai làm việc trực tiếp trên
+# ma trận thưa và cho cùng dạng kết quả: nhân tố người dùng và components_ (k×items).
+def stage_cf(matrix, backend=DEFAULT_CF_BACKEND, max_k=10, random_state=42):
+    k_value = min(max_k, matrix.shape[1] - 1, matrix.shape[0] - 1)
+    if k_value < 1:
+        print("Lỗi: Không đủ dữ liệu (sản phẩm hoặc người dùng) để huấn luyện mô hình. Cần ít nhất 2 user và 2 product.")
+        sys.exit(1)
+    print(f"   Sử dụng mô hình {backend}, k = {k_value} để huấn luyện trên toàn bộ dữ liệu...")
+    cf_model = create_cf_model(backend, k_value, random_state=random_state,
+                               n_workers=int(os.environ.get('CF_WORKERS', '0')) or None)
+    user_factors = cf_model.fit_transform(matrix)
+    return {'cf_model': cf_model, 'user_factors': user_factors}
+
+# ------------------------------------------------------------------------------
+# BƯỚC 4: TẠO CÁC CÔNG CỤ GỢI Ý
+# ------------------------------------------------------------------------------
+# Không dựng ma trận dự đoán users×items: chỉ giữ nhân tố P, Q và fit tham số
+# chuẩn hóa theo từng khối người dùng.
+def stage_cf_scaler(user_factors, cf_model):
+    return {'scaler_cf': fit_minmax_scaler(user_factors, cf_model.components_.T)}
+
+# BƯỚC 4.5: MÔ HÌNH LỌC DỰA TRÊN NỘI DUNG (CBF)
+# Nhóm đặc trưng qua biến môi trường, ví dụ CBF_FEATURES=category,price,name
+# (danh mục và khoảng giá tra theo chỉ số, TF-IDF tên sản phẩm dạng CSR)
+def stage_cbf(products_df, item_ids, matrix, groups=DEFAULT_FEATURE_GROUPS):
+    content_features = build_content_features(products_df, item_ids, groups=groups)
+    # Hồ sơ người dùng = ma trận thưa × đặc trưng thưa (CSR users×đặc trưng)
+    user_profiles = content_features.profiles(matrix)
+    return {'content_features': content_features, 'scaler_cbf': fit_content_scaler(user_profiles, content_features)}
+
+def stage_scoring_engine(matrix, user_ids, item_ids, user_factors, cf_model, content_features, scaler_cf, scaler_cbf):
+    return {'scoring_engine': HybridScoringEngine.from_training(
+        matrix, user_ids, item_ids, user_factors, cf_model.components_, content_features, scaler_cf, scaler_cbf,
+        als_params=getattr(cf_model, 'fold_in_params', None))}
+
+def stage_item_neighbors(item_ids, cf_model):
+    return {'item_neighbors': ItemNeighborIndex.build(item_ids, cf_model.components_.T)}
+
+def stage_popularity(daily_sales_df, products_df):
+    # Không lưu đệm: cửa sổ 7/30 ngày tính theo thời điểm chạy
+    return {'popularity': PopularityRanking.build(daily_sales_df, products_df)}
+
+def stage_candidate_index(scoring_engine, popularity):
+    # Chỉ mục ứng viên cho API: cụm vector CF + nhóm bán chạy theo danh mục và toàn cửa hàng
+    return {'candidate_index': CandidateIndex.build(scoring_engine, popularity)}
+
+
+def training_stages(cf_backend=DEFAULT_CF_BACKEND, cbf_feature_groups=DEFAULT_FEATURE_GROUPS):
+    return (
+        Stage('matrix', stage_matrix, inputs=('ratings_df', 'product_ids'), outputs=('matrix', 'user_ids', 'item_ids')),
+        Stage('cf', stage_cf, inputs=('matrix',), outputs=('cf_model', 'user_factors'),
+              params={'backend': cf_backend, 'max_k': 10, 'random_state': 42}),
+        Stage('cf_scaler', stage_cf_scaler, inputs=('user_factors', 'cf_model'), outputs=('scaler_cf',)),
+        Stage('cbf', stage_cbf, inputs=('products_df', 'item_ids', 'matrix'),
+              outputs=('content_features', 'scaler_cbf'), params={'groups': list(cbf_feature_groups)}),
+        Stage('scoring_engine', stage_scoring_engine,
+              inputs=('matrix', 'user_ids', 'item_ids', 'user_factors', 'cf_model', 'content_features',
+                      'scaler_cf', 'scaler_cbf'), outputs=('scoring_engine',)),
+        Stage('item_neighbors', stage_item_neighbors, inputs=('item_ids', 'cf_model'), outputs=('item_neighbors',)),
+        Stage('popularity', stage_popularity, inputs=('daily_sales_df', 'products_df'), outputs=('popularity',),
+              cached=False),
+        Stage('candidate_index', stage_candidate_index, inputs=('scoring_engine', 'popularity'),
+              outputs=('candidate_index',)),
+    )
+
+
+# ------------------------------------------------------------------------------
+# BƯỚC 6: SỬ DỤNG MÔ HÌNH LAI (chỉ khi TRAINING_DEMO=1)
+# ------------------------------------------------------------------------------
+def run_demo(model, products_df, user_id=8, num_recs=5, product_id=1, num_similar=3):
+    """In gợi ý cho một người dùng và các sản phẩm tương tự, dùng đúng các hàm của API."""
+    print("\n--- BƯỚC 6: TRÌNH DIỄN MÔ HÌNH LAI ---")
+
+    # --- Ví dụ 1: Gợi ý cho một người dùng cụ thể bằng mô hình Lai ---
+    # Dựa trên dữ liệu của bạn, user_id=8 có nhiều giao dịch.
+    print(f"\n✨ Gợi ý cho User ID {user_id} (Cân bằng giữa CF và CBF, alpha=0.5):")
+    top_ids, top_scores = recommend_for_user(model, user_id, num_recs, alpha=0.5)
+    if top_scores is None:
+        print(f"Lỗi: User ID {user_id} là người dùng mới hoặc chưa mua hàng. Chuyển sang gợi ý sản phẩm bán chạy nhất.")
+        print(products_df[products_df['product_id'].isin(top_ids)])
+    else:
+        recommendations = pd.DataFrame({'product_id': top_ids, 'hybrid_score': top_scores})
+        print(recommendations.merge(products_df, on='product_id')[
+            ['product_id', 'product_name', 'category', 'hybrid_score']])
+
+    # --- Ví dụ 2: Tìm các sản phẩm tương tự ---
+    # product_id=1 là 'Trà Sữa Trân Châu Đường Đen'
+    print(f"\n✨ Tìm {num_similar} sản phẩm tương tự với sản phẩm ID {product_id}:")
+    similar = find_similar_products(model, product_id, num_similar)
+    if similar is None:
+        print(f"Lỗi: Không tìm thấy product_id {product_id} trong ma trận đặc tính.")
+        return
+    similar_products = pd.DataFrame({'product_id': similar[0], 'similarity_score': similar[1]})
+    print(similar_products.merge(products_df, on='product_id')[['product_id', 'product_name', 'similarity_score']])
+
+
+# ==============================================================================
+# BƯỚC 7: LƯU MÔ HÌNH VÀ CÁC ĐỐI TƯỢNG CẦN THIẾT RA FILE
+# ==============================================================================
+def publish(output_dir, runner, results, products_df, cf_backend):
+    """Ghi gói mô hình mới (trừ khi CURRENT đã khớp kết quả huấn luyện); trả về phiên bản."""
+    os.makedirs(output_dir, exist_ok=True)
+    # Gói mô hình có phiên bản cho API (mảng .npy + manifest, đọc bằng mmap):
+    # - bộ máy chấm điểm: chỉ nhân tố, hồ sơ CBF, tập đã mua và tham số chuẩn hóa
+    # - bảng top-N sản phẩm tương tự cho /recommendations/item, tính từ nhân tố sản phẩm
+    # - bảng xếp hạng bán chạy (toàn bộ, theo danh mục, theo khung thời gian) cho người dùng mới
+    # - chỉ mục ứng viên: API chỉ xếp hạng lại vài trăm sản phẩm thay vì toàn bộ danh mục
+    bundle_components = {name: results[name] for name in
+                         ('scoring_engine', 'item_neighbors', 'popularity', 'candidate_index')}
+    # Khóa huấn luyện ghi vào manifest: nếu CURRENT đã là gói của đúng các kết quả này thì không ghi lại
+    training_key = content_hash([runner.hashes[name] for name in bundle_components])
+    current_version = read_current_version(output_dir)
+    current_manifest = read_manifest(output_dir, current_version) if current_version else {}
+    if current_manifest.get('training_key') == training_key:
+        print(f"✅ Gói mô hình {current_version} đang phục vụ đã khớp kết quả huấn luyện, không cần ghi lại.")
+        return current_version
+
+    cf_model = results['cf_model']
+    df_final_q = pd.DataFrame(cf_model.components_.T, index=results['item_ids'],
+                              columns=[f'Feature_{i+1}' for i in range(cf_model.n_components)])
+    df_final_q.index.name = 'product_id'
+    df_final_q_with_names = df_final_q.merge(products_df,
+                                             left_index=True, right_on='product_id').set_index('product_id')
+    joblib.dump(cf_model, os.path.join(output_dir, f'{cf_backend}_model.joblib'))
+    joblib.dump(results['scaler_cf'], os.path.join(output_dir, 'scaler_cf.joblib'))
+    joblib.dump(results['scaler_cbf'], os.path.join(output_dir, 'scaler_cbf.joblib'))
+    products_df.to_pickle(os.path.join(output_dir, 'products_df.pkl'))
+    df_final_q_with_names.to_pickle(os.path.join(output_dir, 'df_final_q_with_names.pkl'))
+
+    model_version = write_bundle(output_dir, bundle_components,
+                                 id_maps={'users': 'scoring_engine/user_ids.npy', 'items': 'scoring_engine/item_ids.npy'},
+                                 metadata={'training_key': training_key})
+    print(f"✅ Đã ghi gói mô hình phiên bản {model_version} (API nạp lại bằng SIGHUP hoặc POST /admin/reload).")
+    return model_version
+
+
+def main():
+    output_dir = config.MODEL_DIR
+    cf_backend = os.environ.get('CF_BACKEND', DEFAULT_CF_BACKEND)
+    cbf_feature_groups = config.parse_values(os.environ.get('CBF_FEATURES'), str.strip, DEFAULT_FEATURE_GROUPS)
+
+    # --------------------------------------------------------------------------
+    # BƯỚC 1: KẾT NỐI VÀ TẢI DỮ LIỆU TỪ MYSQL
+    # --------------------------------------------------------------------------
+    print("--- BƯỚC 1: KẾT NỐI VÀ TẢI DỮ LIỆU TỪ MYSQL ---")
+    engine = config.create_database_engine()
+    # Tương tác (JOIN `order_items` và `orders`) được đọc theo luồng, từng khối.
+    # Ảnh chụp tương tác đã cộng dồn được lưu sau mỗi lần huấn luyện; lần sau chỉ đọc
+    # các đơn hàng mới hơn watermark thay vì toàn bộ lịch sử.
+    snapshot_path = config.interactions_snapshot_path(output_dir)
+    products_df, interaction_accumulator = load_training_data(engine, snapshot_path)
+    runner = create_runner(output_dir, products_df, interaction_accumulator)
+    print(f"✅ Đã tải thành công {len(products_df)} sản phẩm.")
+    print(f"✅ Đã đọc {interaction_accumulator.rows_read} dòng tương tác mới "
+          f"(tổng {len(runner.values['ratings_df'])} cặp user-sản phẩm, "
+          f"watermark: {interaction_accumulator.watermark}).")
+
+    print("\n--- BƯỚC 2-4.5: CHẠY CÁC BƯỚC HUẤN LUYỆN ---")
+    results = runner.run(training_stages(cf_backend, cbf_feature_groups),
+                         force=config.parse_values(os.environ.get('TRAINING_FORCE_STAGES'), str.strip, ()))
+    skipped = sum(entry['status'] == 'cached' for entry in runner.report)
+    print(f"✅ Đã tạo bộ máy chấm điểm lai (CF + CBF); {skipped}/{len(runner.report)} bước dùng lại kết quả đã lưu.")
+
+    if os.environ.get('TRAINING_DEMO') == '1':
+        run_demo(ModelBundle(None, {}, {name: results[name] for name in
+                                        ('scoring_engine', 'item_neighbors', 'popularity', 'candidate_index')}),
+                 products_df)
+
+    print("\n--- BƯỚC 7: LƯU MÔ HÌNH VÀ DỮ LIỆU ---")
+    publish(output_dir, runner, results, products_df, cf_backend)
+    # Chỉ lưu ảnh chụp tương tác (và watermark) khi cả quy trình đã chạy thành công
+    interaction_accumulator.save(snapshot_path)
+
+    print(f"\n✅ Đã lưu thành công tất cả mô hình và dữ liệu vào thư mục '{output_dir}'.")
+
+
+if __name__ == '__main__':
+    main()
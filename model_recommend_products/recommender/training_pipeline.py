@@ -0,0 +1,307 @@
+# @title Quy trình huấn luyện theo bước: lưu đệm theo băm đầu vào, chạy tiếp khi lỗi
+# ==============================================================================
+# Mỗi bước (Stage) khai báo tên các đầu vào, đầu ra và tham số. Khóa của bước là băm
+# của (tên, mã nguồn, tham số, băm các đầu vào); "mã nguồn" gồm hàm của bước, các hàm/lớp
+# cùng module mà nó gọi và toàn bộ module của gói mà nó dùng (kèm các module của gói mà
+# những module đó nhập), cộng PIPELINE_VERSION và `version` của bước. Đầu ra được lưu tại
+#   saved_models/pipeline_cache/<bước>/<khóa>/
+#     meta.json              <- ghi cuối cùng (thư mục được đổi tên nguyên tử khi xong)
+#     <đầu ra>/<mảng>.npy    <- mảng numpy, ma trận CSR, DataFrame (mỗi cột một file),
+#                               đối tượng có to_arrays()/from_arrays()
+#     <đầu ra>.joblib        <- đối tượng khác (ví dụ MinMaxScaler, TruncatedSVD)
+# Lần chạy sau, bước có khóa đã có trên đĩa được bỏ qua và đầu ra nạp lại (mmap). Vì mỗi
+# bước xong là được lưu ngay, lần chạy sau một lần lỗi tự tiếp tục từ bước hỏng.
+# Bước không lưu đệm (cached=False, ví dụ đọc CSDL) luôn chạy; băm đầu ra của nó tính
+# theo nội dung, nên các bước sau vẫn được bỏ qua nếu dữ liệu không đổi.
+# ==============================================================================
+import hashlib
+import importlib
+import inspect
+import json
+import os
+import shutil
+import sys
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+PIPELINE_CACHE_DIRNAME = 'pipeline_cache'
+META_FILENAME = 'meta.json'
+# Số phiên bản đầu ra giữ lại cho mỗi bước (các khóa cũ hơn bị xóa)
+KEEP_ENTRIES_PER_STAGE = 3
+# Tăng để bỏ mọi kết quả đã lưu, ví dụ khi đổi định dạng lưu hoặc nâng thư viện (sklearn, numpy)
+PIPELINE_VERSION = 1
+
+
+def _source(value):
+    try:
+        return inspect.getsource(value)
+    except (OSError, TypeError):
+        return getattr(value, '__qualname__', repr(value))
+
+
+def _code_names(code):
+    """Tên toàn cục mà `code` dùng, kể cả trong hàm lồng và lambda."""
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if inspect.iscode(const):
+            names |= _code_names(const)
+    return names
+
+
+def _module_name(value):
+    return value.__name__ if inspect.ismodule(value) else getattr(value, '__module__', None)
+
+
+def code_fingerprint(function, package=__package__):
+    """Băm mã nguồn mà `function` phụ thuộc trong gói `package`.
+
+    Hàm/lớp cùng module với `function` được băm theo mã nguồn riêng (đệ quy qua các tên chúng
+    dùng), nên sửa phần khác của module chứa bước (ví dụ `main`) không làm bước chạy lại. Module
+    khác của gói được băm nguyên file, cùng mọi module của gói mà nó nhập: sửa một hàm phụ như
+    fit_minmax_scaler hay CandidateIndex.build làm khóa đổi.
+    """
+    def in_package(module_name):
+        return bool(package) and module_name is not None and (
+            module_name == package or module_name.startswith(package + '.'))
+
+    home = function.__module__
+    pending, seen, modules = [function], set(), set()
+    sources = []
+    while pending:
+        value = pending.pop()
+        if id(value) in seen:
+            continue
+        seen.add(id(value))
+        sources.append(_source(value))
+        # Hàm: mã của chính nó; lớp: mã của các phương thức. Tên được tra trong module `home`.
+        codes = [value.__code__] if hasattr(value, '__code__') else [
+            getattr(member, '__func__', member).__code__ for member in vars(value).values()
+            if hasattr(getattr(member, '__func__', member), '__code__')]
+        namespace = vars(sys.modules[home])
+        for code in codes:
+            for name in sorted(_code_names(code)):
+                referenced = namespace.get(name)
+                module_name = _module_name(referenced)
+                if module_name == home and not inspect.ismodule(referenced) and callable(referenced):
+                    pending.append(referenced)
+                elif in_package(module_name) and module_name != home:
+                    modules.add(module_name)
+
+    # Bao đóng các module của gói được dùng (qua `from .x import y` hoặc `from . import x`)
+    pending_modules, module_sources = sorted(modules), {}
+    while pending_modules:
+        module_name = pending_modules.pop()
+        if module_name in module_sources:
+            continue
+        module = sys.modules.get(module_name)
+        module_sources[module_name] = _source(module) if module is not None else module_name
+        for value in vars(module).values() if module is not None else ():
+            dependency = _module_name(value)
+            if in_package(dependency) and dependency not in module_sources:
+                pending_modules.append(dependency)
+
+    digest = hashlib.sha256()
+    for source in sorted(sources) + [f'{name}\n{module_sources[name]}' for name in sorted(module_sources)]:
+        digest.update(source.encode('utf-8'))
+    return digest.hexdigest()
+
+
+class Stage:
+    """Một bước: `run(**inputs, **params)` trả về dict {tên đầu ra: giá trị}.
+
+    `version`: tăng khi bước phụ thuộc thay đổi mà mã nguồn của gói không thấy (thư viện,
+    dữ liệu tham chiếu bên ngoài).
+    """
+
+    def __init__(self, name, run, inputs=(), outputs=(), params=None, cached=True, version=None):
+        self.name = name
+        self.run = run
+        self.inputs = tuple(inputs)
+        self.outputs = tuple(outputs)
+        self.params = dict(params or {})
+        self.cached = cached
+        self.version = version
+
+    def source_hash(self):
+        """Băm mã nguồn của bước và phần của gói mà nó dùng: sửa hàm của bước hoặc một hàm phụ
+        thì khóa đổi và bước (cùng các bước sau, vì băm đầu ra suy từ khóa) chạy lại."""
+        return code_fingerprint(self.run)
+
+
+def content_hash(value):
+    """Băm nội dung của một giá trị (mảng numpy được băm trực tiếp trên bộ nhớ)."""
+    if hasattr(value, 'to_arrays'):
+        value = value.to_arrays()
+    return joblib.hash(value)
+
+
+# ------------------------------------------------------------------------------
+# Lưu/nạp đầu ra của một bước
+# ------------------------------------------------------------------------------
+def _save_arrays(directory, arrays):
+    os.makedirs(directory)
+    for array_name, array in arrays.items():
+        array = np.asarray(array)
+        np.save(os.path.join(directory, f'{array_name}.npy'), array, allow_pickle=array.dtype == object)
+
+
+def _load_arrays(directory, names):
+    arrays = {}
+    for array_name in names:
+        path = os.path.join(directory, f'{array_name}.npy')
+        try:
+            arrays[array_name] = np.load(path, mmap_mode='r')
+        except ValueError:  # mảng object (ví dụ cột chuỗi của DataFrame) không mmap được
+            arrays[array_name] = np.load(path, allow_pickle=True)
+    return arrays
+
+
+def save_artefact(entry_dir, name, value):
+    """Ghi `value` vào thư mục của bước; trả về mô tả (ghi vào meta.json) để nạp lại."""
+    path = os.path.join(entry_dir, name)
+    if isinstance(value, pd.DataFrame):
+        columns = [str(column) for column in value.columns]
+        _save_arrays(path, {f'col{i}': value[column].to_numpy() for i, column in enumerate(value.columns)})
+        return {'kind': 'frame', 'columns': columns}
+    if sp.issparse(value):
+        value = sp.csr_matrix(value)
+        _save_arrays(path, {'data': value.data, 'indices': value.indices, 'indptr': value.indptr,
+                            'shape': np.asarray(value.shape)})
+        return {'kind': 'csr'}
+    if isinstance(value, np.ndarray):
+        _save_arrays(path, {'array': value})
+        return {'kind': 'array'}
+    if hasattr(value, 'to_arrays') and hasattr(type(value), 'from_arrays'):
+        arrays = value.to_arrays()
+        _save_arrays(path, arrays)
+        return {'kind': 'arrays', 'type': f'{type(value).__module__}.{type(value).__qualname__}',
+                'arrays': list(arrays)}
+    joblib.dump(value, f'{path}.joblib')
+    return {'kind': 'joblib'}
+
+
+def load_artefact(entry_dir, name, meta):
+    path = os.path.join(entry_dir, name)
+    kind = meta['kind']
+    if kind == 'frame':
+        arrays = _load_arrays(path, [f'col{i}' for i in range(len(meta['columns']))])
+        return pd.DataFrame({column: np.array(arrays[f'col{i}']) for i, column in enumerate(meta['columns'])})
+    if kind == 'csr':
+        arrays = _load_arrays(path, ['data', 'indices', 'indptr', 'shape'])
+        return sp.csr_matrix((arrays['data'], arrays['indices'], arrays['indptr']),
+                             shape=tuple(int(n) for n in arrays['shape']))
+    if kind == 'array':
+        return _load_arrays(path, ['array'])['array']
+    if kind == 'arrays':
+        module_name, _, type_name = meta['type'].rpartition('.')
+        component_type = getattr(importlib.import_module(module_name), type_name)
+        return component_type.from_arrays(_load_arrays(path, meta['arrays']))
+    return joblib.load(f'{path}.joblib')
+
+
+# ------------------------------------------------------------------------------
+# Bộ chạy
+# ------------------------------------------------------------------------------
+class PipelineRunner:
+    """Chạy lần lượt các bước, bỏ qua bước có khóa đã lưu; `values`/`hashes` giữ kết quả theo tên."""
+
+    def __init__(self, cache_dir, keep_entries=KEEP_ENTRIES_PER_STAGE, log=print):
+        self.cache_dir = cache_dir
+        self.keep_entries = keep_entries
+        self.log = log
+        self.values = {}
+        self.hashes = {}
+        self.report = []
+
+    def set(self, name, value):
+        """Đưa một giá trị ngoài quy trình vào (băm theo nội dung)."""
+        self.values[name] = value
+        self.hashes[name] = content_hash(value)
+
+    def stage_key(self, stage):
+        missing = [name for name in stage.inputs if name not in self.hashes]
+        if missing:
+            raise KeyError(f"Bước '{stage.name}' thiếu đầu vào: {missing}")
+        description = {
+            'stage': stage.name, 'source': stage.source_hash(), 'params': stage.params,
+            'pipeline_version': PIPELINE_VERSION, 'stage_version': stage.version,
+            'inputs': {name: self.hashes[name] for name in stage.inputs},
+        }
+        return hashlib.sha256(json.dumps(description, sort_keys=True, default=str).encode('utf-8')).hexdigest()[:20]
+
+    def run(self, stages, force=()):
+        """Chạy các bước theo thứ tự; bước có tên trong `force` luôn chạy lại. Trả về `values`."""
+        for stage in stages:
+            start = time.perf_counter()
+            if not stage.cached:
+                outputs = self._execute(stage)
+                for name, value in outputs.items():
+                    self.values[name] = value
+                    self.hashes[name] = content_hash(value)
+                status = 'ran'
+            else:
+                key = self.stage_key(stage)
+                entry_dir = os.path.join(self.cache_dir, stage.name, key)
+                outputs = None
+                if stage.name not in force and os.path.exists(os.path.join(entry_dir, META_FILENAME)):
+                    try:
+                        outputs = self._load(entry_dir)
+                        status = 'cached'
+                    except (ImportError, AttributeError) as e:
+                        # Mục do mã cũ ghi (ví dụ lớp đã chuyển module) không nạp được: chạy lại bước
+                        self.log(f"⚠️ [{stage.name}] không nạp được kết quả đã lưu ({e}), chạy lại.")
+                if outputs is None:
+                    outputs = self._execute(stage)
+                    self._store(stage, entry_dir, outputs)
+                    status = 'ran'
+                for name, value in outputs.items():
+                    self.values[name] = value
+                    # Bước xác định: đầu ra cùng khóa thì cùng nội dung, không cần băm lại dữ liệu
+                    self.hashes[name] = hashlib.sha256(f'{key}:{name}'.encode('utf-8')).hexdigest()[:20]
+            seconds = time.perf_counter() - start
+            self.report.append({'stage': stage.name, 'status': status, 'seconds': seconds})
+            if status == 'cached':
+                self.log(f"⏭️  [{stage.name}] dùng lại kết quả đã lưu ({seconds:.2f}s).")
+            else:
+                self.log(f"✅ [{stage.name}] đã chạy trong {seconds:.2f}s.")
+        return self.values
+
+    def _execute(self, stage):
+        outputs = stage.run(**{name: self.values[name] for name in stage.inputs}, **stage.params)
+        if set(outputs) != set(stage.outputs):
+            raise ValueError(f"Bước '{stage.name}' trả về {sorted(outputs)}, cần {sorted(stage.outputs)}")
+        return outputs
+
+    def _store(self, stage, entry_dir, outputs):
+        """Ghi vào thư mục tạm rồi đổi tên: thư mục khóa chỉ tồn tại khi bước đã lưu xong."""
+        staging_dir = f'{entry_dir}.tmp-{os.getpid()}'
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        os.makedirs(staging_dir)
+        try:
+            meta = {name: save_artefact(staging_dir, name, value) for name, value in outputs.items()}
+            with open(os.path.join(staging_dir, META_FILENAME), 'w', encoding='utf-8') as f:
+                json.dump({'stage': stage.name, 'params': stage.params, 'outputs': meta,
+                           'created_at': time.strftime('%Y-%m-%dT%H:%M:%S')}, f, ensure_ascii=False, indent=2, default=str)
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            os.rename(staging_dir, entry_dir)
+        except BaseException:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            raise
+        self._prune(os.path.dirname(entry_dir), keep=os.path.basename(entry_dir))
+
+    def _load(self, entry_dir):
+        os.utime(entry_dir)  # đánh dấu vừa dùng để không bị dọn
+        with open(os.path.join(entry_dir, META_FILENAME), encoding='utf-8') as f:
+            meta = json.load(f)
+        return {name: load_artefact(entry_dir, name, output_meta) for name, output_meta in meta['outputs'].items()}
+
+    def _prune(self, stage_dir, keep):
+        entries = [name for name in os.listdir(stage_dir) if '.tmp-' not in name]
+        entries.sort(key=lambda name: os.path.getmtime(os.path.join(stage_dir, name)))
+        for name in entries[:-self.keep_entries]:
+            if name != keep:
+                shutil.rmtree(os.path.join(stage_dir, name), ignore_errors=True)
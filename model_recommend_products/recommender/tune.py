@@ -0,0 +1,166 @@
+# @title model train recommend product (kết nối MySQL)
+# ==============================================================================
+# QUY TRÌNH HOÀN CHỈNH: TINH CHỈNH VÀ ĐÁNH GIÁ MÔ HÌNH LAI (HYBRID MODEL)
+# ==============================================================================
+# Chạy:  python -m recommender tune
+# Cấu hình qua biến môi trường: CSDL và thư mục mô hình (config.py), CBF_FEATURES,
+# TUNING_K_VALUES, TUNING_ALPHA_VALUES, TUNING_WORKERS.
+# ==============================================================================
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.decomposition import TruncatedSVD
+from sklearn.model_selection import train_test_split
+
+from . import config
+from .content_features import DEFAULT_FEATURE_GROUPS, build_content_features
+from .evaluation import evaluate_top_k, holdout_matrix
+from .interactions import interaction_matrix_from_frame, load_interactions
+from .scoring_engine import HybridScoringEngine
+from .train import load_products
+from .tuning import DEFAULT_ALPHA_VALUES, DEFAULT_K_VALUES, tune_hyperparameters
+
+K_FOR_RECOMMENDATIONS = 10
+
+
+def main():
+    # --------------------------------------------------------------------------
+    # BƯỚC 1: KẾT NỐI VÀ TẢI DỮ LIỆU TỪ MYSQL
+    # --------------------------------------------------------------------------
+    print("--- BƯỚC 1: KẾT NỐI VÀ TẢI DỮ LIỆU TỪ MYSQL ---")
+    try:
+        engine = config.create_database_engine()
+        products_df = load_products(engine)
+        print(f"✅ Đã tải thành công {len(products_df)} sản phẩm.")
+
+        # 2. Tải dữ liệu tương tác (JOIN `order_items` và `orders`) theo luồng, từng khối,
+        # dùng lại ảnh chụp đã cộng dồn của bước huấn luyện nếu có (chỉ đọc thêm đơn mới).
+        # Đây sẽ là nguồn dữ liệu chính của chúng ta (ratings_df): mỗi cặp (user, sản phẩm) một dòng
+        interaction_accumulator = load_interactions(engine, config.interactions_snapshot_path())
+        ratings_df = interaction_accumulator.to_frame()
+        print(f"✅ Đã tải {len(ratings_df)} cặp user-sản phẩm ({interaction_accumulator.rows_read} dòng mới được đọc).")
+    except Exception as e:
+        print(f"❌ Lỗi khi tải dữ liệu từ CSDL: {e}")
+        sys.exit(1)
+
+    if ratings_df.empty:
+        print("❌ Cảnh báo: Không có dữ liệu tương tác. Không thể tiếp tục huấn luyện.")
+        sys.exit(1)
+
+    # --------------------------------------------------------------------------
+    # BƯỚC 2: CHIA DỮ LIỆU THÀNH 3 TẬP (60-20-20)
+    # --------------------------------------------------------------------------
+    print("\n--- BƯỚC 2: CHIA DỮ LIỆU THÀNH 3 TẬP (60-20-20) ---")
+    # Đảm bảo có đủ dữ liệu để chia
+    if len(ratings_df) < 10:
+        print("❌ Lỗi: Dữ liệu quá ít để chia thành các tập train/validation/test.")
+        sys.exit(1)
+
+    train_val_df, test_df = train_test_split(ratings_df, test_size=0.2, random_state=42)
+    train_df, val_df = train_test_split(train_val_df, test_size=0.25, random_state=42)  # 0.25 * 0.8 = 0.2
+
+    print(f"Kích thước tập Train:      {len(train_df)} (~{len(train_df)/len(ratings_df):.0%})")
+    print(f"Kích thước tập Validation: {len(val_df)} (~{len(val_df)/len(ratings_df):.0%})")
+    print(f"Kích thước tập Test:        {len(test_df)} (~{len(test_df)/len(ratings_df):.0%})")
+
+    # --------------------------------------------------------------------------
+    # BƯỚC 3: CHUẨN BỊ MA TRẬN VÀ DỮ LIỆU ĐÁNH GIÁ
+    # --------------------------------------------------------------------------
+    print("\n--- BƯỚC 3: CHUẨN BỊ MA TRẬN VÀ DỮ LIỆU ĐÁNH GIÁ ---")
+    # Tạo ma trận user-item thưa (CSR) từ tập train, với đầy đủ user/sản phẩm để kích thước nhất quán:
+    # hàng theo all_users, cột theo all_products (đều đã sắp xếp)
+    all_users = np.sort(ratings_df['user_id'].unique())
+    all_products = np.sort(products_df['product_id'].unique())
+
+    train_user_item_matrix, _, _ = interaction_matrix_from_frame(train_df, all_users, all_products)
+
+    # Dữ liệu để kiểm định và kiểm thử cuối cùng: ma trận thưa nhị phân cùng hàng/cột với ma trận train
+    val_holdout = holdout_matrix(val_df, all_users, all_products)
+    test_holdout = holdout_matrix(test_df, all_users, all_products)
+    print("✅ Đã chuẩn bị xong ma trận train và các tập dữ liệu đánh giá.")
+
+    # --------------------------------------------------------------------------
+    # BƯỚC 3.5: CHUẨN BỊ CHO MÔ HÌNH LỌC DỰA TRÊN NỘI DUNG (CBF)
+    # --------------------------------------------------------------------------
+    print("\n--- BƯỚC 3.5: CHUẨN BỊ CHO MÔ HÌNH LỌC DỰA TRÊN NỘI DUNG (CBF) ---")
+    # Đặc trưng thưa theo thứ tự all_products, ví dụ CBF_FEATURES=category,price,name
+    # (mặc định chỉ danh mục, tương đương one-hot pd.get_dummies nhưng chấm điểm bằng tra chỉ số)
+    cbf_feature_groups = config.parse_values(os.environ.get('CBF_FEATURES'), str.strip, DEFAULT_FEATURE_GROUPS)
+    product_features_aligned = build_content_features(products_df, all_products, groups=cbf_feature_groups)
+    # Hồ sơ người dùng (ma trận thưa × đặc trưng) và tham số chuẩn hóa CBF được tính một lần khi tinh chỉnh
+    print("✅ Đã tạo ma trận đặc trưng sản phẩm cho CBF.")
+
+    # --------------------------------------------------------------------------
+    # BƯỚC 4: TINH CHỈNH SIÊU THAM SỐ CHO MÔ HÌNH LAI
+    # --------------------------------------------------------------------------
+    print("\n--- BƯỚC 4: TINH CHỈNH SIÊU THAM SỐ (k, alpha) TRÊN TẬP VALIDATION ---")
+    start_time_tuning = time.time()
+
+    # Không gian tìm kiếm cấu hình qua biến môi trường, ví dụ:
+    #   TUNING_K_VALUES=10,20,30,40,60  TUNING_ALPHA_VALUES=0.2,0.5,0.8  TUNING_WORKERS=8
+    k_values_config = config.parse_values(os.environ.get('TUNING_K_VALUES'), int, DEFAULT_K_VALUES)
+    alpha_values_to_try = config.parse_values(os.environ.get('TUNING_ALPHA_VALUES'), float, DEFAULT_ALPHA_VALUES)
+    tuning_workers = int(os.environ.get('TUNING_WORKERS', '0')) or None  # 0 = dùng mọi lõi CPU
+
+    # Điều chỉnh k_values để không lớn hơn số chiều của ma trận
+    max_k = min(train_user_item_matrix.shape) - 1
+    k_values_to_try = [k for k in k_values_config if k <= max_k]
+    if not k_values_to_try:
+        k_values_to_try = [max_k]  # Ít nhất phải thử một giá trị k
+
+    # Một phân rã SVD ở k lớn nhất (k nhỏ hơn là lát cắt của nó), lưới (k, alpha) đánh giá song song
+    results_val = tune_hyperparameters(
+        train_user_item_matrix, val_holdout, all_users, all_products, product_features_aligned,
+        k_values_to_try, alpha_values_to_try, top_k=K_FOR_RECOMMENDATIONS, n_workers=tuning_workers
+    )
+    for metrics_val in results_val:
+        print(f"k = {metrics_val['k']:2d}, alpha = {metrics_val['alpha']:.1f} | Val Precision: {metrics_val['precision']:.4f} | "
+              f"Val Recall: {metrics_val['recall']:.4f} | Val NDCG: {metrics_val['ndcg']:.4f} | "
+              f"Coverage: {metrics_val['coverage']:.2%}")
+
+    end_time_tuning = time.time()
+    print(f"✅ Tinh chỉnh tham số hoàn tất. Thời gian: {end_time_tuning - start_time_tuning:.2f} giây.")
+
+    # --------------------------------------------------------------------------
+    # BƯỚC 5: CHỌN (k, alpha) TỐT NHẤT VÀ ĐÁNH GIÁ CUỐI CÙNG
+    # --------------------------------------------------------------------------
+    if not results_val:
+        print("❌ Không có kết quả nào để đánh giá. Dừng chương trình.")
+        sys.exit(1)
+
+    print("\n--- BƯỚC 5: ĐÁNH GIÁ CUỐI CÙNG TRÊN TẬP TEST ---")
+    results_val_df = pd.DataFrame(results_val)
+    best_params_row = results_val_df.loc[results_val_df['precision'].idxmax()]
+    best_k = int(best_params_row['k'])
+    best_alpha = best_params_row['alpha']
+    print(f"🏆 Tham số tốt nhất tìm được từ tập Validation: k = {best_k}, alpha = {best_alpha}")
+
+    # Huấn luyện lại mô hình cuối cùng trên toàn bộ tập train+validation
+    print(f"Huấn luyện lại mô hình cuối cùng với k={best_k}, alpha={best_alpha} trên Train+Validation set...")
+    # Tạo ma trận thưa cuối cùng từ train+val, cùng hàng/cột với ma trận train
+    final_train_val_matrix, _, _ = interaction_matrix_from_frame(train_val_df, all_users, all_products)
+
+    # 1. Mô hình CF cuối cùng, 2. hồ sơ CBF, 3. chuẩn hóa và kết hợp (trong bộ máy chấm điểm)
+    final_model_cf = TruncatedSVD(n_components=best_k, random_state=42)
+    final_p = final_model_cf.fit_transform(final_train_val_matrix)
+    final_engine = HybridScoringEngine.from_training(
+        final_train_val_matrix, all_users, all_products, final_p, final_model_cf.components_, product_features_aligned
+    )
+
+    # 4. Đánh giá trên tập TEST
+    metrics_test = evaluate_top_k(lambda rows: final_engine.score_rows(rows, best_alpha),
+                                  final_train_val_matrix, test_holdout, K_FOR_RECOMMENDATIONS)
+
+    k = K_FOR_RECOMMENDATIONS
+    print("\n--- KẾT QUẢ CUỐI CÙNG, KHÁCH QUAN TRÊN TẬP TEST ---")
+    print(f"📊 Final Precision@{k} (với k={best_k}, alpha={best_alpha}): {metrics_test['precision']:.4f}")
+    print(f"📊 Final Recall@{k}    (với k={best_k}, alpha={best_alpha}): {metrics_test['recall']:.4f}")
+    print(f"📊 Final NDCG@{k}      (với k={best_k}, alpha={best_alpha}): {metrics_test['ndcg']:.4f}")
+    print(f"📊 Final Coverage@{k}  (với k={best_k}, alpha={best_alpha}): {metrics_test['coverage']:.2%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+# @title Tinh chỉnh siêu tham số (k, alpha) song song, phân rã SVD một lần
+# ==============================================================================
+# Các thành phần của TruncatedSVD được sắp xếp giảm dần theo giá trị kỳ dị, nên mô
+# hình với k nhỏ hơn chính là k cột đầu của P và k hàng đầu của components_ khi fit
+# ở k lớn nhất. Vì vậy chỉ phân rã một lần; tham số chuẩn hóa CBF (không phụ thuộc
+# k, alpha) cũng chỉ fit một lần. Lưới (k, alpha) được đánh giá trên một pool tiến
+# trình (fork) hoặc pool luồng nếu hệ điều hành không hỗ trợ fork: phép nhân ma
+# trận của numpy nhả GIL nên luồng vẫn chạy song song được.
+# ==============================================================================
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from sklearn.decomposition import TruncatedSVD
+
+from .content_features import ContentFeatures
+from .evaluation import evaluate_top_k
+from .scoring_engine import HybridScoringEngine, fit_content_scaler
+
+DEFAULT_K_VALUES = (10, 20, 30, 40)
+DEFAULT_ALPHA_VALUES = (0.2, 0.5, 0.8)
+
+# Dữ liệu dùng chung của các worker (kế thừa qua fork, không phải pickle từng tác vụ)
+_worker_state = {}
+
+
+def _init_worker(state):
+    _worker_state.clear()
+    _worker_state.update(state)
+    _worker_state['engines'] = {}
+
+
+def _engine_for_k(k):
+    """Bộ máy chấm điểm của mô hình k thành phần, dựng từ lát cắt của phân rã ở k lớn nhất."""
+    engines = _worker_state['engines']
+    if k not in engines:
+        engines[k] = HybridScoringEngine.from_training(
+            _worker_state['train_matrix'], _worker_state['user_ids'], _worker_state['item_ids'],
+            _worker_state['user_factors'][:, :k], _worker_state['components'][:k],
+            _worker_state['item_features'], scaler_cbf=_worker_state['scaler_cbf'],
+        )
+    return engines[k]
+
+
+def _evaluate(params):
+    k, alpha = params
+    engine = _engine_for_k(k)
+    metrics = evaluate_top_k(lambda rows: engine.score_rows(rows, alpha), _worker_state['train_matrix'],
+                             _worker_state['holdout'], _worker_state['top_k'])
+    return {'k': k, 'alpha': alpha, **metrics}
+
+
+def tune_hyperparameters(train_matrix, holdout, user_ids, item_ids, item_features,
+                         k_values=DEFAULT_K_VALUES, alpha_values=DEFAULT_ALPHA_VALUES,
+                         top_k=10, n_workers=None, random_state=42):
+    """Đánh giá toàn bộ lưới (k, alpha) trên tập `holdout`; trả về danh sách kết quả theo thứ tự lưới.
+
+    `train_matrix`/`holdout` là CSR users×items (hàng theo `user_ids`, cột theo `item_ids`),
+    `item_features` là ContentFeatures (hoặc ma trận dày, ví dụ one-hot danh mục).
+    `n_workers=None` dùng mọi lõi CPU.
+    """
+    k_values = sorted(set(k_values))
+    svd = TruncatedSVD(n_components=k_values[-1], random_state=random_state)
+    user_factors = svd.fit_transform(train_matrix)
+    if not isinstance(item_features, ContentFeatures):
+        item_features = ContentFeatures.from_dense(item_features)
+
+    state = {
+        'train_matrix': train_matrix, 'holdout': holdout, 'user_ids': user_ids, 'item_ids': item_ids,
+        'item_features': item_features, 'user_factors': user_factors, 'components': svd.components_,
+        'scaler_cbf': fit_content_scaler(item_features.profiles(train_matrix), item_features), 'top_k': top_k,
+    }
+    grid = [(k, alpha) for k in k_values for alpha in alpha_values]
+    n_workers = min(n_workers or os.cpu_count() or 1, len(grid))
+    if n_workers <= 1:
+        _init_worker(state)
+        return [_evaluate(params) for params in grid]
+
+    if 'fork' in multiprocessing.get_all_start_methods():
+        executor = ProcessPoolExecutor(n_workers, mp_context=multiprocessing.get_context('fork'),
+                                       initializer=_init_worker, initargs=(state,))
+    else:
+        _init_worker(state)
+        executor = ThreadPoolExecutor(n_workers)
+    with executor:
+        # Gom các alpha của cùng một k liền nhau để mỗi worker dựng bộ máy cho k đó ít lần nhất
+        return list(executor.map(_evaluate, grid, chunksize=max(1, len(alpha_values))))
@@ -0,0 +1,96 @@
+# ==============================================================================
+# CẬP NHẬT TĂNG DẦN MÔ HÌNH (FOLD-IN) - KHÔNG CẦN HUẤN LUYỆN LẠI SVD
+# ==============================================================================
+# Chạy thường xuyên (ví dụ mỗi phút) giữa các lần huấn luyện đầy đủ theo lịch của
+# `python -m recommender train`:
+#   1. Đọc các đơn hàng mới hơn watermark của ảnh chụp tương tác (kèm cửa sổ chồng lấn).
+#   2. Chiếu phần tương tác tăng thêm của người dùng mới/đã thay đổi vào không gian ẩn
+#      đã học (components_ của mô hình CF; với ALS thì giải lại nhân tố của họ), cập nhật
+#      hồ sơ CBF và tập đã mua.
+#   3. Cập nhật bảng bán chạy, ghi phiên bản gói mô hình mới; API tự nạp lại.
+# Chạy:  python -m recommender update   (CSDL và thư mục mô hình: xem config.py)
+# ==============================================================================
+import os
+import sys
+import time
+
+import pandas as pd
+
+from . import config
+from .candidate_retrieval import CandidateIndex
+from .interactions import InteractionAccumulator, stream_interactions
+from .item_neighbors import ItemNeighborIndex
+from .model_bundle import load_bundle, read_current_version, write_bundle
+from .popularity import PopularityRanking
+from .scoring_engine import HybridScoringEngine
+
+
+def main():
+    model_dir = config.MODEL_DIR
+    snapshot_path = config.interactions_snapshot_path(model_dir)
+
+    start_time = time.perf_counter()
+    print("--- CẬP NHẬT TĂNG DẦN MÔ HÌNH GỢI Ý ---")
+
+    version = read_current_version(model_dir)
+    if version is None or not os.path.exists(snapshot_path):
+        print("❌ Chưa có gói mô hình hoặc ảnh chụp tương tác. Hãy chạy `python -m recommender train` trước.")
+        sys.exit(1)
+
+    engine = config.create_database_engine()
+
+    # 1. Chỉ đọc các đơn hàng mới hơn watermark (kèm cửa sổ chồng lấn, bỏ các đơn đã cộng)
+    snapshot = InteractionAccumulator.load(snapshot_path)
+    new_interactions = stream_interactions(engine, snapshot.incremental())
+    if new_interactions.rows_read == 0:
+        print(f"✅ Không có đơn hàng mới sau {snapshot.watermark}. Giữ nguyên phiên bản {version}.")
+        return
+    delta_df = new_interactions.to_frame()
+
+    # 2. Fold-in: nhân tố của gói hiện tại chính là components_ của mô hình CF
+    # (item_factors = components_.T), nên phép chiếu khớp với mô hình đang phục vụ.
+    snapshot.merge(new_interactions)
+    bundle = load_bundle(model_dir, version, {
+        'scoring_engine': HybridScoringEngine,
+        'item_neighbors': ItemNeighborIndex,
+        'candidate_index': CandidateIndex,
+    }, optional=('candidate_index',))
+    current_engine = bundle.scoring_engine
+    history = None
+    if current_engine.als_params is not None:
+        # ALS: nhân tố người dùng giải lại từ toàn bộ lượt mua (ảnh chụp đã cộng phần mới)
+        history_df = snapshot.to_frame()
+        history_df = history_df[history_df['user_id'].isin(delta_df['user_id'].unique())]
+        history = (history_df['user_id'].to_numpy(), history_df['product_id'].to_numpy(),
+                   history_df['quantity'].to_numpy())
+    scoring_engine = current_engine.fold_in(
+        delta_df['user_id'].to_numpy(), delta_df['product_id'].to_numpy(), delta_df['quantity'].to_numpy(), history)
+    unknown_items = (current_engine.item_index.rows(delta_df['product_id'].to_numpy()) < 0).sum()
+    print(f"✅ Đã fold-in {new_interactions.rows_read} dòng mới của {delta_df['user_id'].nunique()} người dùng "
+          f"({len(scoring_engine.user_ids) - len(current_engine.user_ids)} người dùng mới).")
+    if unknown_items:
+        print(f"⚠️ Bỏ qua {unknown_items} cặp có sản phẩm chưa có trong mô hình (chờ lần huấn luyện đầy đủ).")
+
+    # 3. Bảng bán chạy tính lại từ doanh số theo ngày (rẻ, không phụ thuộc SVD)
+    products_df = pd.read_sql("SELECT id AS product_id, category_id FROM products", engine)
+    popularity_ranking = PopularityRanking.build(snapshot.daily_sales_frame(), products_df)
+    # Các cụm CF giữ nguyên (fold-in không đổi nhân tố sản phẩm), chỉ cập nhật nhóm bán chạy
+    candidate_index = getattr(bundle, 'candidate_index', None)
+    candidate_index = (candidate_index.with_popularity(scoring_engine, popularity_ranking)
+                       if candidate_index is not None
+                       else CandidateIndex.build(scoring_engine, popularity_ranking))
+
+    new_version = write_bundle(model_dir, {
+        'scoring_engine': scoring_engine,
+        'item_neighbors': bundle.item_neighbors,
+        'popularity': popularity_ranking,
+        'candidate_index': candidate_index,
+    }, id_maps=bundle.manifest.get('id_maps'))
+    # Chỉ lưu ảnh chụp (và watermark mới) sau khi đã ghi gói thành công
+    snapshot.save(snapshot_path)
+    print(f"✅ Đã ghi phiên bản {new_version} (từ {version}) trong {time.perf_counter() - start_time:.2f}s. "
+          f"Watermark mới: {snapshot.watermark}.")
+
+
+if __name__ == '__main__':
+    main()
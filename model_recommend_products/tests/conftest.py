@@ -0,0 +1,74 @@
+# @title Dữ liệu dùng chung cho các test
+# ==============================================================================
+# CSDL SQLite tổng hợp (cùng lược đồ với MySQL, xem benchmarks/synthetic_data.py) và một
+# gói mô hình huấn luyện bằng đúng các hàm của `python -m recommender train`, tạo một lần
+# cho cả phiên test. Không cần MySQL, Redis hay mạng.
+# Chạy (từ thư mục model_recommend_products):  python -m pytest
+# ==============================================================================
+import contextlib
+import io
+
+import pytest
+from sqlalchemy import create_engine
+from synthetic_data import create_synthetic_database
+
+from recommender import config
+from recommender.cf_backends import DEFAULT_CF_BACKEND
+from recommender.model_bundle import load_bundle, read_current_version
+from recommender.serve import MODEL_COMPONENTS, OPTIONAL_COMPONENTS, create_app
+from recommender.train import create_runner, load_training_data, publish, training_stages
+
+N_INTERACTIONS = 3000
+SEED = 7
+
+
+def train_model(db_uri, model_dir, cf_backend=DEFAULT_CF_BACKEND):
+    """Huấn luyện vào `model_dir` như `python -m recommender train`; trả về kết quả các bước."""
+    engine = create_engine(db_uri)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            products_df, accumulator = load_training_data(engine, config.interactions_snapshot_path(model_dir))
+            runner = create_runner(model_dir, products_df, accumulator, log=lambda message: None)
+            results = runner.run(training_stages(cf_backend))
+            publish(model_dir, runner, results, products_df, cf_backend)
+            accumulator.save(config.interactions_snapshot_path(model_dir))
+    finally:
+        engine.dispose()
+    return results
+
+
+@pytest.fixture(scope='session')
+def db_uri(tmp_path_factory):
+    path = tmp_path_factory.mktemp('db') / 'shop.db'
+    db_uri, _ = create_synthetic_database(str(path), N_INTERACTIONS, seed=SEED)
+    return db_uri
+
+
+@pytest.fixture(scope='session')
+def training_inputs(db_uri):
+    """(products_df, ratings_df) đọc từ CSDL như bước 1 của train."""
+    engine = create_engine(db_uri)
+    try:
+        products_df, accumulator = load_training_data(engine, None)
+    finally:
+        engine.dispose()
+    return products_df, accumulator.to_frame()
+
+
+@pytest.fixture(scope='session')
+def model_dir(tmp_path_factory, db_uri):
+    model_dir = str(tmp_path_factory.mktemp('saved_models'))
+    train_model(db_uri, model_dir)
+    return model_dir
+
+
+@pytest.fixture(scope='session')
+def model(model_dir):
+    return load_bundle(model_dir, read_current_version(model_dir), MODEL_COMPONENTS, optional=OPTIONAL_COMPONENTS)
+
+
+@pytest.fixture
+def client(db_uri, model_dir):
+    app = create_app(db_uri=db_uri, model_dir=model_dir, reload_poll_seconds=0)
+    yield app.test_client()
+    app.extensions['recommender'].close()
@@ -0,0 +1,51 @@
+import pytest
+
+
+def test_known_user_gets_unbought_recommendations_in_score_order(client, model):
+    engine = model.scoring_engine
+    user_id = int(engine.user_ids[0])
+    response = client.get(f'/recommendations/user?user_id={user_id}&num_recs=5&alpha=0.5')
+    assert response.status_code == 200
+    recommendations = response.get_json()
+    scores = [item['hybrid_score'] for item in recommendations]
+    assert len(recommendations) == 5 and scores == sorted(scores, reverse=True)
+    purchased = set(engine.item_ids[engine.purchased_columns(0)].tolist())
+    assert not purchased & {item['product_id'] for item in recommendations}
+
+
+def test_unknown_user_gets_best_sellers(client, model):
+    unknown_user = int(model.scoring_engine.user_ids.max()) + 1
+    recommendations = client.get(f'/recommendations/user?user_id={unknown_user}&num_recs=3').get_json()
+    assert [item['product_id'] for item in recommendations] == model.popularity.top(3).tolist()
+
+
+def test_batch_endpoint_keeps_request_order(client, model):
+    user_ids = model.scoring_engine.user_ids[:5].tolist()[::-1]
+    response = client.post('/recommendations/users', json={'user_ids': user_ids, 'num_recs': 3})
+    assert [entry['user_id'] for entry in response.get_json()] == user_ids
+
+
+def test_similar_products(client, model):
+    product_id = int(model.item_neighbors.item_ids[0])
+    response = client.get(f'/recommendations/item?product_id={product_id}&num_similar=4')
+    assert response.status_code == 200
+    similar = [item['product_id'] for item in response.get_json()]
+    assert len(similar) == 4 and product_id not in similar
+
+
+@pytest.mark.parametrize('method, url, payload', [
+    ('GET', '/recommendations/user', None),
+    ('GET', '/recommendations/user?user_id=1&alpha=nan', None),
+    ('GET', '/recommendations/user?user_id=1&alpha=inf', None),
+    ('GET', '/recommendations/user?user_id=1&alpha=1.5', None),
+    ('GET', f'/recommendations/user?user_id={2 ** 70}', None),
+    ('POST', '/recommendations/users', {'user_ids': [2 ** 70]}),
+    ('POST', '/recommendations/users', {'user_ids': [1], 'alpha': 'nan'}),
+    ('POST', '/recommendations/users', {'user_ids': ['a']}),
+    ('POST', '/recommendations/session', {'product_ids': [2 ** 70]}),
+    ('POST', '/recommendations/session', {'product_ids': [1], 'alpha': 'inf'}),
+    ('GET', '/recommendations/item?product_id=1&num_similar=-1', None),
+])
+def test_invalid_input_is_rejected(client, method, url, payload):
+    response = client.open(url, method=method, json=payload)
+    assert response.status_code == 400
@@ -0,0 +1,73 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+import scipy.sparse as sp
+from sklearn.decomposition import TruncatedSVD
+
+from recommender.content_features import build_content_features
+from recommender.interactions import interaction_matrix_from_frame
+from recommender.scoring_engine import HybridScoringEngine
+
+
+@pytest.fixture(scope='module')
+def base(training_inputs):
+    products_df, ratings_df = training_inputs
+    matrix, user_ids, item_ids = interaction_matrix_from_frame(
+        ratings_df, all_product_ids=products_df['product_id'].unique())
+    components = TruncatedSVD(n_components=8, random_state=42).fit(matrix).components_
+    content = build_content_features(products_df, item_ids)
+    # P = X·Vᵀ: nhân tố người dùng đúng bằng phép chiếu mà fold-in dùng
+    engine = HybridScoringEngine.from_training(matrix, user_ids, item_ids, matrix @ components.T, components, content)
+    return matrix, user_ids, item_ids, components, content, engine
+
+
+def retrained_with_same_scalers(engine, matrix, user_ids, item_ids, components, content):
+    """Bộ máy dựng lại từ đầu trên ma trận mới, giữ tham số chuẩn hóa như fold-in."""
+    return HybridScoringEngine.from_training(
+        matrix, user_ids, item_ids, matrix @ components.T, components, content,
+        scaler_cf=SimpleNamespace(scale_=engine.cf_scale, min_=engine.cf_min),
+        scaler_cbf=SimpleNamespace(scale_=engine.cbf_scale, min_=engine.cbf_min))
+
+
+def test_svd_fold_in_equals_projection_of_updated_matrix(base):
+    matrix, user_ids, item_ids, components, content, engine = base
+    new_user = int(user_ids.max()) + 1
+    purchases = [(int(user_ids[0]), int(item_ids[3]), 2.0), (int(user_ids[5]), int(item_ids[7]), 1.0),
+                 (new_user, int(item_ids[1]), 3.0), (new_user, int(item_ids[2]), 1.0),
+                 (int(user_ids[0]), int(item_ids[3]), 1.0)]
+    delta_users, delta_products, delta_quantities = (np.array(values) for values in zip(*purchases))
+
+    folded = engine.fold_in(delta_users, delta_products, delta_quantities)
+
+    updated_user_ids = np.append(user_ids, new_user)
+    rows = np.searchsorted(updated_user_ids, delta_users)
+    cols = np.searchsorted(item_ids, delta_products)
+    updated = sp.vstack([matrix, sp.csr_matrix((1, len(item_ids)))]).tocsr()
+    updated = (updated + sp.csr_matrix((delta_quantities, (rows, cols)), shape=updated.shape)).tocsr()
+    expected = retrained_with_same_scalers(engine, updated, updated_user_ids, item_ids, components, content)
+
+    np.testing.assert_array_equal(folded.user_ids, updated_user_ids)
+    all_rows = np.arange(len(updated_user_ids))
+    for alpha in (0.0, 0.5, 1.0):
+        np.testing.assert_allclose(folded.score_rows(all_rows, alpha), expected.score_rows(all_rows, alpha), atol=1e-9)
+    np.testing.assert_array_equal(folded.purchased_indptr, expected.purchased_indptr)
+    np.testing.assert_array_equal(folded.purchased_indices, expected.purchased_indices)
+    # Sản phẩm vừa mua không còn được gợi ý
+    product_ids, _ = folded.recommend(new_user, len(item_ids), 0.5)
+    assert not np.isin(product_ids, [item_ids[1], item_ids[2]]).any()
+
+
+def test_fold_in_does_not_modify_current_engine(base):
+    *_, user_ids, item_ids, components, content, engine = base
+    before = engine.score_rows(np.arange(len(user_ids)), 0.5)
+    engine.fold_in([int(user_ids[0])], [int(item_ids[0])], [5.0])
+    assert len(engine.user_ids) == len(user_ids)
+    np.testing.assert_array_equal(engine.score_rows(np.arange(len(user_ids)), 0.5), before)
+
+
+def test_fold_in_skips_unknown_products(base):
+    *_, user_ids, item_ids, components, content, engine = base
+    folded = engine.fold_in([int(user_ids[0])], [int(item_ids.max()) + 1], [1.0])
+    rows = np.arange(len(user_ids))
+    np.testing.assert_allclose(folded.score_rows(rows, 0.5), engine.score_rows(rows, 0.5))
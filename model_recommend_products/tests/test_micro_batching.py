@@ -0,0 +1,68 @@
+import threading
+import time
+
+import pytest
+
+from recommender.micro_batching import MicroBatcher
+
+
+def submit_concurrently(batcher, keys):
+    """Gọi `submit` từ mỗi luồng một khóa; trả về (kết quả, số request trong lô) hoặc lỗi theo thứ tự `keys`."""
+    outcomes = [None] * len(keys)
+    barrier = threading.Barrier(len(keys))
+
+    def call(position, key):
+        barrier.wait()
+        try:
+            outcomes[position] = batcher.submit(key)
+        except BaseException as e:
+            outcomes[position] = e
+
+    threads = [threading.Thread(target=call, args=(position, key)) for position, key in enumerate(keys)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    assert not any(thread.is_alive() for thread in threads)
+    return outcomes
+
+
+def test_concurrent_keys_are_scored_in_one_batch_without_duplicates():
+    batches = []
+
+    def batch_fn(keys):
+        batches.append(keys)
+        return {key: key * 10 for key in keys}
+
+    batcher = MicroBatcher(batch_fn, window_seconds=0.2, max_batch_size=16)
+    assert submit_concurrently(batcher, [1, 2, 2, 3, 4]) == [(10, 5), (20, 5), (20, 5), (30, 5), (40, 5)]
+    assert len(batches) == 1 and sorted(batches[0]) == [1, 2, 3, 4]
+
+
+def test_full_batch_does_not_wait_for_the_window():
+    batcher = MicroBatcher(lambda keys: {key: key for key in keys}, window_seconds=30, max_batch_size=4)
+    start = time.monotonic()
+    assert submit_concurrently(batcher, [1, 2, 3, 4]) == [(1, 4), (2, 4), (3, 4), (4, 4)]
+    assert time.monotonic() - start < 5
+
+
+def test_sequential_calls_each_get_their_own_batch():
+    batcher = MicroBatcher(lambda keys: {key: -key for key in keys}, window_seconds=0.001)
+    assert [batcher.submit(key) for key in (1, 2, 3)] == [(-1, 1), (-2, 1), (-3, 1)]
+
+
+class WorkerTimeout(BaseException):
+    pass
+
+
+@pytest.mark.parametrize('error_type', [ValueError, WorkerTimeout])
+def test_batch_error_is_raised_in_every_waiting_request(error_type):
+    def batch_fn(keys):
+        raise error_type('scoring failed')
+
+    batcher = MicroBatcher(batch_fn, window_seconds=0.05, max_batch_size=8)
+    outcomes = submit_concurrently(batcher, [1, 2, 3, 4])
+    assert all(isinstance(outcome, error_type) for outcome in outcomes)
+    # Lô lỗi đã đóng: request sau mở lô mới
+    batcher.batch_fn = lambda keys: {key: key for key in keys}
+    assert batcher.submit(5) == (5, 1)
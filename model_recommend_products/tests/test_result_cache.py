@@ -0,0 +1,95 @@
+import threading
+import time
+
+import pytest
+
+from recommender.result_cache import ResultCache, quantize_alpha, result_key
+
+
+class FakeRedis:
+    """Các lệnh Redis mà ResultCache dùng (get, set NX/PX/EX, delete), lưu trong một dict."""
+
+    def __init__(self):
+        self.data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, nx=False, px=None, ex=None):
+        with self._lock:
+            if nx and key in self.data:
+                return None
+            self.data[key] = value.encode() if isinstance(value, str) else value
+            return True
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+
+class BrokenRedis:
+    def __getattr__(self, name):
+        def fail(*args, **kwargs):
+            raise ConnectionError('redis down')
+        return fail
+
+
+@pytest.mark.parametrize('alpha, expected', [(0.5, 0.5), (0.51, 0.5), (0.53, 0.55), (0.0, 0.0), (1.0, 1.0)])
+def test_quantize_alpha(alpha, expected):
+    assert quantize_alpha(alpha) == expected
+
+
+def test_result_key_includes_model_version_and_skips_missing_params():
+    key = result_key('user', 'v1', user_id=3, alpha=0.5, category_id=None)
+    assert key == 'rec:v1:user:alpha=0.5:user_id=3'
+    assert key != result_key('user', 'v2', user_id=3, alpha=0.5)
+
+
+def test_local_hit_after_first_compute():
+    cache = ResultCache()
+    calls = []
+    assert cache.get_or_compute('k', lambda: calls.append(1) or b'body') == (b'body', 'computed')
+    assert cache.get_or_compute('k', lambda: calls.append(1) or b'other') == (b'body', 'local')
+    assert len(calls) == 1
+
+
+def test_none_result_is_not_cached():
+    cache = ResultCache()
+    assert cache.get_or_compute('k', lambda: None) == (None, 'computed')
+    assert cache.get_or_compute('k', lambda: b'body') == (b'body', 'computed')
+
+
+def test_concurrent_requests_compute_once():
+    cache = ResultCache()
+    calls = []
+    started = threading.Event()
+
+    def compute():
+        calls.append(1)
+        started.set()
+        time.sleep(0.05)
+        return b'body'
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_compute('k', compute)[0]))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == [b'body'] * 8
+    assert len(calls) == 1
+
+
+def test_redis_shares_results_between_processes():
+    redis = FakeRedis()
+    first, second = ResultCache(redis_client=redis), ResultCache(redis_client=redis)
+    first.get_or_compute('k', lambda: b'body')
+    assert second.get_or_compute('k', lambda: b'other') == (b'body', 'redis')
+    assert 'k:lock' not in redis.data
+
+
+def test_redis_failure_falls_back_to_local_cache():
+    cache = ResultCache(redis_client=BrokenRedis())
+    assert cache.get_or_compute('k', lambda: b'body') == (b'body', 'computed')
+    assert cache.get_or_compute('k', lambda: b'other') == (b'body', 'local')
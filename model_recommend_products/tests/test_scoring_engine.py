@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.decomposition import TruncatedSVD
+from sklearn.preprocessing import MinMaxScaler
+
+from recommender.content_features import build_content_features
+from recommender.interactions import interaction_matrix_from_frame
+from recommender.model_bundle import load_bundle, read_current_version, write_bundle
+from recommender.scoring_engine import HybridScoringEngine
+
+ALPHAS = (0.0, 0.2, 0.5, 0.8, 1.0)
+NUM_RECS = 10
+
+
+@pytest.fixture(scope='module')
+def trained(training_inputs):
+    products_df, ratings_df = training_inputs
+    matrix, user_ids, item_ids = interaction_matrix_from_frame(
+        ratings_df, all_product_ids=products_df['product_id'].unique())
+    svd = TruncatedSVD(n_components=10, random_state=42)
+    user_factors = svd.fit_transform(matrix)
+    engine = HybridScoringEngine.from_training(
+        matrix, user_ids, item_ids, user_factors, svd.components_, build_content_features(products_df, item_ids))
+    return products_df, matrix, user_ids, item_ids, user_factors, svd.components_, engine
+
+
+def baseline_hybrid_scores(products_df, matrix, user_ids, item_ids, user_factors, components, alpha):
+    """Điểm lai như script gốc: ma trận dày P·Q và (R·F)·Fᵀ, MinMaxScaler trên toàn bộ ma trận."""
+    user_item = pd.DataFrame(matrix.toarray(), index=user_ids, columns=item_ids)
+    features = pd.get_dummies(products_df.set_index('product_id')['category']).reindex(item_ids).fillna(0)
+    cbf_scores = np.dot(np.dot(user_item, features), features.T)
+    cf_scores = np.dot(user_factors, components)
+    scaler = MinMaxScaler()
+    return alpha * scaler.fit_transform(cf_scores) + (1 - alpha) * scaler.fit_transform(cbf_scores)
+
+
+@pytest.mark.parametrize('alpha', ALPHAS)
+def test_scores_match_baseline_dense_scoring(trained, alpha):
+    products_df, matrix, user_ids, item_ids, user_factors, components, engine = trained
+    expected = baseline_hybrid_scores(products_df, matrix, user_ids, item_ids, user_factors, components, alpha)
+    np.testing.assert_allclose(engine.score_rows(np.arange(len(user_ids)), alpha), expected, atol=1e-9)
+
+
+@pytest.mark.parametrize('alpha', (0.2, 0.5, 0.8))
+def test_recommendations_match_baseline_unbought_ranking(trained, alpha):
+    products_df, matrix, user_ids, item_ids, user_factors, components, engine = trained
+    expected = baseline_hybrid_scores(products_df, matrix, user_ids, item_ids, user_factors, components, alpha)
+    bought = matrix.toarray() > 0
+    recommendations = engine.recommend_batch(user_ids.tolist(), NUM_RECS, alpha)
+    for row, user_id in enumerate(user_ids.tolist()):
+        unbought = pd.Series(expected[row], index=item_ids)[~bought[row]]
+        top = unbought.sort_values(ascending=False, kind='stable').head(NUM_RECS)
+        product_ids, scores = recommendations[user_id]
+        np.testing.assert_allclose(scores, top.to_numpy(), atol=1e-9)
+        assert not np.isin(product_ids, item_ids[bought[row]]).any()
+
+
+def test_recommend_batch_matches_single_user_and_skips_unknown(trained):
+    *_, user_ids, item_ids, user_factors, components, engine = trained
+    unknown_user = int(user_ids.max()) + 1
+    requested = user_ids[:20].tolist() + [unknown_user, int(user_ids[0])]
+    batch = engine.recommend_batch(requested, NUM_RECS, 0.5, block_size=7)
+    assert unknown_user not in batch
+    for user_id in user_ids[:20].tolist():
+        product_ids, scores = engine.recommend(user_id, NUM_RECS, 0.5)
+        np.testing.assert_array_equal(batch[user_id][0], product_ids)
+        np.testing.assert_allclose(batch[user_id][1], scores)
+
+
+def test_bundle_round_trip_preserves_recommendations(trained, tmp_path):
+    *_, user_ids, item_ids, user_factors, components, engine = trained
+    version = write_bundle(str(tmp_path), {'scoring_engine': engine})
+    assert read_current_version(str(tmp_path)) == version
+    loaded = load_bundle(str(tmp_path), version, {'scoring_engine': HybridScoringEngine}).scoring_engine
+    expected = engine.recommend_batch(user_ids.tolist(), NUM_RECS, 0.3)
+    actual = loaded.recommend_batch(user_ids.tolist(), NUM_RECS, 0.3)
+    for user_id in user_ids.tolist():
+        np.testing.assert_array_equal(actual[user_id][0], expected[user_id][0])
+        np.testing.assert_allclose(actual[user_id][1], expected[user_id][1])
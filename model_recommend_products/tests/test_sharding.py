@@ -0,0 +1,114 @@
+import numpy as np
+import pytest
+
+from recommender.model_bundle import load_bundle, read_current_version
+from recommender.route import ShardRouter, create_app as create_router_app
+from recommender.scoring_engine import HybridScoringEngine
+from recommender.serve import create_app
+from recommender.sharding import SHARD_HEADER, shard_dir, shard_label, shard_of, write_shards
+
+N_SHARDS = 3
+
+
+class InProcessShard:
+    """Thay ShardClient: gửi request vào app Flask của shard qua test client thay vì HTTP."""
+
+    def __init__(self, app):
+        self.app = app
+        self.client = app.test_client()
+
+    def request(self, method, path, body=None, headers=None):
+        response = self.client.open(path, method=method, data=body, headers=headers or {})
+        return response.status_code, response.content_type, response.get_data()
+
+
+@pytest.fixture(scope='module')
+def shards(model_dir):
+    return write_shards(model_dir, N_SHARDS)
+
+
+@pytest.fixture(scope='module')
+def router(db_uri, model_dir, shards):
+    router = ShardRouter([f'http://shard-{index}' for index in range(N_SHARDS)])
+    router.shards = [InProcessShard(create_app(db_uri=db_uri, model_dir=shard_dir(model_dir, index, N_SHARDS),
+                                               reload_poll_seconds=0))
+                     for index in range(N_SHARDS)]
+    yield router
+    router.close()
+    for shard in router.shards:
+        shard.app.extensions['recommender'].close()
+
+
+@pytest.fixture
+def router_client(router):
+    return create_router_app(router).test_client()
+
+
+def test_shard_of_is_stable_and_balanced():
+    # Giá trị cố định: đổi hàm băm làm mọi người dùng đổi shard, phải chia lại toàn bộ gói
+    assert shard_of([1, 2, 3, 4, 1000000, 2 ** 63 - 1, -1], 4).tolist() == [1, 2, 0, 0, 2, 1, 3]
+    user_ids = np.arange(1, 40001)
+    owners = shard_of(user_ids, 4)
+    np.testing.assert_array_equal(shard_of(user_ids[::-1].tolist(), 4), owners[::-1])
+    assert np.bincount(owners, minlength=4).min() > 0.9 * len(user_ids) / 4
+
+
+def test_each_user_is_served_by_exactly_one_shard_with_unchanged_scores(model, model_dir, shards):
+    engine = model.scoring_engine
+    owners = shard_of(engine.user_ids, N_SHARDS)
+    for index in range(N_SHARDS):
+        directory = shard_dir(model_dir, index, N_SHARDS)
+        shard = load_bundle(directory, read_current_version(directory),
+                            {'scoring_engine': HybridScoringEngine}).scoring_engine
+        owned = engine.user_ids[owners == index]
+        np.testing.assert_array_equal(np.sort(shard.user_ids), np.sort(owned))
+        expected = engine.recommend_batch(owned.tolist(), 5, 0.5)
+        actual = shard.recommend_batch(owned.tolist(), 5, 0.5)
+        for user_id in owned.tolist():
+            np.testing.assert_array_equal(actual[user_id][0], expected[user_id][0])
+            np.testing.assert_allclose(actual[user_id][1], expected[user_id][1], rtol=1e-12)
+
+
+def test_writing_shards_again_for_the_same_version_is_skipped(model_dir, shards):
+    version, written = write_shards(model_dir, N_SHARDS)
+    assert version == shards[0]
+    assert [shard_version for _, shard_version, _ in written] == [None] * N_SHARDS
+
+
+def test_router_matches_single_api(router_client, client, model):
+    user_ids = model.scoring_engine.user_ids[:30].tolist() + [int(model.scoring_engine.user_ids.max()) + 1]
+    for user_id in user_ids[:10] + user_ids[-1:]:
+        url = f'/recommendations/user?user_id={user_id}&num_recs=5&alpha=0.3'
+        assert router_client.get(url).get_json() == client.get(url).get_json()
+
+    payload = {'user_ids': user_ids[::-1], 'num_recs': 4, 'alpha': 0.6}
+    routed = router_client.post('/recommendations/users', json=payload).get_json()
+    single = client.post('/recommendations/users', json=payload).get_json()
+    assert [entry['user_id'] for entry in routed] == user_ids[::-1]
+    for routed_entry, single_entry in zip(routed, single):
+        assert ([item['product_id'] for item in routed_entry['recommendations']]
+                == [item['product_id'] for item in single_entry['recommendations']])
+        assert ([item.get('hybrid_score') for item in routed_entry['recommendations']]
+                == pytest.approx([item.get('hybrid_score') for item in single_entry['recommendations']]))
+
+    product_id = int(model.item_neighbors.item_ids[0])
+    url = f'/recommendations/item?product_id={product_id}&num_similar=4'
+    assert router_client.get(url).get_json() == client.get(url).get_json()
+
+
+def test_shard_rejects_requests_meant_for_another_shard(router, model):
+    user_id = int(model.scoring_engine.user_ids[0])
+    status, _, _ = router.shards[0].request('GET', f'/recommendations/user?user_id={user_id}',
+                                            headers={SHARD_HEADER: shard_label(1, N_SHARDS)})
+    assert status == 421
+
+
+@pytest.mark.parametrize('method, url, payload', [
+    ('GET', f'/recommendations/user?user_id={2 ** 70}', None),
+    ('POST', '/recommendations/users', {'user_ids': [2 ** 70]}),
+    ('POST', '/recommendations/users', {'user_ids': [1], 'alpha': 'nan'}),
+    ('POST', '/recommendations/session', {'product_ids': [2 ** 70]}),
+])
+def test_router_rejects_invalid_input(router_client, method, url, payload):
+    response = router_client.open(url, method=method, json=payload)
+    assert response.status_code == 400